@@ -0,0 +1,202 @@
+"""
+Intervalos de verificación adaptativos por filtro.
+Estima la tasa de llegada de propiedades nuevas de cada filtro a partir de las fechas
+`first_seen` del almacenamiento y ajusta cada cuánto se verifica: los filtros con mucho
+movimiento se revisan más seguido y los tranquilos se espacian, dentro de un mínimo y un
+máximo configurados y respetando un presupuesto global de scrapings por hora.
+
+El almacenamiento se lee una sola vez al arrancar (load_history); después, cada ciclo
+agrega solo sus propiedades nuevas (record_arrivals).
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+def _collect_first_seen(properties_data: Dict[str, Dict],
+                        filter_names: List[str]) -> Dict[str, List[datetime]]:
+    """Fechas `first_seen` del almacenamiento agrupadas por filtro."""
+    seen_at: Dict[str, List[datetime]] = {name: [] for name in filter_names}
+    for info in properties_data.values():
+        name = info.get('filter_name')
+        if name not in seen_at:
+            continue
+        first_seen = _parse_timestamp(info.get('first_seen'))
+        if first_seen is not None:
+            seen_at[name].append(first_seen)
+    return seen_at
+
+def _arrival_rate(baseline: Optional[datetime], arrivals: List[datetime],
+                  window_start: datetime, now: datetime) -> Optional[float]:
+    """Propiedades nuevas por hora desde la primera tanda (`baseline`), o None sin historia suficiente."""
+    if baseline is None:
+        return None
+    observed_hours = (now - max(baseline, window_start)).total_seconds() / 3600
+    if observed_hours < 1:
+        return None  # Menos de una hora de historia: no alcanza para estimar
+    count = sum(1 for t in arrivals if t > baseline and t >= window_start)
+    # Suavizado (+1): un filtro sin llegadas en la ventana no queda con tasa cero
+    return (count + 1) / observed_hours
+
+def estimate_arrival_rates(properties_data: Dict[str, Dict], filter_names: List[str],
+                           window_days: float = 7, now: Optional[datetime] = None) -> Dict[str, Optional[float]]:
+    """
+    Estima cuántas propiedades nuevas por hora aparecen en cada filtro.
+
+    La primera tanda guardada de cada filtro (todas con el mismo `first_seen`) es el listado
+    que ya existía al empezar a monitorearlo, así que no cuenta como llegadas.
+
+    Args:
+        properties_data: Datos del almacenamiento (ID -> {'first_seen', 'filter_name', ...})
+        filter_names: Nombres de los filtros a estimar
+        window_days: Solo se consideran llegadas de los últimos N días
+        now: Momento de referencia (por defecto, ahora)
+
+    Returns:
+        Dict nombre -> propiedades nuevas por hora, o None si todavía no hay historia suficiente
+    """
+    now = now or datetime.now()
+    window_start = now - timedelta(days=window_days)
+    return {
+        name: _arrival_rate(min(timestamps, default=None), timestamps, window_start, now)
+        for name, timestamps in _collect_first_seen(properties_data, filter_names).items()
+    }
+
+
+class AdaptivePoller:
+    """
+    Calcula el intervalo de verificación de cada filtro (las fechas límite las lleva
+    scheduler.DeadlineScheduler).
+
+    - Sin historia, un filtro usa el intervalo base (CHECK_INTERVAL_MINUTES).
+    - Con historia, el intervalo es el tiempo esperado hasta `target_new_per_check`
+      propiedades nuevas, acotado a [min_minutes, max_minutes].
+    - Si la suma de scrapings por hora supera `budget_per_hour`, los intervalos que no
+      están en el techo se estiran en la misma proporción.
+    """
+
+    def __init__(self, search_filters: List[Dict], base_minutes: float, min_minutes: float,
+                 max_minutes: float, target_new_per_check: float = 0.5, window_days: float = 7,
+                 budget_per_hour: float = 0):
+        """
+        Args:
+            search_filters: Lista de filtros con 'name' y 'url'
+            base_minutes: Intervalo de los filtros sin historia
+            min_minutes: Intervalo mínimo (piso)
+            max_minutes: Intervalo máximo (techo)
+            target_new_per_check: Propiedades nuevas esperadas por verificación
+            window_days: Ventana de historia para estimar la tasa de llegada
+            budget_per_hour: Máximo de scrapings por hora entre todos los filtros (0 = sin límite)
+        """
+        self.search_filters = search_filters
+        self.base_minutes = base_minutes
+        self.min_minutes = max(0.1, min_minutes)
+        self.max_minutes = max(self.min_minutes, max_minutes)
+        self.target_new_per_check = target_new_per_check
+        self.window_days = window_days
+        self.budget_per_hour = budget_per_hour
+
+        self.intervals: Dict[int, float] = {
+            idx: self._clamp(base_minutes) for idx in range(len(search_filters))
+        }
+        # Historia por filtro: primera tanda y llegadas posteriores dentro de la ventana
+        self._baselines: Dict[str, datetime] = {}
+        self._arrivals: Dict[str, List[datetime]] = {}
+
+    def _clamp(self, minutes: float) -> float:
+        return min(self.max_minutes, max(self.min_minutes, minutes))
+
+    def _names(self) -> List[str]:
+        return [f.get('name', '') for f in self.search_filters]
+
+    def load_history(self, properties_data: Dict[str, Dict]):
+        """Toma la historia de llegadas del almacenamiento completo (una vez, al arrancar)."""
+        window_start = datetime.now() - timedelta(days=self.window_days)
+        self._baselines, self._arrivals = {}, {}
+        for name, timestamps in _collect_first_seen(properties_data, self._names()).items():
+            if timestamps:
+                baseline = self._baselines[name] = min(timestamps)
+                self._arrivals[name] = sorted(t for t in timestamps if t > baseline and t >= window_start)
+
+    def record_arrivals(self, properties: List[Dict]):
+        """
+        Agrega a la historia las propiedades nuevas guardadas en un ciclo
+        (con 'filter_name' y 'detected_at', como las retorna storage.get_new_properties).
+        """
+        names = set(self._names())
+        for prop in properties:
+            name = prop.get('filter_name')
+            seen_at = _parse_timestamp(prop.get('detected_at') or prop.get('first_seen'))
+            if name not in names or seen_at is None:
+                continue
+            if name not in self._baselines:
+                # Primera tanda del filtro: es el listado que ya existía, no cuenta como llegadas
+                self._baselines[name] = seen_at
+                self._arrivals[name] = []
+            elif seen_at > self._baselines[name]:
+                self._arrivals[name].append(seen_at)
+
+    def update_intervals(self, properties_data: Optional[Dict[str, Dict]] = None) -> Dict[int, float]:
+        """
+        Recalcula el intervalo de cada filtro desde la historia de llegadas.
+
+        Args:
+            properties_data: Datos del almacenamiento completo para recargar la historia
+                             (None = usar la historia en memoria, ver record_arrivals)
+
+        Returns:
+            Dict índice del filtro (desde 0) -> intervalo en minutos
+        """
+        if properties_data is not None:
+            self.load_history(properties_data)
+        names = self._names()
+        now = datetime.now()
+        window_start = now - timedelta(days=self.window_days)
+        rates = {}
+        for name in names:
+            # Las llegadas que salieron de la ventana ya no se necesitan
+            arrivals = self._arrivals.get(name)
+            if arrivals:
+                arrivals[:] = [t for t in arrivals if t >= window_start]
+            rates[name] = _arrival_rate(self._baselines.get(name), arrivals or [], window_start, now)
+
+        intervals = {}
+        for idx, name in enumerate(names):
+            rate = rates.get(name)
+            if rate is None:
+                minutes = self.base_minutes
+            else:
+                minutes = self.target_new_per_check / rate * 60
+            intervals[idx] = self._clamp(minutes)
+
+        # Presupuesto global: estirar en la misma proporción los intervalos que no están en el techo
+        if self.budget_per_hour > 0 and intervals:
+            for _ in range(len(intervals)):
+                free = [idx for idx, minutes in intervals.items() if minutes < self.max_minutes]
+                capped_load = sum(60 / intervals[idx] for idx in intervals if idx not in free)
+                free_load = sum(60 / intervals[idx] for idx in free)
+                if not free or capped_load + free_load <= self.budget_per_hour * 1.0001:
+                    break
+                available = self.budget_per_hour - capped_load
+                if available <= 0:
+                    intervals.update({idx: self.max_minutes for idx in free})
+                    break
+                factor = free_load / available
+                intervals.update({idx: min(self.max_minutes, intervals[idx] * factor) for idx in free})
+            if sum(60 / minutes for minutes in intervals.values()) > self.budget_per_hour * 1.0001:
+                print(f"⚠ El presupuesto de {self.budget_per_hour:g} scrapings/hora no alcanza "
+                      f"ni con el intervalo máximo ({self.max_minutes:g} min)")
+
+        self.intervals = intervals
+        return intervals
+
+    def describe(self) -> str:
+        """Resumen de los intervalos actuales, para los logs."""
+        return ", ".join(
+            f"[{idx + 1}] {minutes:.0f} min" for idx, minutes in sorted(self.intervals.items())
+        )
@@ -0,0 +1,310 @@
+"""
+Benchmark del parser de propiedades sobre el corpus de benchmarks/fixtures.
+Mide propiedades/segundo, tiempo por campo y memoria del stack de parseo sin abrir Chrome
+ni consultar el sitio real, y compara contra los valores de referencia de baselines.json.
+
+Las páginas incluidas son sintéticas (imitan el marcado del sitio, no son capturas): sirven para
+detectar regresiones, no para medir el rendimiento sobre páginas reales. Agrega capturas con
+--capture y borra los datos personales antes de commitearlas.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_parser                       # Reporte
+    python -m benchmarks.bench_parser --check               # Falla (código 1) si hay regresión
+                                                            # o el JSON embebido no coincide con las tarjetas
+    python -m benchmarks.bench_parser --update-baseline     # Guarda los resultados como referencia
+    python -m benchmarks.bench_parser --capture URL nombre  # Agrega una página real al corpus
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+FIXTURES_DIR = BENCH_DIR / "fixtures"
+BASELINES_FILE = BENCH_DIR / "baselines.json"
+
+# La raíz del proyecto debe estar en el path para importar scraper, lxml_extractor, etc.
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+import lxml_extractor  # noqa: E402
+from http_fetch import extract_preloaded_state, extract_properties_from_state  # noqa: E402
+from scraper import (  # noqa: E402
+    extract_price,
+    extract_property_id,
+    filter_properties,
+    parse_properties_html
+)
+
+BASE_URL = "https://www.portalinmobiliario.com/arriendo/casa/"
+
+# Selectores del extractor de BeautifulSoup, para medir el costo de cada campo por separado
+BS4_FIELD_SELECTORS = {
+    "link": 'a[href*="portalinmobiliario.com"], a.ui-search-link',
+    "title": 'h2, .ui-search-item__title, .ui-search-item__group__element',
+    "price": '.ui-search-price, .price, [data-price], .ui-search-item__price',
+    "location": '.ui-search-item__location, .location, [data-location]',
+    "bedrooms": '[data-bedrooms], .bedrooms, .ui-search-item__bedrooms',
+    "bathrooms": '[data-bathrooms], .bathrooms, .ui-search-item__bathrooms',
+    "area": '[data-area], .area, .ui-search-item__area',
+}
+BS4_ITEMS_SELECTOR = 'li.ui-search-layout__item, article.ui-search-result, div.ui-search-result'
+
+def load_fixtures() -> Dict[str, str]:
+    """Carga todas las páginas del corpus (nombre -> HTML)."""
+    return {
+        path.stem: path.read_text(encoding="utf-8")
+        for path in sorted(FIXTURES_DIR.glob("*.html"))
+    }
+
+# Tiempo mínimo de medición por caso: los casos rápidos se repiten más para reducir el ruido
+MIN_MEASURE_SECONDS = 0.3
+
+def best_time(func: Callable, repeat: int) -> float:
+    """
+    Ejecuta func al menos `repeat` veces (y hasta sumar MIN_MEASURE_SECONDS)
+    y retorna el menor tiempo (segundos).
+    """
+    best = float("inf")
+    runs = 0
+    total = 0.0
+    while runs < repeat or total < MIN_MEASURE_SECONDS:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        total += elapsed
+        runs += 1
+    return best
+
+def peak_memory(func: Callable) -> int:
+    """
+    Retorna el pico de memoria de Python (bytes) asignada durante una ejecución de func.
+    tracemalloc no ve la memoria interna de libxml2, así que para lxml mide solo la parte Python.
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def quiet(func: Callable) -> Callable:
+    """Envuelve func silenciando los print del scraper."""
+    def wrapper():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func()
+    return wrapper
+
+def bench_parsing(fixtures: Dict[str, str], repeat: int) -> Dict[str, Dict]:
+    """Parseo completo de cada página con cada backend y alcance."""
+    results = {}
+    for name, html in fixtures.items():
+        for backend in ("bs4", "lxml"):
+            for scope in ("full", "results"):
+                run = quiet(lambda: parse_properties_html(html, BASE_URL, backend=backend, scope=scope))
+                items = len(run())
+                seconds = best_time(run, repeat)
+                results[f"parse/{name}/{backend}/{scope}"] = {
+                    "items": items,
+                    "ms_per_page": seconds * 1000,
+                    "items_per_second": items / seconds if seconds else 0.0,
+                    "peak_memory_kb": peak_memory(run) / 1024
+                }
+
+        state = extract_preloaded_state(html)
+        if state is not None:
+            run = lambda: extract_properties_from_state(extract_preloaded_state(html))
+            items = len(run() or [])
+            seconds = best_time(run, repeat)
+            results[f"parse/{name}/state_json"] = {
+                "items": items,
+                "ms_per_page": seconds * 1000,
+                "items_per_second": items / seconds if seconds else 0.0,
+                "peak_memory_kb": peak_memory(run) / 1024
+            }
+    return results
+
+def bench_fields(fixtures: Dict[str, str], repeat: int) -> Dict[str, Dict]:
+    """Costo por campo (µs por tarjeta) del extractor de BeautifulSoup vs. el recorrido único de lxml."""
+    results = {}
+    for name, html in fixtures.items():
+        items = BeautifulSoup(html, "lxml").select(BS4_ITEMS_SELECTOR)
+        if not items:
+            continue
+        for field, selector in BS4_FIELD_SELECTORS.items():
+            seconds = best_time(lambda: [item.select_one(selector) for item in items], repeat)
+            results[f"field/{name}/bs4/{field}"] = {"us_per_item": seconds / len(items) * 1e6}
+
+        cards = lxml_extractor.find_property_items(lxml_extractor.lxml_html.fromstring(html))
+        seconds = best_time(
+            lambda: [lxml_extractor.extract_property_info(card, BASE_URL) for card in cards], repeat
+        )
+        results[f"field/{name}/lxml/all_fields"] = {"us_per_item": seconds / len(cards) * 1e6}
+    return results
+
+def bench_helpers(fixtures: Dict[str, str], repeat: int) -> Dict[str, Dict]:
+    """extract_price, extract_property_id y filter_properties sobre los datos del corpus."""
+    properties: List[Dict] = []
+    for html in fixtures.values():
+        properties.extend(quiet(lambda: parse_properties_html(html, BASE_URL, backend="lxml"))())
+    if not properties:
+        return {}
+
+    links = [p["link"] for p in properties] * 20
+    prices = [f"{p['price']} {p['price_unit']}" if p["price"] else "" for p in properties] * 20
+    filters = {"precio_min": 500000, "precio_max": 2500000, "dormitorios_min": 3}
+    many = properties * 20
+
+    results = {}
+    for label, func, count in (
+        ("extract_property_id", lambda: [extract_property_id(link) for link in links], len(links)),
+        ("extract_price", lambda: [extract_price(text) for text in prices], len(prices)),
+        ("filter_properties", lambda: filter_properties(many, filters), len(many)),
+    ):
+        seconds = best_time(func, repeat)
+        results[f"helper/{label}"] = {"items_per_second": count / seconds if seconds else 0.0}
+    return results
+
+def run_benchmarks(repeat: int) -> Dict[str, Dict]:
+    fixtures = load_fixtures()
+    if not fixtures:
+        print(f"⚠ No hay páginas en {FIXTURES_DIR}")
+        return {}
+    results = {}
+    results.update(bench_parsing(fixtures, repeat))
+    results.update(bench_fields(fixtures, repeat))
+    results.update(bench_helpers(fixtures, repeat))
+    return results
+
+def print_report(results: Dict[str, Dict]):
+    print(f"\n{'Caso':<52} {'items':>6} {'ms/pág':>9} {'items/s':>11} {'mem Py KB':>9} {'µs/item':>9}")
+    print("-" * 100)
+    for case, metrics in results.items():
+        def fmt(key, spec):
+            return format(metrics[key], spec) if key in metrics else "-"
+        print(f"{case:<52} {fmt('items', 'd'):>6} {fmt('ms_per_page', '.2f'):>9} "
+              f"{fmt('items_per_second', ',.0f'):>11} {fmt('peak_memory_kb', ',.0f'):>9} "
+              f"{fmt('us_per_item', '.1f'):>9}")
+
+def check_regressions(results: Dict[str, Dict], baselines: Dict[str, Dict], tolerance: float) -> List[str]:
+    """
+    Compara contra los valores de referencia.
+    Es regresión: menos items/s o más memoria que la referencia ± tolerancia, o un cambio
+    en la cantidad de propiedades extraídas. Los tiempos por campo son solo informativos
+    (son demasiado pequeños para compararlos sin ruido).
+    """
+    problems = []
+    for case, base in baselines.items():
+        current = results.get(case)
+        if current is None:
+            problems.append(f"{case}: el caso ya no existe")
+            continue
+        if "items" in base and current.get("items") != base["items"]:
+            problems.append(f"{case}: extrae {current.get('items')} propiedades (referencia {base['items']})")
+        if "items_per_second" in base and current["items_per_second"] < base["items_per_second"] * (1 - tolerance):
+            problems.append(f"{case}: {current['items_per_second']:,.0f} items/s "
+                            f"(referencia {base['items_per_second']:,.0f})")
+        if "peak_memory_kb" in base and current["peak_memory_kb"] > base["peak_memory_kb"] * (1 + tolerance):
+            problems.append(f"{case}: {current['peak_memory_kb']:,.0f} KB de memoria "
+                            f"(referencia {base['peak_memory_kb']:,.0f})")
+    return problems
+
+# Campos que el JSON embebido y las tarjetas deben traer iguales
+PARITY_FIELDS = ("title", "price", "price_unit", "location", "link", "bedrooms", "bathrooms", "area")
+
+def check_state_parity(fixtures: Dict[str, str]) -> List[str]:
+    """
+    En las páginas con JSON embebido, compara lo que se extrae del JSON con lo que se extrae
+    de las tarjetas (mismos IDs y mismos campos): el camino HTTP y el de Selenium deben
+    producir las mismas propiedades.
+    """
+    problems = []
+    for name, html in fixtures.items():
+        state = extract_preloaded_state(html)
+        if state is None:
+            continue
+        from_state = quiet(lambda: extract_properties_from_state(state))() or []
+        from_cards = quiet(lambda: parse_properties_html(html, BASE_URL, backend="lxml"))()
+        cards_by_id = {prop["id"]: prop for prop in from_cards}
+        state_ids = {prop["id"] for prop in from_state}
+
+        for missing in sorted(set(cards_by_id) - state_ids):
+            problems.append(f"{name}: {missing} está en las tarjetas pero no en el JSON")
+        for prop in from_state:
+            card = cards_by_id.get(prop["id"])
+            if card is None:
+                problems.append(f"{name}: {prop['id']} está en el JSON pero no en las tarjetas")
+                continue
+            for field in PARITY_FIELDS:
+                if prop.get(field) != card.get(field):
+                    problems.append(f"{name}: {prop['id']} {field} = {prop.get(field)!r} en el JSON "
+                                    f"y {card.get(field)!r} en las tarjetas")
+    return problems
+
+def capture_page(url: str, name: str):
+    """Carga una URL real con Selenium y guarda su HTML en el corpus."""
+    from scraper import get_driver_pool, shutdown_driver_pool
+    from page_readiness import wait_until_ready
+
+    pool = get_driver_pool()
+    driver = pool.acquire()
+    try:
+        driver.get(url)
+        wait_until_ready(driver)
+        html = driver.page_source
+    finally:
+        pool.release(driver)
+        shutdown_driver_pool()
+
+    path = FIXTURES_DIR / f"{name}.html"
+    path.write_text(html, encoding="utf-8")
+    print(f"💾 Página guardada en {path} ({len(html) / 1024:.0f} KB)")
+    print("⚠️  Revisa el HTML y borra datos personales (nombres, teléfonos, emails) antes de commitearlo")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del parser de propiedades")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por caso (se usa la mejor)")
+    parser.add_argument("--check", action="store_true", help="Compara contra baselines.json")
+    parser.add_argument("--tolerance", type=float, default=0.50, help="Tolerancia de la comparación (0.50 = 50%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Guarda los resultados en baselines.json")
+    parser.add_argument("--json", metavar="PATH", help="Guarda los resultados en un archivo JSON")
+    parser.add_argument("--capture", nargs=2, metavar=("URL", "NOMBRE"), help="Agrega una página real al corpus")
+    args = parser.parse_args()
+
+    if args.capture:
+        capture_page(*args.capture)
+        return
+
+    results = run_benchmarks(args.repeat)
+    print_report(results)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    if args.update_baseline:
+        BASELINES_FILE.write_text(json.dumps(results, indent=2, sort_keys=True), encoding="utf-8")
+        print(f"\n💾 Referencia actualizada: {BASELINES_FILE}")
+
+    if args.check:
+        if not BASELINES_FILE.exists():
+            print(f"\n⚠ No existe {BASELINES_FILE}; usa --update-baseline primero")
+            sys.exit(1)
+        baselines = json.loads(BASELINES_FILE.read_text(encoding="utf-8"))
+        problems = check_regressions(results, baselines, args.tolerance)
+        problems += check_state_parity(load_fixtures())
+        if problems:
+            print(f"\n❌ {len(problems)} regresión(es) respecto a la referencia:")
+            for problem in problems:
+                print(f"   - {problem}")
+            sys.exit(1)
+        print(f"\n✅ Sin regresiones (tolerancia {args.tolerance:.0%})")
+
+if __name__ == "__main__":
+    main()
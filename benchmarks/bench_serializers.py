@@ -0,0 +1,117 @@
+"""
+Benchmark de los formatos del almacenamiento (serializers.py).
+Mide, para el archivo de propiedades vistas completo, el tiempo de guardado (serializar y
+escribir de forma atómica, con fsync), el tiempo de carga (leer, detectar el formato y
+decodificar) y el tamaño del archivo, contra el JSON indentado con "property_ids" original.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_serializers                       # 10 mil, 100 mil y 1 millón
+    python -m benchmarks.bench_serializers --sizes 10000 100000
+"""
+import argparse
+import gc
+import json
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+import serializers  # noqa: E402
+from storage_backends import write_atomic  # noqa: E402
+
+
+FILTER_NAMES = ["CASA 4-5 piezas", "DEPARTAMENTO 4-5 piezas", "DEPARTAMENTO 5 piezas", "CASA 5 piezas"]
+
+
+def make_ids(count: int, seed: int = 1) -> List[str]:
+    """IDs con el formato real (MLC- y 9 a 10 dígitos), sin repetir."""
+    rng = random.Random(seed)
+    ids = set()
+    while len(ids) < count:
+        ids.add(f"MLC-{rng.randrange(10 ** 8, 3 * 10 ** 9)}")
+    return list(ids)
+
+
+def make_properties_data(ids: List[str]) -> Dict[str, Dict]:
+    """Datos como los deja json.load: cada string es un objeto propio (no compartido)."""
+    data = {}
+    for n, property_id in enumerate(ids):
+        name = FILTER_NAMES[n % len(FILTER_NAMES)]
+        data[property_id] = {
+            "first_seen": f"2025-{n % 12 + 1:02d}-{n % 28 + 1:02d}T10:{n % 60:02d}:00.000000",
+            "last_seen": f"2025-{n % 12 + 1:02d}-{n % 28 + 1:02d}T11:{n % 60:02d}:00.000000",
+            "title": f"Casa en arriendo de {n % 5 + 3} dormitorios en Las Condes {n}",
+            "link": f"https://www.portalinmobiliario.com/{property_id}-casa-en-arriendo-las-condes-_JM",
+            "filter_name": "".join(name),
+            "filter_url": f"https://www.portalinmobiliario.com/arriendo/casa/_PriceRange_{n % 4}CLP-2000000CLP"
+        }
+    return data
+
+
+def legacy_dumps(data) -> bytes:
+    """El formato de antes: JSON indentado, con la lista de IDs repetida en "property_ids"."""
+    legacy = dict(data, property_ids=list(data["properties"]))
+    return json.dumps(legacy, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def timed(function, *args):
+    gc.collect()
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run(count: int, directory: Path):
+    print(f"\n=== {count:,} propiedades ===".replace(",", "."))
+    data = {
+        "properties": make_properties_data(make_ids(count)),
+        "count": count,
+        "last_updated": datetime.now().isoformat()
+    }
+
+    # (nombre, serializar, cargar): el formato de antes se cargaba con json.loads
+    candidates = [("json indentado (antes)", legacy_dumps, json.loads)]
+    candidates += [(name, serializers.get_serializer(name).dumps, serializers.loads)
+                   for name in serializers.available_formats()]
+
+    print(f"{'Formato':<24} {'guardar':>9} {'cargar':>9} {'MB':>9} {'vs. antes':>10}")
+    baseline = None
+    for name, dumps, loads in candidates:
+        path = directory / f"properties-{count}.{name.split()[0]}"
+
+        def save():
+            return write_atomic(path, dumps(data))
+
+        size, save_seconds = timed(save)
+        loaded, load_seconds = timed(lambda: loads(path.read_bytes()))
+        assert len(loaded["properties"]) == count
+        del loaded
+        path.unlink()
+
+        baseline = baseline or size
+        print(f"{name:<24} {save_seconds:>8.2f}s {load_seconds:>8.2f}s {size / 1e6:>9.1f} "
+              f"{size / baseline:>9.0%}")
+
+    missing = [name for name in serializers.FORMATS[1:] if name not in serializers.available_formats()]
+    if missing:
+        print(f"(no instalados: {', '.join(missing)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los formatos del almacenamiento")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Cantidades de propiedades a medir")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        for count in args.sizes:
+            run(count, Path(directory))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Watchdog de memoria de Chrome.
+Mide el RSS de cada navegador del pool (chromedriver + Chrome + sus procesos hijos) en un
+thread de fondo y recicla el driver que supera el límite configurado, para que la memoria
+no crezca sin techo en procesos de larga duración (y el contenedor no muera por OOM).
+Además permite matar el árbol de procesos de un driver cuando una carga de página se cuelga
+más allá del timeout de Selenium.
+
+Lee /proc (Linux, como en el contenedor). En otros sistemas usa psutil si está instalado;
+si no, el watchdog queda deshabilitado.
+"""
+import os
+import signal
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import metrics
+
+try:
+    import psutil
+except ImportError:  # Opcional: solo hace falta fuera de Linux
+    psutil = None
+
+_PROC = Path("/proc")
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def driver_pid(driver) -> Optional[int]:
+    """PID del proceso chromedriver del driver (raíz del árbol de Chrome), o None."""
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+def _children_map() -> Dict[int, List[int]]:
+    """PID padre -> PIDs hijos, leyendo /proc/<pid>/stat."""
+    children: Dict[int, List[int]] = {}
+    for entry in _PROC.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue  # El proceso terminó mientras se recorría /proc
+        # El nombre del proceso va entre paréntesis y puede tener espacios: el PPID va después
+        fields = stat.rsplit(")", 1)[1].split()
+        children.setdefault(int(fields[1]), []).append(int(entry.name))
+    return children
+
+def process_tree(pid: int) -> List[int]:
+    """PIDs del proceso y todos sus descendientes."""
+    if _PROC.exists():
+        children = _children_map()
+        tree, pending = [], [pid]
+        while pending:
+            current = pending.pop()
+            tree.append(current)
+            pending.extend(children.get(current, []))
+        return tree
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            return [pid] + [child.pid for child in process.children(recursive=True)]
+        except psutil.Error:
+            return []
+    return []
+
+def _rss_bytes(pid: int) -> int:
+    if _PROC.exists():
+        try:
+            return int((_PROC / str(pid) / "statm").read_text().split()[1]) * _PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            return 0
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return 0
+    return 0
+
+def tree_rss_bytes(pid: int) -> int:
+    """RSS total (bytes) del proceso y sus descendientes (la memoria compartida se cuenta una vez por proceso)."""
+    return sum(_rss_bytes(p) for p in process_tree(pid))
+
+def kill_process_tree(pid: int) -> int:
+    """
+    Mata (SIGKILL) el proceso y todos sus descendientes, primero los hijos.
+
+    Returns:
+        Cantidad de procesos a los que se envió la señal
+    """
+    killed = 0
+    for p in reversed(process_tree(pid)):
+        try:
+            os.kill(p, signal.SIGKILL)
+            killed += 1
+        except (ProcessLookupError, PermissionError):
+            pass
+    return killed
+
+def monitoring_available() -> bool:
+    return _PROC.exists() or psutil is not None
+
+@contextmanager
+def hard_timeout(driver, seconds: float, label: str = "driver.get"):
+    """
+    Mata el árbol de procesos del driver si el bloque tarda más de `seconds`.
+    Selenium no siempre respeta set_page_load_timeout (por ejemplo, con el renderer colgado):
+    al matar Chrome, la llamada bloqueada falla de inmediato y el driver se descarta.
+    """
+    pid = driver_pid(driver)
+    if not seconds or pid is None:
+        yield
+        return
+
+    def kill():
+        print(f"💀 {label} colgado más de {seconds:.0f}s: matando Chrome (PID {pid})")
+        metrics.inc("chrome_hard_kills")
+        kill_process_tree(pid)
+
+    timer = threading.Timer(seconds, kill)
+    timer.daemon = True
+    timer.start()
+    try:
+        yield
+    finally:
+        timer.cancel()
+
+
+class ChromeWatchdog:
+    """
+    Thread de fondo que mide la memoria de los drivers del pool.
+
+    - Sobre `limit_mb`: el driver se recicla (de inmediato si está ocioso, al devolverlo si está en uso).
+    - Sobre `limit_mb * kill_factor` estando en uso: se mata su árbol de procesos, para que
+      un solo Chrome desbocado no tumbe todo el proceso por OOM.
+    """
+
+    def __init__(self, pool, limit_mb: float, interval_seconds: float = 15, kill_factor: float = 1.5):
+        self.pool = pool
+        self.limit_bytes = limit_mb * 1024 * 1024
+        self.interval_seconds = max(1.0, interval_seconds)
+        self.kill_factor = kill_factor
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        """Inicia el thread de fondo. Retorna False si no hay forma de medir memoria."""
+        if self._thread is not None:
+            return True
+        if not self.limit_bytes or not monitoring_available():
+            return False
+        self._thread = threading.Thread(target=self._run, name="chrome-watchdog", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"⚠ Error en el watchdog de memoria: {e}")
+
+    def check(self) -> int:
+        """
+        Mide todos los drivers y aplica los límites.
+
+        Returns:
+            RSS total (bytes) de todos los navegadores
+        """
+        total = 0
+        for driver, busy in self.pool.drivers():
+            pid = driver_pid(driver)
+            if pid is None:
+                continue
+            rss = tree_rss_bytes(pid)
+            total += rss
+            if rss <= self.limit_bytes:
+                continue
+
+            rss_mb = rss / 1024 / 1024
+            if busy and rss > self.limit_bytes * self.kill_factor:
+                print(f"💀 Chrome usa {rss_mb:.0f} MB en plena carga: matando el proceso")
+                metrics.inc("chrome_hard_kills")
+                kill_process_tree(pid)
+            elif self.pool.mark_for_recycle(driver):
+                print(f"♻️ Chrome usa {rss_mb:.0f} MB (límite {self.limit_bytes / 1024 / 1024:.0f} MB): se recicla")
+                metrics.inc("chrome_memory_recycles")
+
+        metrics.gauge("chrome_rss_bytes", total)
+        return total
@@ -18,6 +18,164 @@ RECIPIENTS = [email.strip() for email in RECIPIENTS if email.strip()]
 
 # ============ CONFIGURACIÓN DE MONITOREO ============
 CHECK_INTERVAL_MINUTES = int(os.getenv("CHECK_INTERVAL_MINUTES", "5"))
+# Cantidad máxima de filtros que se scrapean al mismo tiempo en cada verificación
+MAX_CONCURRENT_SCRAPES = int(os.getenv("MAX_CONCURRENT_SCRAPES", "1"))
+# Agrupar filtros que solo difieren en el rango de precio en una sola búsqueda (se reparten localmente).
+# Desactivado por defecto: el sitio resuelve cada filtro por separado
+QUERY_COALESCING = os.getenv("QUERY_COALESCING", "false").lower() in ("1", "true", "yes")
+# Valor aproximado de la UF en pesos, para repartir precios en UF entre filtros con rangos en CLP.
+# Es una aproximación (la UF cambia a diario): actualízalo de vez en cuando (ver README)
+UF_CLP_VALUE = float(os.getenv("UF_CLP_VALUE", "39000"))
+
+# ============ INTERVALOS ADAPTATIVOS ============
+# Ajustar el intervalo de cada filtro según cuántas propiedades nuevas trae (historia en el almacenamiento).
+# Desactivado por defecto: todos los filtros se verifican cada CHECK_INTERVAL_MINUTES
+ADAPTIVE_POLLING = os.getenv("ADAPTIVE_POLLING", "false").lower() in ("1", "true", "yes")
+# Piso y techo del intervalo de cada filtro (minutos)
+POLL_MIN_MINUTES = float(os.getenv("POLL_MIN_MINUTES", str(CHECK_INTERVAL_MINUTES)))
+POLL_MAX_MINUTES = float(os.getenv("POLL_MAX_MINUTES", "120"))
+# Propiedades nuevas esperadas por verificación (menor = verificaciones más frecuentes)
+POLL_TARGET_NEW_PER_CHECK = float(os.getenv("POLL_TARGET_NEW_PER_CHECK", "0.5"))
+# Días de historia usados para estimar la tasa de llegada
+POLL_HISTORY_DAYS = float(os.getenv("POLL_HISTORY_DAYS", "7"))
+# Máximo de scrapings por hora entre todos los filtros (0 = sin límite)
+SCRAPE_BUDGET_PER_HOUR = float(os.getenv("SCRAPE_BUDGET_PER_HOUR", "0"))
+
+# ============ REINTENTOS Y CIRCUIT BREAKER ============
+# Intentos por página (timeouts, caídas de Chrome y páginas vacías); la espera entre intentos
+# crece exponencialmente desde RETRY_BASE_SECONDS hasta RETRY_MAX_SECONDS, con jitter
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_SECONDS = float(os.getenv("RETRY_BASE_SECONDS", "2"))
+RETRY_MAX_SECONDS = float(os.getenv("RETRY_MAX_SECONDS", "60"))
+# Ciclos fallidos seguidos para dejar de scrapear un filtro (circuito abierto)
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+# Tiempo sin scrapear un filtro con el circuito abierto (se duplica en cada apertura seguida, hasta el máximo)
+BREAKER_COOLDOWN_MINUTES = float(os.getenv("BREAKER_COOLDOWN_MINUTES", "30"))
+BREAKER_MAX_COOLDOWN_MINUTES = float(os.getenv("BREAKER_MAX_COOLDOWN_MINUTES", "360"))
+BREAKER_FILE = os.getenv("BREAKER_FILE", "data/circuit_breakers.json")
+
+# ============ PLANIFICADOR ============
+# Retraso aleatorio máximo (segundos) agregado a cada verificación, para no consultar siempre al mismo segundo
+SCHEDULE_JITTER_SECONDS = float(os.getenv("SCHEDULE_JITTER_SECONDS", "0"))
+# Si una verificación dura más que el intervalo: "coalesce" (una sola ejecución inmediata
+# por todas las perdidas) o "skip" (esperar al próximo horario)
+MISSED_RUN_POLICY = os.getenv("MISSED_RUN_POLICY", "coalesce").lower()
+
+# ============ MODO DE OBTENCIÓN ============
+# "selenium": renderiza la página en Chrome
+# "http": descarga el HTML y lee el JSON embebido (sin navegador; usa Selenium si falta el JSON)
+FETCH_MODE = os.getenv("FETCH_MODE", "selenium").lower()
+
+# Motor de extracción del HTML: "lxml" (un recorrido por tarjeta) o "bs4" (BeautifulSoup, el original)
+PARSER_BACKEND = os.getenv("PARSER_BACKEND", "lxml").lower()
+# Alcance del parseo: "results" (solo el contenedor de resultados, menos memoria y CPU) o "full"
+PARSE_SCOPE = os.getenv("PARSE_SCOPE", "results").lower()
+
+# ============ PAGINACIÓN ============
+MAX_PAGES = int(os.getenv("MAX_PAGES", "5"))  # Máximo de páginas de resultados por filtro
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "48"))  # Resultados por página en Portal Inmobiliario
+PAGE_FETCH_CONCURRENCY = int(os.getenv("PAGE_FETCH_CONCURRENCY", "2"))  # Páginas obtenidas en paralelo
+
+# ============ CONFIGURACIÓN DEL NAVEGADOR ============
+# Cantidad máxima de navegadores Chrome vivos en el pool (se reutilizan entre filtros y ciclos)
+# Por defecto uno por cada filtro que se puede scrapear en paralelo
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", str(MAX_CONCURRENT_SCRAPES)))
+# Páginas que carga un navegador antes de reciclarlo (evita que Chrome crezca indefinidamente)
+DRIVER_MAX_PAGES = int(os.getenv("DRIVER_MAX_PAGES", "20"))
+# Timeout de carga de página en segundos
+PAGE_LOAD_TIMEOUT = int(os.getenv("PAGE_LOAD_TIMEOUT", "60"))
+# Si driver.get sigue colgado este tiempo después del timeout de carga, se mata Chrome
+HARD_KILL_GRACE_SECONDS = float(os.getenv("HARD_KILL_GRACE_SECONDS", "30"))
+# Límite de memoria (MB) de cada navegador (Chrome + procesos hijos) antes de reciclarlo. 0 = sin límite
+CHROME_MEMORY_LIMIT_MB = float(os.getenv("CHROME_MEMORY_LIMIT_MB", "1024"))
+# Cada cuántos segundos se mide la memoria de los navegadores
+CHROME_MEMORY_CHECK_SECONDS = float(os.getenv("CHROME_MEMORY_CHECK_SECONDS", "15"))
+# Crear en segundo plano el reemplazo de un navegador reciclado (y uno al empezar el ciclo),
+# para que el arranque de Chrome se solape con el parseo en vez de sumarse
+DRIVER_PREWARM = os.getenv("DRIVER_PREWARM", "true").lower() in ("1", "true", "yes")
+# Scrapeando de a una búsqueda: cargar la siguiente mientras se parsea y compara la actual
+PREFETCH_NEXT_SEARCH = os.getenv("PREFETCH_NEXT_SEARCH", "true").lower() in ("1", "true", "yes")
+# Modo multipestaña: cargar las búsquedas como pestañas de un solo navegador (hasta N a la vez)
+# en vez de un Chrome por búsqueda. 1 = deshabilitado
+MAX_TABS_PER_DRIVER = int(os.getenv("MAX_TABS_PER_DRIVER", "1"))
+
+# Espera adaptativa de resultados (en segundos): se termina apenas la página está lista
+READY_MIN_SECONDS = float(os.getenv("READY_MIN_SECONDS", "0.5"))  # Espera mínima tras la carga
+READY_MAX_SECONDS = float(os.getenv("READY_MAX_SECONDS", "15"))  # Espera máxima por el primer resultado
+SCROLL_MAX_SECONDS = float(os.getenv("SCROLL_MAX_SECONDS", "10"))  # Presupuesto total de scroll
+SCROLL_SETTLE_SECONDS = float(os.getenv("SCROLL_SETTLE_SECONDS", "1.0"))  # Espera por tarjetas nuevas tras cada scroll
+
+# Bloqueo de recursos a nivel de red (CDP Network.setBlockedURLs). Patrones con comodines '*'.
+# Por defecto: fuentes, CSS, imágenes, tiles del mapa (_DisplayType_M), publicidad y analítica.
+DEFAULT_BLOCKED_URL_PATTERNS = [
+    # Fuentes y estilos
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*.css",
+    # Imágenes y multimedia (incluye las fotos del CDN http2.mlstatic.com)
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.svg", "*.ico", "*.mp4", "*.webm",
+    # Mapas (la vista _DisplayType_M carga tiles de Google Maps)
+    "*maps.googleapis.com*", "*maps.gstatic.com*", "*khms*.google.com*", "*mt*.google.com/vt*",
+    # Analítica, tracking y publicidad
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*googleadservices.com*", "*facebook.net*", "*facebook.com/tr*", "*hotjar.com*", "*clarity.ms*",
+    "*mercadolibre.com/tracks*", "*mercadolibre.com/melidata*", "*/melidata/*", "*adsrv*", "*mercadoclics*",
+]
+BLOCK_RESOURCES = os.getenv("BLOCK_RESOURCES", "true").lower() in ("1", "true", "yes")
+BLOCKED_URL_PATTERNS = (
+    [p.strip() for p in os.getenv("BLOCKED_URL_PATTERNS", "").split(",") if p.strip()]
+    or DEFAULT_BLOCKED_URL_PATTERNS
+) if BLOCK_RESOURCES else []
+# Medir los bytes transferidos por página (usa el log de performance de Chrome, que tiene su
+# costo en cada página: solo para diagnóstico)
+TRACK_PAGE_BYTES = os.getenv("TRACK_PAGE_BYTES", "false").lower() in ("1", "true", "yes")
+
+# ============ MÉTRICAS ============
+# Endpoint HTTP local con métricas en formato Prometheus (/metrics) y JSON (/metrics.json).
+# 0 = deshabilitado (por defecto); por ejemplo, 9108 para activarlo
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# Archivo JSON Lines con el resumen de cada ciclo (vacío = no guardar, por defecto)
+METRICS_FILE = os.getenv("METRICS_FILE", "")
+# Tamaño máximo del archivo de métricas (bytes): al superarlo pasa a METRICS_FILE.1 y se empieza otro
+METRICS_FILE_MAX_BYTES = int(os.getenv("METRICS_FILE_MAX_BYTES", str(10 * 1024 * 1024)))
+
+# ============ ALMACENAMIENTO ============
+# Backend de las propiedades vistas: "json" (un archivo que se reescribe completo),
+# "sqlite" (base indexada) o "journal" (foto + diario de solo-agregar con compactación).
+# SQLite y el diario importan el JSON existente la primera vez
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json").lower()
+STORAGE_FILE = os.getenv("STORAGE_FILE", "data/properties-seen.json")
+STORAGE_DB_FILE = os.getenv("STORAGE_DB_FILE", "data/properties-seen.db")
+# Formato del archivo (json) y de la foto (journal): "auto" (el JSON compacto más rápido
+# instalado), "json", "orjson", "msgspec" o "msgpack" (binario). Al cargar se detecta solo
+STORAGE_FORMAT = os.getenv("STORAGE_FORMAT", "auto").lower()
+# Filas por sentencia en las consultas y escrituras en lote de SQLite
+STORAGE_BATCH_SIZE = int(os.getenv("STORAGE_BATCH_SIZE", "500"))
+# Backend "journal": foto, diario y tamaño del diario (bytes) que dispara la compactación
+STORAGE_SNAPSHOT_FILE = os.getenv("STORAGE_SNAPSHOT_FILE", "data/properties-seen.snapshot.json")
+STORAGE_JOURNAL_FILE = os.getenv("STORAGE_JOURNAL_FILE", "data/properties-seen.journal.jsonl")
+STORAGE_COMPACT_BYTES = int(os.getenv("STORAGE_COMPACT_BYTES", str(1024 * 1024)))
+
+# ============ RETENCIÓN ============
+# Las propiedades sin ver hace más de RETENTION_DAYS días se archivan en un archivo comprimido
+# y quedan solo como ID compacto ("lápida") para no volver a notificarlas (0 = sin retención,
+# el valor por defecto). Debe ser mayor que POLL_HISTORY_DAYS: el intervalo adaptativo usa la
+# historia reciente
+RETENTION_DAYS = float(os.getenv("RETENTION_DAYS", "0"))
+RETENTION_ARCHIVE_FILE = os.getenv("RETENTION_ARCHIVE_FILE", "data/properties-archive.jsonl.gz")
+RETENTION_TOMBSTONE_FILE = os.getenv("RETENTION_TOMBSTONE_FILE", "data/properties-tombstones.bin")
+# Último recorrido completo de cada filtro: solo se archiva lo que un recorrido completo no encontró
+RETENTION_CRAWL_FILE = os.getenv("RETENTION_CRAWL_FILE", "data/properties-crawls.json")
+# Propiedades archivadas por lote y minutos entre pases del thread de fondo
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+RETENTION_INTERVAL_MINUTES = float(os.getenv("RETENTION_INTERVAL_MINUTES", "60"))
+
+# ============ HUELLAS DE CONTENIDO ============
+# Omitir el parseo y la comparación de una búsqueda de una sola página si no cambió desde el
+# ciclo anterior. Desactivado por defecto: cada búsqueda se procesa completa en todos los ciclos
+FINGERPRINTING = os.getenv("FINGERPRINTING", "false").lower() in ("1", "true", "yes")
+FINGERPRINT_FILE = os.getenv("FINGERPRINT_FILE", "data/fingerprints.json")
+# Cada cuántas horas se procesa igual una búsqueda completa aunque su huella no cambie
+FINGERPRINT_MAX_AGE_HOURS = float(os.getenv("FINGERPRINT_MAX_AGE_HOURS", "24"))
 
 # URL única (para compatibilidad hacia atrás) - se usa si no hay múltiples filtros
 SEARCH_URL = os.getenv(
@@ -49,10 +207,14 @@ def load_search_filters():
                 validated_filters = []
                 for i, filter_item in enumerate(filters):
                     if isinstance(filter_item, dict) and "name" in filter_item and "url" in filter_item:
-                        validated_filters.append({
+                        validated_filter = {
                             "name": filter_item["name"],
                             "url": filter_item["url"]
-                        })
+                        }
+                        # Horario propio (opcional): minutos o expresión cron
+                        if filter_item.get("schedule"):
+                            validated_filter["schedule"] = filter_item["schedule"]
+                        validated_filters.append(validated_filter)
                     else:
                         print(f"⚠️ Advertencia: Filtro {i+1} ignorado (falta 'name' o 'url')")
                 return validated_filters if validated_filters else None
@@ -129,6 +291,30 @@ def validate_config(search_filters=None):
         for i, filter_item in enumerate(filters_to_validate):
             if not filter_item.get("url"):
                 errors.append(f"Filtro {i+1} ({filter_item.get('name', 'Sin nombre')}) no tiene URL")
+            if filter_item.get("schedule"):
+                from scheduler import parse_schedule
+                try:
+                    parse_schedule(filter_item["schedule"])
+                except ValueError as e:
+                    errors.append(f"Filtro {i+1} ({filter_item.get('name', 'Sin nombre')}) tiene un horario inválido: {e}")
+    
+    if STORAGE_BACKEND not in ("json", "sqlite", "journal"):
+        errors.append("STORAGE_BACKEND debe ser json, sqlite o journal")
+    
+    from serializers import get_serializer
+    try:
+        get_serializer(STORAGE_FORMAT)
+    except ValueError as e:
+        errors.append(str(e))
+    
+    if RETENTION_DAYS < 0:
+        errors.append("RETENTION_DAYS debe ser mayor o igual a 0")
+    elif 0 < RETENTION_DAYS <= POLL_HISTORY_DAYS:
+        errors.append("RETENTION_DAYS debe ser mayor que POLL_HISTORY_DAYS (o 0 para deshabilitarla)")
+    
+    from scheduler import MISSED_RUN_POLICIES
+    if MISSED_RUN_POLICY not in MISSED_RUN_POLICIES:
+        errors.append(f"MISSED_RUN_POLICY debe ser {' o '.join(MISSED_RUN_POLICIES)}")
     
     if errors:
         raise ValueError(f"Errores de configuración: {', '.join(errors)}")
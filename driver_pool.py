@@ -0,0 +1,254 @@
+"""
+Pool de drivers de Selenium reutilizables.
+Mantiene navegadores Chrome "calientes" entre filtros y entre ciclos de monitoreo,
+para no pagar el arranque completo de Chromium en cada scraping.
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class DriverPool:
+    """
+    Pool de drivers de Selenium con chequeo de salud y reciclaje.
+
+    - Reutiliza drivers ociosos (uno por modo headless/no headless).
+    - Antes de entregar un driver verifica que siga vivo con un ping de JavaScript.
+    - Recicla un driver después de `max_pages` páginas o si falló durante su uso.
+    - Limita el total de drivers vivos a `max_size` (los demás esperan su turno).
+    - `mark_for_recycle` permite reciclar un driver desde afuera (por ejemplo, el watchdog
+      de memoria de chrome_watchdog.py).
+    - `prewarm` crea un driver en segundo plano si hay cupo; con `keep_warm`, cada driver
+      reciclado se reemplaza así, mientras el llamador sigue parseando.
+    """
+
+    def __init__(self, driver_factory: Callable, max_size: int = 1, max_pages: int = 20,
+                 page_load_timeout: int = 60, keep_warm: bool = False):
+        """
+        Args:
+            driver_factory: Función que crea un driver nuevo (recibe `headless`)
+            max_size: Número máximo de drivers vivos al mismo tiempo
+            max_pages: Páginas que puede cargar un driver antes de reciclarlo
+            page_load_timeout: Timeout de carga de página (segundos) para drivers nuevos
+            keep_warm: Reemplazar en segundo plano los drivers reciclados
+        """
+        self.driver_factory = driver_factory
+        self.max_size = max(1, max_size)
+        self.max_pages = max(1, max_pages)
+        self.page_load_timeout = page_load_timeout
+        self.keep_warm = keep_warm
+
+        self._lock = threading.Condition()
+        self._idle: List = []  # Drivers ociosos listos para reutilizar
+        self._info: Dict[int, Dict] = {}  # id(driver) -> {'driver', 'headless', 'pages', 'created_at', 'recycle'}
+        self._creating = 0  # Cupos reservados para drivers que se están creando
+        self._closed = False
+
+        self.stats = {"created": 0, "reused": 0, "recycled": 0, "failed_health_checks": 0, "prewarmed": 0}
+
+    def _total_drivers(self) -> int:
+        return len(self._info) + self._creating
+
+    def _create_driver(self, headless: bool):
+        """Crea un driver nuevo y lo registra en el pool."""
+        driver = self.driver_factory(headless=headless)
+        driver.set_page_load_timeout(self.page_load_timeout)
+        with self._lock:
+            self._info[id(driver)] = {
+                "driver": driver, "headless": headless, "pages": 0, "created_at": time.time(), "recycle": False
+            }
+            self.stats["created"] += 1
+        return driver
+
+    def _quit_driver(self, driver):
+        """Cierra un driver y lo elimina del registro (sin lanzar excepciones)."""
+        with self._lock:
+            self._info.pop(id(driver), None)
+            self._lock.notify()
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def is_healthy(driver) -> bool:
+        """Ping liviano: verifica que el navegador siga respondiendo."""
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def acquire(self, headless: bool = True, timeout: Optional[float] = None):
+        """
+        Obtiene un driver del pool (reutilizado si hay uno sano, nuevo si no).
+
+        Args:
+            headless: Modo del navegador requerido
+            timeout: Segundos máximos a esperar si el pool está lleno (None = sin límite)
+
+        Returns:
+            WebDriver listo para usar
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while True:
+            candidate = None
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("El pool de drivers está cerrado")
+
+                for driver in self._idle:
+                    if self._info.get(id(driver), {}).get("headless") == headless:
+                        candidate = driver
+                        break
+
+                if candidate is not None:
+                    self._idle.remove(candidate)
+                elif self._idle and self._total_drivers() >= self.max_size:
+                    # Hay drivers ociosos pero de otro modo: liberar uno para hacer espacio
+                    self._quit_idle_locked(self._idle.pop(0))
+                    continue
+                elif self._total_drivers() < self.max_size:
+                    # Reservar el cupo antes de crear el driver fuera del lock
+                    self._creating += 1
+                else:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("No hay drivers disponibles en el pool")
+                    self._lock.wait(remaining)
+                    continue
+
+            if candidate is not None:
+                if self.is_healthy(candidate):
+                    self.stats["reused"] += 1
+                    return candidate
+                print("⚠ Driver del pool no responde, creando uno nuevo...")
+                self.stats["failed_health_checks"] += 1
+                self._quit_driver(candidate)
+                continue
+
+            # Crear driver nuevo en el cupo reservado
+            try:
+                return self._create_driver(headless)
+            finally:
+                with self._lock:
+                    self._creating -= 1
+                    self._lock.notify()
+
+    def _quit_idle_locked(self, driver):
+        """Cierra un driver ocioso estando dentro del lock."""
+        self._info.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def release(self, driver, pages: int = 1, failed: bool = False):
+        """
+        Devuelve un driver al pool.
+
+        Args:
+            driver: Driver obtenido con `acquire`
+            pages: Páginas cargadas durante este préstamo
+            failed: Si True, el driver se descarta (por ejemplo, tras un crash)
+        """
+        if driver is None:
+            return
+
+        with self._lock:
+            info = self._info.get(id(driver))
+            if info is not None:
+                info["pages"] += pages
+            recycle = (
+                failed
+                or self._closed
+                or info is None
+                or info["pages"] >= self.max_pages
+                or info["recycle"]
+            )
+            if not recycle:
+                self._idle.append(driver)
+                self._lock.notify()
+                return
+
+        if not failed and info is not None and not self._closed and not info["recycle"]:
+            print(f"♻️ Reciclando driver tras {info['pages']} página(s)")
+        self.stats["recycled"] += 1
+        self._quit_driver(driver)
+        if self.keep_warm and info is not None:
+            self.prewarm(info["headless"])
+
+    def prewarm(self, headless: bool = True) -> bool:
+        """
+        Crea un driver en un thread de fondo y lo deja ocioso en el pool, para que el próximo
+        `acquire` no espere el arranque de Chrome.
+        No hace nada si ya hay un driver ocioso de ese modo o si el pool está lleno.
+
+        Returns:
+            True si se empezó a crear un driver
+        """
+        with self._lock:
+            if self._closed or self._total_drivers() >= self.max_size:
+                return False
+            if any(self._info.get(id(d), {}).get("headless") == headless for d in self._idle):
+                return False
+            self._creating += 1
+
+        def create():
+            try:
+                driver = self._create_driver(headless)
+            except Exception as e:
+                print(f"⚠ No se pudo precalentar un navegador: {e}")
+                return
+            finally:
+                with self._lock:
+                    self._creating -= 1
+                    self._lock.notify()
+            self.stats["prewarmed"] += 1
+            self.release(driver, pages=0)
+
+        threading.Thread(target=create, name="driver-prewarm", daemon=True).start()
+        return True
+
+    def drivers(self) -> List[Tuple]:
+        """Lista de (driver, en_uso) con todos los drivers vivos del pool."""
+        with self._lock:
+            idle = {id(driver) for driver in self._idle}
+            return [(info["driver"], key not in idle) for key, info in self._info.items()]
+
+    def mark_for_recycle(self, driver) -> bool:
+        """
+        Pide reciclar un driver: si está ocioso se cierra ya; si está en uso, al devolverlo.
+
+        Returns:
+            True si el pedido es nuevo (False si ya estaba marcado o el driver no existe)
+        """
+        with self._lock:
+            info = self._info.get(id(driver))
+            if info is None or info["recycle"]:
+                return False
+            info["recycle"] = True
+            idle = driver in self._idle
+            if idle:
+                self._idle.remove(driver)
+        if idle:
+            self.stats["recycled"] += 1
+            self._quit_driver(driver)
+            if self.keep_warm:
+                self.prewarm(info["headless"])
+        return True
+
+    def discard(self, driver):
+        """Descarta un driver que falló (equivalente a `release(driver, failed=True)`)."""
+        self.release(driver, pages=0, failed=True)
+
+    def shutdown(self):
+        """Cierra todos los drivers ociosos y marca el pool como cerrado."""
+        with self._lock:
+            self._closed = True
+            idle = self._idle
+            self._idle = []
+        for driver in idle:
+            self._quit_driver(driver)
+        if idle:
+            print(f"🔒 Pool de drivers cerrado ({len(idle)} navegador(es))")
@@ -8,6 +8,7 @@ from email.mime.multipart import MIMEMultipart
 from typing import List, Dict
 from datetime import datetime
 
+import metrics
 from config import GMAIL_USER, GMAIL_PASSWORD, RECIPIENTS
 
 def format_price(price: int, unit: str = None) -> str:
@@ -284,19 +285,22 @@ def send_email(properties: List[Dict], subject: str = None) -> bool:
         
         # Conectar al servidor SMTP de Gmail
         print(f"📧 Enviando email a {len(RECIPIENTS)} destinatario(s)...")
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(GMAIL_USER, GMAIL_PASSWORD)
-        
-        # Enviar email
-        text = msg.as_string()
-        server.sendmail(GMAIL_USER, RECIPIENTS, text)
-        server.quit()
+        with metrics.timer("smtp_send"):
+            server = smtplib.SMTP('smtp.gmail.com', 587)
+            server.starttls()
+            server.login(GMAIL_USER, GMAIL_PASSWORD)
+            
+            # Enviar email
+            text = msg.as_string()
+            server.sendmail(GMAIL_USER, RECIPIENTS, text)
+            server.quit()
+        metrics.inc("emails_sent")
         
         print(f"✓ Email enviado exitosamente a: {', '.join(RECIPIENTS)}")
         return True
         
     except smtplib.SMTPAuthenticationError as e:
+        metrics.inc("emails_failed")
         print(f"❌ Error de autenticación SMTP:")
         print(f"   Código de error: {e.smtp_code if hasattr(e, 'smtp_code') else 'N/A'}")
         print(f"   Mensaje: {e.smtp_error.decode() if hasattr(e, 'smtp_error') and e.smtp_error else str(e)}")
@@ -308,11 +312,13 @@ def send_email(properties: List[Dict], subject: str = None) -> bool:
         print(f"   5. Para obtener App Password: https://myaccount.google.com/apppasswords")
         return False
     except smtplib.SMTPException as e:
+        metrics.inc("emails_failed")
         print(f"❌ Error SMTP al enviar email:")
         print(f"   Tipo: {type(e).__name__}")
         print(f"   Mensaje: {e}")
         return False
     except Exception as e:
+        metrics.inc("emails_failed")
         print(f"❌ Error inesperado al enviar email:")
         print(f"   Tipo: {type(e).__name__}")
         print(f"   Mensaje: {e}")
@@ -0,0 +1,146 @@
+"""
+Huellas de contenido de las búsquedas.
+La huella de una búsqueda es un hash de la lista ordenada de IDs de su primera página.
+Si coincide con la del ciclo anterior, el listado no cambió y se puede omitir la extracción,
+el filtrado y la comparación con el almacenamiento de esa búsqueda.
+
+Solo se usa en búsquedas de una sola página: si hay más páginas, una propiedad nueva en la
+segunda no cambia la huella de la primera, así que esas búsquedas se procesan siempre.
+Junto con la huella se guardan los IDs de la página, para que una búsqueda omitida igual
+actualice el last_seen de sus propiedades (ver storage.touch_properties).
+
+Las huellas se guardan en data/fingerprints.json para que el atajo sobreviva reinicios.
+Una huella nueva queda pendiente hasta que el ciclo procesa la búsqueda y guarda sus
+propiedades nuevas, después de notificarlas (commit_pending): si el ciclo o el email fallan
+antes, la próxima verificación vuelve a procesarla completa.
+"""
+import hashlib
+import json
+import re
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from config import FINGERPRINT_FILE, FINGERPRINT_MAX_AGE_HOURS
+import metrics
+from storage_backends import write_json_atomic
+
+FINGERPRINTS_PATH = Path(FINGERPRINT_FILE)
+
+_ID_RE = re.compile(r'MLC-?\d+', re.IGNORECASE)
+
+_lock = threading.Lock()
+_fingerprints: Optional[Dict[str, Dict]] = None  # Cargadas desde el archivo al primer uso
+_pending: Dict[str, Dict] = {}  # Búsqueda -> {"fingerprint", "ids"} pendiente de confirmar
+
+def page_ids(html: str) -> List[str]:
+    """
+    IDs de las propiedades de una página de resultados sin parsearla, en orden de aparición
+    (sin repetir) dentro del contenedor de resultados, o de toda la página si no se
+    encuentra el contenedor. Con el mismo formato que scraper.extract_property_id ('MLC-123').
+    """
+    if not html:
+        return []
+
+    from scraper import slice_results_region
+
+    region = slice_results_region(html) or html
+    digits = dict.fromkeys(match.upper().replace('-', '')[3:] for match in _ID_RE.findall(region))
+    return [f"MLC-{number}" for number in digits]
+
+def compute_fingerprint(html: str, ids: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Calcula la huella de una página de resultados sin parsearla.
+
+    Args:
+        html: HTML de la página
+        ids: IDs ya extraídos con page_ids (para no volver a recorrer el HTML)
+
+    Returns:
+        Hash hexadecimal, o None si la página no tiene IDs (no se puede usar el atajo)
+    """
+    ids = page_ids(html) if ids is None else ids
+    if not ids:
+        return None
+    return hashlib.sha1("\n".join(pid.replace('-', '') for pid in ids).encode("utf-8")).hexdigest()
+
+def _load() -> Dict[str, Dict]:
+    """Carga las huellas guardadas (se llama con _lock tomado)."""
+    global _fingerprints
+    if _fingerprints is None:
+        _fingerprints = {}
+        if FINGERPRINTS_PATH.exists():
+            try:
+                with open(FINGERPRINTS_PATH, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    _fingerprints = data.get("fingerprints", {})
+            except (json.JSONDecodeError, IOError) as e:
+                print(f"Advertencia: No se pudo cargar el archivo de huellas: {e}")
+    return _fingerprints
+
+def is_unchanged(key: str, fingerprint: Optional[str], ids: Optional[List[str]] = None) -> bool:
+    """
+    Verifica si la búsqueda tiene la misma huella que en el último ciclo procesado.
+    Si cambió, la huella nueva (y sus IDs) queda pendiente hasta commit_pending.
+
+    Args:
+        key: Identificador de la búsqueda (su URL)
+        fingerprint: Huella de la página actual (None = siempre se considera cambiada)
+        ids: IDs de la página actual (se guardan con la huella)
+
+    Returns:
+        True si la huella coincide y no está vencida (FINGERPRINT_MAX_AGE_HOURS)
+    """
+    if fingerprint is None:
+        return False
+
+    with _lock:
+        saved = _load().get(key)
+        if saved and saved.get("fingerprint") == fingerprint:
+            try:
+                checked_at = datetime.fromisoformat(saved.get("checked_at", ""))
+            except ValueError:
+                checked_at = None
+            # Cada cierto tiempo se procesa igual la búsqueda completa, por seguridad
+            if checked_at and datetime.now() - checked_at < timedelta(hours=FINGERPRINT_MAX_AGE_HOURS):
+                metrics.inc("fingerprint_hits")
+                return True
+        _pending[key] = {"fingerprint": fingerprint, "ids": list(ids or [])}
+
+    metrics.inc("fingerprint_misses")
+    return False
+
+def saved_ids(key: str) -> List[str]:
+    """IDs de la página guardados con la última huella confirmada de la búsqueda."""
+    with _lock:
+        return list((_load().get(key) or {}).get("ids") or [])
+
+def commit_pending(keys: Optional[Iterable[str]] = None):
+    """
+    Guarda las huellas pendientes de las búsquedas ya procesadas.
+
+    Args:
+        keys: Búsquedas a confirmar (None = todas las pendientes)
+    """
+    with _lock:
+        keys = list(_pending) if keys is None else [k for k in keys if k in _pending]
+        if not keys:
+            return
+
+        fingerprints = _load()
+        now = datetime.now().isoformat()
+        for key in keys:
+            fingerprints[key] = dict(_pending.pop(key), checked_at=now)
+
+        try:
+            write_json_atomic(FINGERPRINTS_PATH, {"fingerprints": fingerprints}, indent=2)
+        except (IOError, OSError) as e:
+            print(f"Error: No se pudo guardar el archivo de huellas: {e}")
+
+def discard_pending(keys: Optional[Iterable[str]] = None):
+    """Descarta huellas pendientes (por ejemplo, de búsquedas que fallaron)."""
+    with _lock:
+        for key in (list(_pending) if keys is None else list(keys)):
+            _pending.pop(key, None)
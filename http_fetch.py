@@ -0,0 +1,304 @@
+"""
+Modo de obtención sin navegador para Portal Inmobiliario.
+Descarga el HTML del listado con una sesión HTTP reutilizable y extrae las propiedades
+directamente del JSON de estado embebido (__PRELOADED_STATE__), sin renderizar la página.
+"""
+import json
+import re
+import threading
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from scraper import extract_price, extract_property_id, is_no_results_page
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Formatos conocidos del bloque de estado embebido
+_STATE_SCRIPT_RE = re.compile(
+    r'<script[^>]*id=["\']__PRELOADED_STATE__["\'][^>]*>(.*?)</script>',
+    re.DOTALL | re.IGNORECASE
+)
+_STATE_ASSIGN_RE = re.compile(r'window\.__PRELOADED_STATE__\s*=\s*')
+
+# Monedas de Mercado Libre: CLF es la Unidad de Fomento
+_CURRENCY_UNITS = {"CLF": "UF", "UF": "UF", "CLP": "CLP"}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+def get_http_session() -> requests.Session:
+    """
+    Retorna una sesión HTTP global con pool de conexiones y reintentos.
+    Reutilizar la sesión mantiene las conexiones TLS abiertas entre filtros y ciclos.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            retry = Retry(total=2, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "User-Agent": USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml",
+                "Accept-Language": "es-CL,es;q=0.9"
+            })
+            _session = session
+        return _session
+
+def extract_preloaded_state(html: str) -> Optional[Dict]:
+    """
+    Extrae el JSON de estado embebido en el HTML del listado.
+
+    Returns:
+        Dict con el estado o None si la página no lo incluye
+    """
+    if not html:
+        return None
+
+    match = _STATE_SCRIPT_RE.search(html)
+    if match:
+        try:
+            return json.loads(match.group(1))
+        except json.JSONDecodeError:
+            pass
+
+    match = _STATE_ASSIGN_RE.search(html)
+    if match:
+        try:
+            # raw_decode lee exactamente un objeto JSON e ignora el resto del script
+            state, _ = json.JSONDecoder().raw_decode(html, match.end())
+            return state
+        except json.JSONDecodeError:
+            pass
+
+    return None
+
+def _collect_results(state, found: List[List]):
+    """Junta todas las listas "results" del estado (primero las de los niveles más altos)."""
+    if not isinstance(state, dict):
+        return
+    initial = state.get("initialState")
+    if isinstance(initial, dict) and isinstance(initial.get("results"), list):
+        found.append(initial["results"])
+    if isinstance(state.get("results"), list):
+        found.append(state["results"])
+    for value in state.values():
+        _collect_results(value, found)
+
+def _looks_like_result(item) -> bool:
+    return isinstance(item, dict) and any(key in item for key in ("polycard", "permalink", "id"))
+
+def _has_zero_results(state) -> bool:
+    """True si el estado declara explícitamente cero resultados (paging.total == 0)."""
+    if isinstance(state, dict):
+        paging = state.get("paging")
+        if isinstance(paging, dict) and paging.get("total") == 0:
+            return True
+        return any(_has_zero_results(value) for value in state.values())
+    return False
+
+def _find_results(state, no_results_page: bool = False) -> Optional[List]:
+    """
+    Busca la lista de resultados dentro del estado (la ruta exacta varía entre versiones del sitio).
+
+    Solo acepta una lista con resultados reconocibles; una lista vacía vale únicamente si el
+    estado declara cero resultados o la página trae el aviso de búsqueda sin resultados
+    (`no_results_page`). En cualquier otro caso retorna None (el llamador usa Selenium).
+    """
+    candidates: List[List] = []
+    _collect_results(state, candidates)
+    for results in candidates:
+        if results and any(_looks_like_result(item) for item in results):
+            return results
+    if candidates and (no_results_page or _has_zero_results(state)):
+        return []
+    return None
+
+def _first_int(text: str) -> Optional[int]:
+    match = re.search(r'(\d+)', (text or '').replace('.', '').replace(',', ''))
+    return int(match.group(1)) if match else None
+
+def _parse_attribute_texts(texts: List[str], prop: Dict):
+    """Completa dormitorios, baños y superficie desde textos como '4 dormitorios'."""
+    for text in texts:
+        lowered = (text or '').lower()
+        if 'dormitorio' in lowered and prop['bedrooms'] is None:
+            prop['bedrooms'] = _first_int(lowered)
+        elif 'baño' in lowered and prop['bathrooms'] is None:
+            prop['bathrooms'] = _first_int(lowered)
+        elif 'm²' in lowered and prop['area'] is None:
+            prop['area'] = _first_int(lowered)
+
+def _price_from_amount(amount, currency: Optional[str]):
+    """Convierte un monto numérico del JSON a (precio, unidad) como extract_price (0 = sin precio)."""
+    if amount is None:
+        return None, None
+    try:
+        price = int(round(float(amount)))
+    except (TypeError, ValueError):
+        return extract_price(str(amount))
+    if price <= 0:
+        return None, None
+    return price, _CURRENCY_UNITS.get((currency or 'CLP').upper(), 'CLP')
+
+def result_to_property(result: Dict) -> Optional[Dict]:
+    """
+    Convierte un resultado del JSON embebido al mismo dict que produce extract_property_info.
+    Soporta el formato "polycard" actual y el formato plano anterior.
+    """
+    if not isinstance(result, dict):
+        return None
+
+    prop = {
+        'id': None,
+        'title': "Propiedad sin título",
+        'price': None,
+        'price_unit': None,
+        'location': "",
+        'link': None,
+        'bedrooms': None,
+        'bathrooms': None,
+        'area': None
+    }
+
+    polycard = result.get("polycard")
+    if isinstance(polycard, dict):
+        metadata = polycard.get("metadata", {}) or {}
+        link = metadata.get("url") or ""
+        if link and not link.startswith("http"):
+            link = "https://" + link.lstrip("/")
+        prop['link'] = link
+
+        for component in polycard.get("components", []) or []:
+            ctype = component.get("type")
+            if ctype == "title":
+                prop['title'] = (component.get("title") or {}).get("text") or prop['title']
+            elif ctype == "price":
+                current = (component.get("price") or {}).get("current_price") or {}
+                prop['price'], prop['price_unit'] = _price_from_amount(
+                    current.get("value"), current.get("currency")
+                )
+            elif ctype == "location":
+                prop['location'] = (component.get("location") or {}).get("text") or ""
+            elif ctype == "attributes_list":
+                texts = (component.get("attributes_list") or {}).get("texts") or []
+                _parse_attribute_texts(texts, prop)
+
+        prop['id'] = extract_property_id(link) or extract_property_id(metadata.get("id", ""))
+    else:
+        link = result.get("permalink") or result.get("url") or ""
+        prop['link'] = link
+        prop['title'] = result.get("title") or prop['title']
+
+        price = result.get("price")
+        if isinstance(price, dict):
+            prop['price'], prop['price_unit'] = _price_from_amount(
+                price.get("amount"), price.get("currency_id")
+            )
+        elif price is not None:
+            prop['price'], prop['price_unit'] = _price_from_amount(price, result.get("currency_id"))
+
+        location = result.get("location")
+        if isinstance(location, dict):
+            prop['location'] = location.get("address_line") or location.get("text") or ""
+        elif isinstance(location, str):
+            prop['location'] = location
+
+        texts = []
+        for attribute in result.get("attributes", []) or []:
+            if isinstance(attribute, dict):
+                texts.append(f"{attribute.get('value_name', '')} {attribute.get('name', '')}")
+            elif isinstance(attribute, str):
+                texts.append(attribute)
+        _parse_attribute_texts(texts, prop)
+
+        prop['id'] = extract_property_id(link) or extract_property_id(str(result.get("id", "")))
+
+    if not prop['id'] or not prop['link']:
+        return None
+
+    return prop
+
+def extract_properties_from_state(state: Dict, no_results_page: bool = False) -> Optional[List[Dict]]:
+    """
+    Extrae las propiedades del estado embebido.
+
+    Args:
+        state: Estado embebido
+        no_results_page: La página trae el aviso de búsqueda sin resultados
+
+    Returns:
+        Lista de propiedades (sin duplicados), o None si el estado no tiene resultados
+        reconocibles o ninguno se pudo convertir
+    """
+    results = _find_results(state, no_results_page)
+    if results is None:
+        return None
+
+    properties = []
+    seen_ids = set()
+    for result in results:
+        prop = result_to_property(result)
+        if prop and prop['id'] not in seen_ids:
+            seen_ids.add(prop['id'])
+            properties.append(prop)
+    if results and not properties:
+        return None
+    return properties
+
+def fetch_listing_html(url: str, timeout: int = 20) -> Optional[str]:
+    """
+    Descarga el HTML de un listado con la sesión compartida.
+
+    Returns:
+        HTML de la página, o None si la petición falló
+    """
+    try:
+        response = get_http_session().get(url, timeout=timeout)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"⚠ Error HTTP al obtener el listado: {e}")
+        return None
+    return response.text
+
+def properties_from_listing_html(html: str) -> Optional[List[Dict]]:
+    """
+    Extrae las propiedades del JSON embebido en el HTML de un listado.
+
+    Returns:
+        Lista de propiedades (vacía solo si la página declara cero resultados), o None si la
+        página no incluye el JSON embebido o sus resultados no se reconocen
+    """
+    state = extract_preloaded_state(html)
+    if state is None:
+        print("⚠ La página no incluye el JSON de estado embebido")
+        return None
+
+    # Una lista vacía sin aviso de "sin resultados" es sospechosa (igual que en Selenium)
+    properties = extract_properties_from_state(state, no_results_page=is_no_results_page(html))
+    if properties is None:
+        print("⚠ El JSON embebido no trae resultados reconocibles")
+    return properties
+
+def fetch_properties_http(url: str, timeout: int = 20) -> Optional[List[Dict]]:
+    """
+    Obtiene las propiedades de un listado sin navegador.
+
+    Args:
+        url: URL de búsqueda de Portal Inmobiliario
+        timeout: Timeout de la petición HTTP en segundos
+
+    Returns:
+        Lista de propiedades, o None si no se pudo obtener el JSON embebido
+        (en ese caso el llamador debe usar Selenium)
+    """
+    html = fetch_listing_html(url, timeout=timeout)
+    if html is None:
+        return None
+
+    return properties_from_listing_html(html)
@@ -0,0 +1,229 @@
+"""
+Extractor de propiedades sobre el árbol de lxml (sin BeautifulSoup).
+Encuentra las tarjetas con XPath precompilado y obtiene todos los campos de cada tarjeta
+en un solo recorrido, en vez de hacer un select_one por campo.
+
+Reproduce la semántica del extractor de BeautifulSoup (scraper.extract_property_info):
+para cada campo se usa el primer descendiente, en orden de documento, que coincide
+con alguno de sus selectores.
+"""
+import re
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urljoin
+
+from lxml import etree, html as lxml_html
+
+import metrics
+from scraper import extract_price, extract_property_id, slice_results_region
+
+def _has_class_xpath(tag: str, css_class: str) -> str:
+    return f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {css_class} ')]"
+
+# Tarjetas de resultados (equivalente a 'li.ui-search-layout__item, article.ui-search-result, div.ui-search-result')
+ITEMS_XPATH = etree.XPath(" | ".join([
+    _has_class_xpath("li", "ui-search-layout__item"),
+    _has_class_xpath("article", "ui-search-result"),
+    _has_class_xpath("div", "ui-search-result"),
+]))
+# Respaldo (equivalente a 'div[data-item-id], a[href*="portalinmobiliario.com"]')
+FALLBACK_ITEMS_XPATH = etree.XPath('//div[@data-item-id] | //a[contains(@href, "portalinmobiliario.com")]')
+
+# Selectores de cada campo: (clases, atributos). Una etiqueta coincide si tiene alguna de las
+# clases o alguno de los atributos. El título además coincide con cualquier <h2>.
+_FIELD_MATCHERS = (
+    ('title', ('ui-search-item__title', 'ui-search-item__group__element'), ()),
+    ('price', ('ui-search-price', 'price', 'ui-search-item__price'), ('data-price',)),
+    ('location', ('ui-search-item__location', 'location'), ('data-location',)),
+    ('bedrooms', ('bedrooms', 'ui-search-item__bedrooms'), ('data-bedrooms',)),
+    ('bathrooms', ('bathrooms', 'ui-search-item__bathrooms'), ('data-bathrooms',)),
+    ('area', ('area', 'ui-search-item__area'), ('data-area',)),
+)
+_FIELD_COUNT = len(_FIELD_MATCHERS) + 1  # + link
+
+_NUMBER_RE = re.compile(r'(\d+)')
+
+def _text(element) -> str:
+    """Equivalente a get_text(strip=True) de BeautifulSoup."""
+    return "".join(part.strip() for part in element.itertext())
+
+def _first_number(text: str) -> Optional[int]:
+    match = _NUMBER_RE.search(text)
+    return int(match.group(1)) if match else None
+
+def find_property_items(root) -> List:
+    """Retorna las tarjetas de propiedades del documento (con el selector de respaldo si no hay)."""
+    items = ITEMS_XPATH(root)
+    if not items:
+        items = FALLBACK_ITEMS_XPATH(root)
+    return items
+
+# Etiqueta -> clase que la convierte en tarjeta de resultado (mismo criterio que ITEMS_XPATH)
+_CARD_CLASSES = {'li': 'ui-search-layout__item', 'article': 'ui-search-result', 'div': 'ui-search-result'}
+
+# Tamaño de los trozos que se entregan al parser incremental
+_FEED_CHUNK_SIZE = 64 * 1024
+
+def _is_card(element) -> bool:
+    card_class = _CARD_CLASSES.get(element.tag)
+    return card_class is not None and card_class in element.get('class', '').split()
+
+def iter_result_cards(html: str) -> Iterator:
+    """
+    Genera las tarjetas de resultados a medida que se parsean, solo dentro del contenedor
+    de resultados (el resto de la página nunca se convierte en árbol).
+
+    Usa un parser incremental: cada tarjeta se entrega apenas se cierra su etiqueta, y
+    después de procesarla se libera para que la memoria no crezca con el tamaño de la página.
+    Solo se entregan las tarjetas más externas (una tarjeta anidada en otra es la misma propiedad).
+
+    Args:
+        html: HTML completo de la página
+
+    Yields:
+        Elementos de lxml de cada tarjeta (vacío si no se encuentra el contenedor)
+    """
+    region = slice_results_region(html)
+    if not region:
+        return
+
+    parser = etree.HTMLPullParser(events=('end',))
+    for offset in range(0, len(region), _FEED_CHUNK_SIZE):
+        parser.feed(region[offset:offset + _FEED_CHUNK_SIZE])
+        yield from _drain_cards(parser)
+    parser.close()
+    yield from _drain_cards(parser)
+
+def _drain_cards(parser) -> Iterator:
+    for _, element in parser.read_events():
+        if not isinstance(element.tag, str) or not _is_card(element):
+            continue
+        if any(_is_card(ancestor) for ancestor in element.iterancestors()):
+            continue  # Tarjeta anidada: ya se entrega con la tarjeta que la contiene
+
+        yield element
+
+        # Liberar la tarjeta ya procesada y sus hermanas anteriores
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+def extract_property_info(item, base_url: str) -> Optional[Dict]:
+    """Extrae información de una propiedad desde un elemento de lxml (misma firma que scraper.extract_property_info)."""
+    found = {}
+    link_elem = None
+    first_anchor_with_href = None
+
+    # Un solo recorrido por los descendientes de la tarjeta
+    for element in item.iterdescendants():
+        tag = element.tag
+        if not isinstance(tag, str):
+            continue  # Comentarios e instrucciones de procesamiento
+
+        attrib = element.attrib
+        classes = attrib.get('class', '').split() if 'class' in attrib else ()
+
+        if tag == 'a':
+            if first_anchor_with_href is None and attrib.get('href'):
+                first_anchor_with_href = element
+            if link_elem is None and ('portalinmobiliario.com' in attrib.get('href', '') or 'ui-search-link' in classes):
+                link_elem = element
+
+        for field, field_classes, field_attrs in _FIELD_MATCHERS:
+            if field in found:
+                continue
+            if (field == 'title' and tag == 'h2') \
+                    or any(c in classes for c in field_classes) \
+                    or any(a in attrib for a in field_attrs):
+                found[field] = element
+
+        if link_elem is not None and len(found) + 1 == _FIELD_COUNT:
+            break
+
+    if link_elem is None:
+        link_elem = first_anchor_with_href
+
+    if link_elem is None or not link_elem.get('href'):
+        return None
+
+    link = link_elem.get('href')
+    if link.startswith('/'):
+        link = urljoin(base_url, link)
+
+    property_id = extract_property_id(link)
+    if not property_id:
+        return None
+
+    title_elem = found.get('title')
+    title = _text(title_elem) if title_elem is not None else "Propiedad sin título"
+
+    price_elem = found.get('price')
+    price, price_unit = extract_price(_text(price_elem) if price_elem is not None else "")
+
+    location_elem = found.get('location')
+    location = _text(location_elem) if location_elem is not None else ""
+
+    bedrooms_elem = found.get('bedrooms')
+    bedrooms = _first_number(_text(bedrooms_elem)) if bedrooms_elem is not None else None
+
+    bathrooms_elem = found.get('bathrooms')
+    bathrooms = _first_number(_text(bathrooms_elem)) if bathrooms_elem is not None else None
+
+    area_elem = found.get('area')
+    area = None
+    if area_elem is not None:
+        area = _first_number(_text(area_elem).replace('.', '').replace(',', ''))
+
+    return {
+        'id': property_id,
+        'title': title,
+        'price': price,
+        'price_unit': price_unit,
+        'location': location,
+        'link': link,
+        'bedrooms': bedrooms,
+        'bathrooms': bathrooms,
+        'area': area
+    }
+
+def parse_properties(html: str, base_url: str, scoped: bool = True) -> List[Dict]:
+    """
+    Parsea el HTML de un listado y retorna las propiedades únicas.
+
+    Args:
+        html: HTML completo de la página
+        base_url: URL de la página (para resolver links relativos)
+        scoped: Si True, parsea solo el contenedor de resultados con iter_result_cards;
+                si ahí no hay tarjetas, se parsea la página completa
+
+    Returns:
+        Lista de propiedades sin duplicados
+    """
+    properties = []
+    seen_ids = set()
+    items_count = 0
+
+    def add(item):
+        try:
+            prop = extract_property_info(item, base_url)
+            if prop and prop.get('id') and prop['id'] not in seen_ids:
+                seen_ids.add(prop['id'])
+                properties.append(prop)
+        except Exception:
+            pass
+
+    if scoped:
+        for item in iter_result_cards(html):
+            items_count += 1
+            add(item)
+
+    if not items_count:
+        root = lxml_html.fromstring(html)
+        property_items = find_property_items(root)
+        items_count = len(property_items)
+        for item in property_items:
+            add(item)
+
+    print(f"📦 Encontradas {items_count} propiedades potenciales")
+    metrics.inc("items_found", items_count)
+
+    return properties
@@ -2,10 +2,13 @@
 Notificador de Propiedades - Portal Inmobiliario
 Loop principal que ejecuta el scraper periódicamente y envía notificaciones.
 """
+import signal
 import time
 import sys
-from datetime import datetime
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Dict, Set
 
 # ============ CONFIGURACIÓN DE FILTROS ============
 # 👇 AGREGA TUS FILTROS AQUÍ 👇
@@ -21,6 +24,9 @@ from typing import List, Dict
 #   4. Pégalo aquí en "url"
 #
 # Puedes agregar tantos filtros como quieras. Cada uno será monitoreado independientemente.
+#
+# Opcional: "schedule" define un horario propio para el filtro, en minutos (ej: 15)
+# o como expresión cron de 5 campos (ej: "*/20 7-23 * * *" = cada 20 minutos entre 7 y 23 h).
 
 SEARCH_FILTERS = [
         {
@@ -47,13 +53,49 @@ SEARCH_FILTERS = [
 
 from config import (
     CHECK_INTERVAL_MINUTES,
+    MAX_CONCURRENT_SCRAPES,
+    MAX_PAGES,
+    METRICS_FILE,
+    METRICS_FILE_MAX_BYTES,
+    METRICS_HOST,
+    METRICS_PORT,
+    QUERY_COALESCING,
+    UF_CLP_VALUE,
+    ADAPTIVE_POLLING,
+    POLL_MIN_MINUTES,
+    POLL_MAX_MINUTES,
+    POLL_TARGET_NEW_PER_CHECK,
+    POLL_HISTORY_DAYS,
+    SCRAPE_BUDGET_PER_HOUR,
+    SCHEDULE_JITTER_SECONDS,
+    MISSED_RUN_POLICY,
+    BREAKER_FILE,
+    PREFETCH_NEXT_SEARCH,
+    MAX_TABS_PER_DRIVER,
+    DRIVER_PREWARM,
+    FETCH_MODE,
     FILTERS,
+    RETENTION_DAYS,
     validate_config,
     load_search_filters_from_config
 )
-from scraper import scrape_properties, filter_properties
-from storage import get_new_properties
+from scraper import (
+    scrape_properties,
+    filter_properties,
+    shutdown_driver_pool,
+    get_driver_pool,
+    prefetch_page,
+    prefetch_in_tabs,
+    discard_prefetched
+)
+from storage import get_new_properties, commit_pending, discard_pending, touch_properties, get_crawl_log
 from email_service import send_email
+from query_planner import plan_queries, split_results
+from adaptive_polling import AdaptivePoller
+from resilience import classify_error, get_circuit_breakers
+from scheduler import DeadlineScheduler, IntervalSchedule, parse_schedule
+import fingerprints
+import metrics
 
 # Cargar filtros: primero intenta usar los definidos aquí, si no hay, usa config.py
 if not SEARCH_FILTERS:
@@ -87,61 +129,254 @@ def format_property_summary(properties: List[Dict]) -> str:
     
     return summary
 
-def run_check():
+def scrape_search(plan: Dict, seen_ids: Set[str] = None) -> Dict:
+    """
+    Scrapea una búsqueda del plan (puede cubrir varios filtros) sin lanzar excepciones.
+    
+    Args:
+        plan: Búsqueda generada por plan_queries ('url', 'query', 'members'), con
+              'full_crawl' si se debe recorrer entera (para la retención)
+        seen_ids: IDs ya vistos (para cortar la paginación antes)
+
+    Returns:
+        Dict con 'properties', 'unchanged' (True si la huella del listado no cambió),
+        'complete' (True si se recorrió hasta la última página), 'error', 'error_kind'
+        (ver resilience.classify_error) y 'seconds'
     """
-    Ejecuta una verificación completa recorriendo todos los filtros configurados:
-    1. Para cada filtro: Scrapea propiedades
-    2. Aplica filtros adicionales (si los hay)
+    result = {'properties': [], 'unchanged': False, 'complete': False, 'error': None,
+              'error_kind': None, 'seconds': 0.0}
+    
+    start = time.monotonic()
+    try:
+        names = ", ".join(f"[{idx}]" for idx, _ in plan['members'])
+        print(f"   ▶ {names} {plan['url'][:70]}...")
+        crawl = {}
+        properties = scrape_properties(plan['url'], seen_ids=seen_ids, max_pages=plan.get('max_pages'),
+                                       stop_when_seen=not plan.get('full_crawl'), crawl=crawl)
+        result['unchanged'] = properties is None
+        result['complete'] = crawl.get('complete', False)
+        result['properties'] = properties or []
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        result['error_kind'] = classify_error(e)
+    result['seconds'] = time.monotonic() - start
+    metrics.observe("search_scrape", result['seconds'])
+    
+    return result
+
+def scrape_all_filters(search_filters: List[Dict], max_workers: int = 1,
+                       seen_ids: Set[str] = None) -> List[Dict]:
+    """
+    Scrapea todos los filtros usando un pool acotado de threads.
+    
+    Los filtros que solo difieren en precio y/o dormitorios se agrupan en una búsqueda
+    superconjunto (ver query_planner.py): se scrapea una vez y los resultados se reparten
+    localmente entre los filtros del grupo.
+    
+    Los filtros con el circuito abierto (ver resilience.py) no se scrapean, y el resultado
+    de cada búsqueda actualiza el circuito de sus filtros.
+    
+    Con la retención activa, una búsqueda sin un recorrido completo en los últimos
+    RETENTION_DAYS / 2 días no corta la paginación en las páginas ya vistas (ver retention.py).
+    
+    Con un solo worker el ciclo va en tubería: mientras se parsea una búsqueda, la siguiente
+    ya se está cargando en segundo plano (PREFETCH_NEXT_SEARCH). Con MAX_TABS_PER_DRIVER > 1,
+    las primeras páginas de todas las búsquedas se cargan en pestañas de un solo navegador
+    y se procesan en orden a medida que están listas.
+    
+    Args:
+        search_filters: Lista de filtros con 'name' y 'url'
+        max_workers: Máximo de búsquedas scrapeadas al mismo tiempo
+        seen_ids: IDs ya vistos (compartidos por todos los filtros)
+    
+    Returns:
+        Lista de dicts con 'index', 'name', 'url', 'properties', 'unchanged', 'unchanged_ids'
+        (IDs de la búsqueda sin cambios, para su last_seen), 'complete' (se recorrió hasta la
+        última página), 'circuit_open', 'error' y 'seconds', en el mismo orden que search_filters
+    """
+    breakers = get_circuit_breakers()
+    results = [
+        {
+            'index': idx,
+            'name': search_filter.get('name', f'Filtro {idx}'),
+            'url': search_filter.get('url', ''),
+            'properties': [],
+            'unchanged': False,
+            'unchanged_ids': [],
+            'complete': False,
+            'circuit_open': False,
+            'error': None,
+            'seconds': 0.0
+        }
+        for idx, search_filter in enumerate(search_filters, 1)
+    ]
+    
+    # Los filtros con el circuito abierto quedan fuera del plan (sin URL)
+    plannable = []
+    for result, search_filter in zip(results, search_filters):
+        if result['url'] and not breakers.allow(result['url'], result['name']):
+            result['circuit_open'] = True
+            plannable.append(dict(search_filter, url=''))
+        else:
+            plannable.append(search_filter)
+    
+    plans = plan_queries(plannable, coalesce=QUERY_COALESCING, max_pages=MAX_PAGES)
+    active = len([r for r in results if r['url'] and not r['circuit_open']])
+    if len(plans) < active:
+        print(f"🧭 Plan: {active} filtro(s) → {len(plans)} búsqueda(s)")
+    
+    if RETENTION_DAYS > 0:
+        crawl_log = get_crawl_log()
+        crawl_log.register(r['url'] for r in results if r['url'])
+        max_age = timedelta(days=RETENTION_DAYS / 2)
+        for plan in plans:
+            plan['full_crawl'] = any(crawl_log.is_due(results[idx - 1]['url'], max_age)
+                                     for idx, _ in plan['members'])
+            if plan['full_crawl']:
+                print(f"🔁 Recorrido completo (retención): {plan['url'][:70]}...")
+    
+    if plans and DRIVER_PREWARM and FETCH_MODE == "selenium":
+        # Arrancar Chrome mientras se cargan los datos y se arma el plan del resto del ciclo
+        get_driver_pool().prewarm()
+    
+    if MAX_TABS_PER_DRIVER > 1 and len(plans) > 1 and FETCH_MODE == "selenium":
+        # Modo multipestaña: un navegador carga todas las búsquedas; aquí se parsean en orden
+        prefetch_in_tabs([plan['url'] for plan in plans])
+        try:
+            outcomes = [scrape_search(plan, seen_ids) for plan in plans]
+        finally:
+            discard_prefetched()
+    elif max_workers <= 1:
+        outcomes = []
+        loading = prefetch_page(plans[0]['url']) if PREFETCH_NEXT_SEARCH and plans else None
+        try:
+            for position, plan in enumerate(plans):
+                if PREFETCH_NEXT_SEARCH and position + 1 < len(plans):
+                    # La siguiente búsqueda se carga apenas esta tiene su HTML (mientras se parsea)
+                    loading = prefetch_page(plans[position + 1]['url'], after=loading)
+                outcomes.append(scrape_search(plan, seen_ids))
+        finally:
+            discard_prefetched()
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape") as executor:
+            futures = [executor.submit(scrape_search, plan, seen_ids) for plan in plans]
+            # Recolectar en orden de envío: el resultado no depende de cuál termina primero
+            outcomes = [future.result() for future in futures]
+    
+    # Repartir los resultados de cada búsqueda entre sus filtros
+    for plan, outcome in zip(plans, outcomes):
+        if outcome['error']:
+            # La búsqueda no se procesará: su huella nueva no se debe guardar
+            fingerprints.discard_pending([plan['url']])
+        for idx, member_query in plan['members']:
+            result = results[idx - 1]
+            result['unchanged'] = outcome['unchanged']
+            if outcome['unchanged']:
+                result['unchanged_ids'] = fingerprints.saved_ids(plan['url'])
+            result['complete'] = outcome['complete'] and not outcome['error']
+            result['error'] = outcome['error']
+            result['seconds'] = outcome['seconds']
+            result['properties'] = split_results(
+                outcome['properties'], member_query, plan['query'], UF_CLP_VALUE
+            )
+            if outcome['error']:
+                breakers.record_failure(result['url'], outcome['error_kind'], result['name'])
+            else:
+                breakers.record_success(result['url'], result['name'])
+    
+    return results
+
+def record_complete_crawls(scrape_results: List[Dict], started: str):
+    """
+    Registra los filtros recorridos hasta la última página en este ciclo (con su last_seen
+    ya guardado), para que la retención sepa qué propiedades ya no están publicadas.
+    """
+    if RETENTION_DAYS > 0:
+        get_crawl_log().record_complete([r['url'] for r in scrape_results if r['complete']], started)
+
+def run_check(search_filters: List[Dict] = None) -> List[Dict]:
+    """
+    Ejecuta una verificación completa recorriendo los filtros indicados
+    (por defecto, todos los filtros configurados):
+    1. Scrapea todos los filtros en paralelo (hasta MAX_CONCURRENT_SCRAPES a la vez)
+    2. Para cada filtro, en orden: aplica filtros adicionales (si los hay)
     3. Identifica propiedades nuevas (agregando información del filtro)
     4. Acumula todas las propiedades nuevas
     5. Envía un solo email con todas las propiedades nuevas agrupadas por filtro
+
+    Returns:
+        Propiedades nuevas notificadas y guardadas en este ciclo (vacía si no hubo o no se guardaron)
     """
     print("\n" + "="*80)
     print(f"🔍 Verificando propiedades - {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
     print("="*80)
 
+    if search_filters is None:
+        search_filters = SEARCH_FILTERS
+
     # Lista para acumular todas las propiedades nuevas de todos los filtros
     all_new_properties = []
+    saved_properties = []
     errors_count = 0
+    # Un recorrido completo cuenta desde antes de scrapear (last_seen queda después)
+    cycle_started = datetime.now().isoformat()
+    metrics.start_cycle()
 
     try:
         # Estado inicial del almacenamiento
-        from storage import load_properties_data, get_storage_stats
+        from storage import load_seen_index, get_storage_stats
         stats = get_storage_stats()
         print(f"\n📊 Estado del almacenamiento ANTES de la verificación:")
         print(f"   Total de propiedades ya vistas: {stats['total_seen']}")
+        circuits = get_circuit_breakers().describe()
+        if circuits:
+            print(f"   🔌 Circuitos no cerrados: {circuits}")
 
-        # Recorrer cada filtro configurado
-        print(f"\n🔍 Filtros configurados: {len(SEARCH_FILTERS)}")
+        # 1. Scrapear todos los filtros en paralelo (pool acotado de workers)
+        print(f"\n🔍 Filtros a verificar: {len(search_filters)} de {len(SEARCH_FILTERS)}")
+        workers = max(1, min(MAX_CONCURRENT_SCRAPES, len(search_filters)))
+        print(f"\n1️⃣ SCRAPING: Obteniendo propiedades (hasta {workers} búsqueda(s) en paralelo)...")
+        seen_ids = load_seen_index()
+        scrape_results = scrape_all_filters(search_filters, max_workers=workers, seen_ids=seen_ids)
         
-        for filter_idx, search_filter in enumerate(SEARCH_FILTERS, 1):
-            filter_name = search_filter.get('name', f'Filtro {filter_idx}')
-            filter_url = search_filter.get('url', '')
+        # Procesar resultados en el orden de los filtros (determinístico)
+        for result in scrape_results:
+            filter_idx = result['index']
+            filter_name = result['name']
+            filter_url = result['url']
+            all_properties = result['properties']
             
             print(f"\n{'='*80}")
-            print(f"📋 FILTRO {filter_idx}/{len(SEARCH_FILTERS)}: {filter_name}")
+            print(f"📋 FILTRO {filter_idx}/{len(search_filters)}: {filter_name}")
             print(f"{'='*80}")
             
             if not filter_url:
                 print(f"⚠ Saltando filtro '{filter_name}': No tiene URL configurada")
                 continue
 
-            try:
-                # 1. Scrapear propiedades de este filtro
-                print(f"\n1️⃣ SCRAPING: Obteniendo propiedades...")
-                print(f"   URL: {filter_url[:70]}...")
-
-                all_properties = scrape_properties(filter_url)
+            if result['circuit_open']:
+                print(f"🔌 Filtro pausado: circuito abierto por errores repetidos (ver {BREAKER_FILE})")
+                metrics.inc("filters_skipped_breaker")
+                continue
 
-                if not all_properties:
-                    print(f"⚠ No se encontraron propiedades en este filtro.")
-                    continue
-            except Exception as e:
-                print(f"❌ Error al scrapear filtro '{filter_name}': {e}")
+            if result['error']:
+                print(f"❌ Error al scrapear filtro '{filter_name}': {result['error']}")
                 errors_count += 1
+                metrics.inc("filter_errors")
+                continue
+
+            if result['unchanged']:
+                print(f"⏭️ Sin cambios desde el ciclo anterior: se omite el filtrado y la comparación")
+                # Sus propiedades siguen publicadas: se actualiza su last_seen igual
+                touch_properties(result['unchanged_ids'])
+                continue
+
+            if not all_properties:
+                print(f"⚠ No se encontraron propiedades en este filtro.")
                 continue
             
-            print(f"✓ Scraping completado: {len(all_properties)} propiedades encontradas")
+            print(f"✓ Scraping completado: {len(all_properties)} propiedades encontradas "
+                  f"({result['seconds']:.1f}s)")
             
             # 2. Aplicar filtros adicionales (si los hay)
             if any(FILTERS.values()):
@@ -151,15 +386,16 @@ def run_check():
             else:
                 filtered_properties = all_properties
             
-            # 3. Identificar propiedades nuevas y agregar información del filtro
-            print(f"\n3️⃣ COMPARACIÓN: Identificando propiedades nuevas...")
-            new_properties = get_new_properties(filtered_properties, property_id_key='id')
-            
-            # Agregar información del filtro a cada propiedad nueva
-            for prop in new_properties:
+            # 3. Agregar información del filtro e identificar propiedades nuevas
+            # (antes de comparar, para que el almacenamiento guarde a qué filtro pertenece cada una)
+            for prop in filtered_properties:
                 prop['filter_name'] = filter_name
                 prop['filter_url'] = filter_url
             
+            print(f"\n3️⃣ COMPARACIÓN: Identificando propiedades nuevas...")
+            # Se acumulan en memoria: se guardan todas juntas después de notificar
+            new_properties = get_new_properties(filtered_properties, property_id_key='id', defer=True)
+            
             if new_properties:
                 print(f"✨ ¡ENCONTRADAS {len(new_properties)} PROPIEDAD(ES) NUEVA(S) en este filtro!")
                 all_new_properties.extend(new_properties)
@@ -176,7 +412,14 @@ def run_check():
         
         if not all_new_properties:
             print(f"\n✓ Resultado: No hay propiedades nuevas en ninguno de los filtros")
-            return
+            # Nada que notificar: guardar igual el last_seen de las vistas (para la retención)
+            # y las huellas de las búsquedas procesadas
+            if commit_pending() is None:
+                print(f"   ⚠ No se pudo actualizar el last_seen de las propiedades vistas")
+                return saved_properties
+            fingerprints.commit_pending()
+            record_complete_crawls(scrape_results, cycle_started)
+            return saved_properties
         
         # Agrupar propiedades por filtro para mostrar en logs
         from collections import defaultdict
@@ -211,13 +454,24 @@ def run_check():
             from config import RECIPIENTS
             print(f"   ✓ Email enviado exitosamente a {len(RECIPIENTS)} destinatario(s)")
         else:
-            print(f"   ⚠ Hubo un problema al enviar el email")
+            # Sin guardar nada: el próximo ciclo las detecta como nuevas y reintenta el envío
+            print(f"   ⚠ Hubo un problema al enviar el email: las propiedades nuevas no se guardan "
+                  f"y se volverán a notificar en el próximo ciclo")
+            metrics.inc("notification_failures")
+            return saved_properties
         
-        # 5. Estado final
+        # 5. Guardar todo el ciclo en una sola escritura atómica (recién ahora, ya notificado)
         print(f"\n5️⃣ ALMACENAMIENTO: Guardando propiedades nuevas...")
+        saved = commit_pending()
+        if saved is None:
+            print(f"   ⚠ No se pudieron guardar: se volverán a notificar en el próximo ciclo")
+            return saved_properties
+        fingerprints.commit_pending()
+        record_complete_crawls(scrape_results, cycle_started)
+        saved_properties = all_new_properties
         stats_after = get_storage_stats()
         print(f"   Total de propiedades vistas ahora: {stats_after['total_seen']}")
-        print(f"   Propiedades nuevas guardadas: {len(all_new_properties)}")
+        print(f"   Propiedades nuevas guardadas: {saved}")
         
         print(f"\n{'='*80}")
         print(f"✅ Verificación completada exitosamente")
@@ -230,6 +484,87 @@ def run_check():
         print(f"❌ Error durante la verificación: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        # Lo que no se confirmó (email fallido, error o interrupción) no pasa al próximo ciclo
+        discard_pending()
+        fingerprints.discard_pending()
+        # Una línea JSON por ciclo con los tiempos de cada fase y los contadores
+        cycle = metrics.end_cycle(
+            Path(METRICS_FILE) if METRICS_FILE else None,
+            {"filters": len(search_filters), "new_properties": len(all_new_properties), "errors": errors_count},
+            max_bytes=METRICS_FILE_MAX_BYTES
+        )
+        if cycle:
+            print(f"⏱️ Ciclo completado en {cycle['seconds']:.1f}s")
+
+    return saved_properties
+
+def build_scheduler() -> DeadlineScheduler:
+    """Crea el planificador con un trabajo por filtro (su "schedule" o CHECK_INTERVAL_MINUTES)."""
+    scheduler = DeadlineScheduler(jitter_seconds=SCHEDULE_JITTER_SECONDS, missed_run_policy=MISSED_RUN_POLICY)
+    first_run = time.time()
+    for idx, search_filter in enumerate(SEARCH_FILTERS):
+        if search_filter.get('schedule'):
+            scheduler.add_job(idx, parse_schedule(search_filter['schedule']))
+        else:
+            # Todos los filtros de intervalo comparten la primera fecha límite (se verifican juntos)
+            scheduler.add_job(idx, IntervalSchedule(CHECK_INTERVAL_MINUTES), first_run=first_run)
+    return scheduler
+
+def run_scheduler_loop(scheduler: DeadlineScheduler):
+    """
+    Loop principal: espera la próxima fecha límite, verifica los filtros que tocan y
+    programa la siguiente desde la fecha límite anterior (sin desplazamiento).
+    Con ADAPTIVE_POLLING, el intervalo de los filtros sin "schedule" propio se recalcula
+    después de cada verificación (ver adaptive_polling.py).
+    """
+    from storage import load_properties_data
+    
+    poller = None
+    if ADAPTIVE_POLLING:
+        poller = AdaptivePoller(
+            SEARCH_FILTERS,
+            base_minutes=CHECK_INTERVAL_MINUTES,
+            min_minutes=POLL_MIN_MINUTES,
+            max_minutes=POLL_MAX_MINUTES,
+            target_new_per_check=POLL_TARGET_NEW_PER_CHECK,
+            window_days=POLL_HISTORY_DAYS,
+            budget_per_hour=SCRAPE_BUDGET_PER_HOUR
+        )
+        # La historia se lee del almacenamiento una sola vez; después se suman las nuevas de cada ciclo
+        poller.load_history(load_properties_data())
+    
+    while not scheduler.stopped:
+        due = scheduler.wait_for_due()
+        if not due:
+            break  # Detenido por una señal
+        
+        saved_properties = run_check([SEARCH_FILTERS[idx] for idx in due])
+        scheduler.complete(due)
+        
+        if poller is not None:
+            poller.record_arrivals(saved_properties)
+            intervals = poller.update_intervals()
+            for idx, minutes in intervals.items():
+                if not SEARCH_FILTERS[idx].get('schedule'):
+                    scheduler.set_interval(idx, minutes)
+        
+        print(f"\n{'='*80}")
+        print(f"⏳ Próximas verificaciones: {scheduler.describe()}")
+        print(f"{'='*80}")
+
+def install_signal_handlers(scheduler: DeadlineScheduler):
+    """
+    SIGTERM y SIGINT detienen el planificador: la verificación en curso termina y el loop sale.
+    Un segundo Ctrl+C interrumpe de inmediato.
+    """
+    def request_stop(signum, frame):
+        print(f"\n🛑 Señal {signal.Signals(signum).name} recibida: deteniendo después de la verificación en curso...")
+        scheduler.stop()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+    
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
 
 def main():
     """Función principal con el loop infinito."""
@@ -249,68 +584,69 @@ def main():
         sys.exit(1)
     
     from config import GMAIL_USER, RECIPIENTS
-    from storage import get_storage_stats
+    from storage import get_storage_stats, start_retention
     
     # Mostrar configuración
     print(f"\n📋 CONFIGURACIÓN:")
     print(f"   📧 Email de envío: {GMAIL_USER}")
     print(f"   📨 Destinatarios: {', '.join(RECIPIENTS)}")
-    print(f"   ⏰ Intervalo de verificación: {CHECK_INTERVAL_MINUTES} minuto(s)")
+    if SCHEDULE_JITTER_SECONDS > 0:
+        print(f"   🎲 Jitter: hasta {SCHEDULE_JITTER_SECONDS:g} segundo(s)")
+    if ADAPTIVE_POLLING:
+        print(f"   ⏰ Intervalo adaptativo por filtro: {POLL_MIN_MINUTES:g}-{POLL_MAX_MINUTES:g} minuto(s)"
+              + (f", máximo {SCRAPE_BUDGET_PER_HOUR:g} scrapings/hora" if SCRAPE_BUDGET_PER_HOUR > 0 else ""))
+    else:
+        print(f"   ⏰ Intervalo de verificación: {CHECK_INTERVAL_MINUTES} minuto(s)")
     print(f"   🔍 Filtros configurados: {len(SEARCH_FILTERS)}")
     for i, filter_item in enumerate(SEARCH_FILTERS, 1):
-        print(f"      {i}. {filter_item['name']}")
+        schedule = f" ({parse_schedule(filter_item['schedule'])})" if filter_item.get('schedule') else ""
+        print(f"      {i}. {filter_item['name']}{schedule}")
+    
+    # Endpoint local de métricas (Prometheus en /metrics, JSON en /metrics.json)
+    if metrics.start_metrics_server(METRICS_PORT, METRICS_HOST):
+        print(f"   📈 Métricas: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
     
     # Mostrar estado inicial del almacenamiento
     stats = get_storage_stats()
     print(f"\n📊 ESTADO INICIAL:")
     print(f"   Propiedades ya vistas: {stats['total_seen']}")
     print(f"   Archivo de almacenamiento: {stats['storage_file']}")
+    if stats['archived']:
+        print(f"   Propiedades archivadas (lápidas): {stats['archived']}")
+    # Retención en segundo plano: archiva las propiedades sin ver hace más de RETENTION_DAYS días
+    # (los filtros se registran antes, para que no archive nada de un filtro sin recorrido completo)
+    if RETENTION_DAYS > 0:
+        get_crawl_log().register(f['url'] for f in SEARCH_FILTERS if f.get('url'))
+    if start_retention():
+        print(f"   🗄️ Retención: se archivan las propiedades sin ver hace más de {RETENTION_DAYS:g} días")
     
     print("\n" + "="*80)
     print("🚀 Iniciando monitoreo continuo...")
     print("   Presiona Ctrl+C para detener")
     print("="*80)
     
-    # Ejecutar primera verificación inmediatamente
-    run_check()
-    
-    # Loop principal
+    # Loop principal (la primera verificación es inmediata)
+    scheduler = build_scheduler()
+    install_signal_handlers(scheduler)
     try:
-        while True:
-            # Esperar el intervalo configurado
-            wait_seconds = CHECK_INTERVAL_MINUTES * 60
-            print(f"\n{'='*80}")
-            print(f"⏳ Esperando {CHECK_INTERVAL_MINUTES} minuto(s) hasta la próxima verificación...")
-            print(f"{'='*80}")
-            
-            if CHECK_INTERVAL_MINUTES == 1:
-                # Si es 1 minuto, mostrar contador de segundos
-                for remaining_seconds in range(60, 0, -10):
-                    print(f"   ⏱️  Esperando... {remaining_seconds} segundos restantes", end='\r')
-                    time.sleep(10)
-                print(f"   ⏱️  Esperando... 0 segundos    ")  # Limpiar línea
-            else:
-                # Contar hacia atrás cada minuto
-                for remaining_minutes in range(CHECK_INTERVAL_MINUTES - 1, 0, -1):
-                    time.sleep(60)  # Esperar 1 minuto
-                    print(f"   ⏱️  {remaining_minutes} minuto(s) restante(s)...", end='\r')
-                # Último minuto
-                print(f"   ⏱️  Esperando últimos 60 segundos...", end='\r')
-                time.sleep(60)
-                print()  # Nueva línea después del último segundo
-            
-            # Ejecutar nueva verificación
-            run_check()
-            
+        run_scheduler_loop(scheduler)
+        print("\n" + "="*60)
+        print("🛑 Monitoreo detenido")
+        print("="*60)
+        shutdown_driver_pool()
+        sys.exit(0)
+        
     except KeyboardInterrupt:
         print("\n\n" + "="*60)
         print("🛑 Monitoreo detenido por el usuario")
         print("="*60)
+        shutdown_driver_pool()
         sys.exit(0)
     except Exception as e:
         print(f"\n❌ Error crítico: {e}")
         import traceback
         traceback.print_exc()
+        shutdown_driver_pool()
         sys.exit(1)
 
 if __name__ == "__main__":
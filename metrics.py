@@ -0,0 +1,216 @@
+"""
+Instrumentación del notificador: tiempos por fase, contadores y medidas instantáneas.
+Expone las métricas en formato Prometheus en un endpoint HTTP local (/metrics),
+como JSON (/metrics.json) y escribe una línea JSON por ciclo de verificación.
+
+Uso:
+    with metrics.timer("page_load"):
+        driver.get(url)
+    metrics.inc("items_valid", len(properties))
+    metrics.gauge("chrome_rss_bytes", rss)
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Prefijo de todas las métricas exportadas
+METRIC_PREFIX = "notificador"
+
+# Cantidad de observaciones recientes que se guardan por fase para calcular percentiles
+RESERVOIR_SIZE = 1000
+QUANTILES = (0.5, 0.9, 0.99)
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_gauges: Dict[str, float] = {}
+_phases: Dict[str, Dict] = {}  # fase -> {'count', 'sum', 'max', 'recent': [...]}
+_cycle: Optional[Dict] = None  # Acumulado del ciclo en curso (None si no hay ciclo abierto)
+_server: Optional[ThreadingHTTPServer] = None
+
+def _new_phase() -> Dict:
+    return {"count": 0, "sum": 0.0, "max": 0.0, "recent": []}
+
+def inc(name: str, value: float = 1):
+    """Incrementa un contador (global y del ciclo en curso)."""
+    if not value:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+        if _cycle is not None:
+            _cycle["counters"][name] = _cycle["counters"].get(name, 0) + value
+
+def gauge(name: str, value: float):
+    """Fija el valor actual de una medida instantánea (por ejemplo, memoria en uso)."""
+    with _lock:
+        _gauges[name] = value
+
+def observe(phase: str, seconds: float):
+    """Registra la duración de una fase."""
+    with _lock:
+        stats = _phases.setdefault(phase, _new_phase())
+        stats["count"] += 1
+        stats["sum"] += seconds
+        stats["max"] = max(stats["max"], seconds)
+        stats["recent"].append(seconds)
+        if len(stats["recent"]) > RESERVOIR_SIZE:
+            del stats["recent"][0]
+
+        if _cycle is not None:
+            cycle_stats = _cycle["phases"].setdefault(phase, {"count": 0, "seconds": 0.0, "max": 0.0})
+            cycle_stats["count"] += 1
+            cycle_stats["seconds"] += seconds
+            cycle_stats["max"] = max(cycle_stats["max"], seconds)
+
+@contextmanager
+def timer(phase: str):
+    """Mide la duración del bloque y la registra como una fase (también si lanza excepción)."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        observe(phase, time.monotonic() - start)
+
+def _quantile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def snapshot() -> Dict:
+    """Retorna el estado actual de todas las métricas (contadores y percentiles por fase)."""
+    with _lock:
+        phases = {}
+        for phase, stats in _phases.items():
+            phases[phase] = {
+                "count": stats["count"],
+                "sum": round(stats["sum"], 4),
+                "max": round(stats["max"], 4),
+                **{f"p{int(q * 100)}": round(_quantile(stats["recent"], q), 4) for q in QUANTILES}
+            }
+        return {"counters": dict(_counters), "gauges": dict(_gauges), "phases": phases}
+
+def render_prometheus() -> str:
+    """Renderiza las métricas en el formato de texto de Prometheus."""
+    data = snapshot()
+    lines = []
+
+    for name, value in sorted(data["counters"].items()):
+        metric = f"{METRIC_PREFIX}_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+
+    for name, value in sorted(data["gauges"].items()):
+        metric = f"{METRIC_PREFIX}_{name}"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {value}")
+
+    metric = f"{METRIC_PREFIX}_phase_seconds"
+    if data["phases"]:
+        lines.append(f"# HELP {metric} Duración de cada fase (percentiles sobre las últimas {RESERVOIR_SIZE} observaciones)")
+        lines.append(f"# TYPE {metric} summary")
+    for phase, stats in sorted(data["phases"].items()):
+        for q in QUANTILES:
+            lines.append(f'{metric}{{phase="{phase}",quantile="{q}"}} {stats[f"p{int(q * 100)}"]}')
+        lines.append(f'{metric}_sum{{phase="{phase}"}} {stats["sum"]}')
+        lines.append(f'{metric}_count{{phase="{phase}"}} {stats["count"]}')
+
+    return "\n".join(lines) + "\n"
+
+def start_cycle():
+    """Abre el acumulado de un ciclo de verificación."""
+    global _cycle
+    with _lock:
+        _cycle = {
+            "started_at": datetime.now().isoformat(),
+            "start": time.monotonic(),
+            "counters": {},
+            "phases": {}
+        }
+
+def end_cycle(path: Optional[Path] = None, extra: Optional[Dict] = None,
+              max_bytes: int = 0) -> Optional[Dict]:
+    """
+    Cierra el ciclo en curso y escribe su resumen como una línea JSON.
+
+    Args:
+        path: Archivo JSON Lines de destino (None = no escribir)
+        extra: Campos adicionales para la línea (por ejemplo, propiedades nuevas)
+        max_bytes: Si el archivo ya supera este tamaño, pasa a `path`.1 (reemplazando el
+                   anterior) y la línea va a un archivo nuevo (0 = sin límite)
+
+    Returns:
+        Dict con el resumen del ciclo (None si no había ciclo abierto)
+    """
+    global _cycle
+    with _lock:
+        cycle, _cycle = _cycle, None
+    if cycle is None:
+        return None
+
+    record = {
+        "started_at": cycle["started_at"],
+        "seconds": round(time.monotonic() - cycle["start"], 3),
+        "counters": cycle["counters"],
+        "phases": {
+            phase: {"count": s["count"], "seconds": round(s["seconds"], 3), "max": round(s["max"], 3)}
+            for phase, s in cycle["phases"].items()
+        },
+        **(extra or {})
+    }
+    observe("cycle", record["seconds"])
+
+    if path is not None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if max_bytes and path.exists() and path.stat().st_size >= max_bytes:
+                os.replace(path, path.with_name(path.name + ".1"))
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except (IOError, OSError) as e:
+            print(f"Advertencia: No se pudieron guardar las métricas del ciclo: {e}")
+
+    return record
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body = json.dumps(snapshot(), ensure_ascii=False).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        elif self.path.startswith("/metrics"):
+            body = render_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Sin logs por cada request
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> bool:
+    """
+    Inicia el endpoint HTTP de métricas en un thread de fondo.
+
+    Returns:
+        True si el servidor quedó escuchando
+    """
+    global _server
+    if _server is not None or not port:
+        return _server is not None
+    try:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"⚠ No se pudo iniciar el endpoint de métricas en {host}:{port}: {e}")
+        return False
+    threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return True
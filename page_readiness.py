@@ -0,0 +1,133 @@
+"""
+Detección adaptativa de "página lista" para los resultados de Portal Inmobiliario.
+Reemplaza las esperas fijas (time.sleep) por esperas con WebDriverWait que terminan
+apenas aparecen los resultados y el scroll deja de cargar propiedades nuevas.
+"""
+import time
+from typing import Dict
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Selector de las tarjetas de resultados (mismo que usa el parser)
+RESULT_ITEM_SELECTOR = 'li.ui-search-layout__item, article.ui-search-result, div.ui-search-result'
+
+def count_result_items(driver, selector: str = RESULT_ITEM_SELECTOR) -> int:
+    """Cuenta cuántas tarjetas de resultados hay renderizadas en la página."""
+    try:
+        return int(driver.execute_script(
+            "return document.querySelectorAll(arguments[0]).length;", selector
+        ) or 0)
+    except Exception:
+        return 0
+
+def wait_for_results(driver, min_seconds: float = 0.5, max_seconds: float = 15.0,
+                     poll_interval: float = 0.25) -> Dict:
+    """
+    Espera a que aparezca al menos una tarjeta de resultados.
+
+    Args:
+        driver: WebDriver de Selenium
+        min_seconds: Espera mínima aunque los resultados ya estén (deja terminar el render)
+        max_seconds: Espera máxima antes de rendirse
+        poll_interval: Cada cuánto se revisa la página
+
+    Returns:
+        Dict con 'seconds' (tiempo real esperado), 'items' y 'timed_out'
+    """
+    start = time.monotonic()
+    timed_out = False
+
+    try:
+        WebDriverWait(driver, max_seconds, poll_frequency=poll_interval).until(
+            lambda d: count_result_items(d) > 0
+        )
+    except TimeoutException:
+        timed_out = True
+
+    elapsed = time.monotonic() - start
+    if elapsed < min_seconds:
+        time.sleep(min_seconds - elapsed)
+
+    return {
+        "seconds": time.monotonic() - start,
+        "items": count_result_items(driver),
+        "timed_out": timed_out
+    }
+
+def scroll_until_stable(driver, max_seconds: float = 10.0, settle_seconds: float = 1.0,
+                        poll_interval: float = 0.25, max_scrolls: int = 10) -> Dict:
+    """
+    Hace scroll hasta que la cantidad de tarjetas deja de crecer.
+
+    Después de cada scroll espera hasta `settle_seconds` a que aparezcan tarjetas nuevas;
+    si no aparecen, la lista se considera estable y se detiene.
+
+    Args:
+        driver: WebDriver de Selenium
+        max_seconds: Presupuesto máximo total para el scroll
+        settle_seconds: Tiempo máximo de espera por tarjetas nuevas tras cada scroll
+        poll_interval: Cada cuánto se revisa la página
+        max_scrolls: Número máximo de scrolls
+
+    Returns:
+        Dict con 'seconds', 'scrolls' e 'items'
+    """
+    start = time.monotonic()
+    previous_count = count_result_items(driver)
+    scrolls = 0
+
+    while scrolls < max_scrolls:
+        remaining = max_seconds - (time.monotonic() - start)
+        if remaining <= 0:
+            break
+
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        scrolls += 1
+
+        try:
+            WebDriverWait(driver, min(settle_seconds, remaining), poll_frequency=poll_interval).until(
+                lambda d: count_result_items(d) > previous_count
+            )
+        except TimeoutException:
+            # No aparecieron tarjetas nuevas: la lista ya está completa
+            break
+
+        previous_count = count_result_items(driver)
+
+    return {
+        "seconds": time.monotonic() - start,
+        "scrolls": scrolls,
+        "items": count_result_items(driver)
+    }
+
+def wait_until_ready(driver, min_seconds: float = 0.5, max_seconds: float = 15.0,
+                     scroll_max_seconds: float = 10.0, settle_seconds: float = 1.0) -> Dict:
+    """
+    Espera la carga inicial y luego hace scroll hasta que los resultados se estabilizan.
+
+    Returns:
+        Dict con los tiempos reales de cada fase:
+        {'initial_wait': s, 'scroll': s, 'scrolls': n, 'items': n, 'timed_out': bool}
+    """
+    initial = wait_for_results(driver, min_seconds=min_seconds, max_seconds=max_seconds)
+
+    if initial["timed_out"]:
+        # Sin resultados tras la espera máxima: no tiene sentido hacer scroll
+        return {
+            "initial_wait": initial["seconds"],
+            "scroll": 0.0,
+            "scrolls": 0,
+            "items": initial["items"],
+            "timed_out": True
+        }
+
+    scroll = scroll_until_stable(driver, max_seconds=scroll_max_seconds, settle_seconds=settle_seconds)
+
+    return {
+        "initial_wait": initial["seconds"],
+        "scroll": scroll["seconds"],
+        "scrolls": scroll["scrolls"],
+        "items": scroll["items"],
+        "timed_out": False
+    }
@@ -0,0 +1,228 @@
+"""
+Planificador de búsquedas: agrupa filtros que se pueden resolver con una sola búsqueda.
+
+Cada URL de filtro se descompone en una consulta estructurada (operación, tipo de propiedad,
+rango de precio, rango de dormitorios, caja geográfica y polígono). Los filtros que solo
+difieren en el rango de precio se resuelven con una búsqueda "superconjunto" (la unión
+de los rangos), que se scrapea una vez; después los resultados se reparten localmente
+entre los filtros originales.
+
+No se agrupan filtros con distintos dormitorios: el parser no siempre encuentra la cantidad
+en la tarjeta, y una propiedad sin ese dato no se podría repartir con seguridad. Por lo
+mismo, una propiedad sin precio solo llega a los filtros cuyo rango de precio es el de la
+búsqueda superconjunto (el sitio ya la filtró).
+
+Solo se agrupan filtros con rangos de precio en la misma moneda. Aun así, una propiedad
+publicada en otra moneda que la del filtro (UF en un filtro en CLP o al revés) se reparte
+convirtiendo con UF_CLP_VALUE, un valor aproximado de la UF: cerca de los bordes del rango
+el reparto puede diferir del que haría el sitio, así que se acepta un margen de
+UF_MARGIN para no perder propiedades (a lo sumo llega alguna un poco fuera del rango).
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+# Tokens del segmento de filtros de Portal Inmobiliario, por ejemplo:
+# _DisplayType_M_PriceRange_5CLP-2000000CLP_BEDROOMS_4-5_item*location_lat:-33.4*-33.3,lon:-70.6*-70.5
+_PRICE_RE = re.compile(r'_PriceRange_(\d+)([A-Z]*)-(\d+)([A-Z]*)')
+_BEDROOMS_RE = re.compile(r'_BEDROOMS_(\d+)-(\d+)')
+_GEO_RE = re.compile(r'_item\*location_lat:([-\d.]+)\*([-\d.]+),lon:([-\d.]+)\*([-\d.]+)')
+_DISPLAY_RE = re.compile(r'_DisplayType_([A-Z]+)')
+_OFFSET_RE = re.compile(r'_Desde_\d+')
+
+# Margen relativo para precios convertidos con el valor aproximado de la UF
+UF_MARGIN = 0.05
+
+def parse_search_url(url: str) -> Dict:
+    """
+    Descompone una URL de búsqueda en una consulta estructurada.
+
+    Returns:
+        Dict con 'operation', 'property_type', 'price' ((min, max, moneda) o None),
+        'bedrooms' ((min, max) o None), 'geo' ((lat1, lat2, lon1, lon2) o None),
+        'display', 'polygon', 'extra' (resto del segmento de filtros) y 'url'
+    """
+    parsed = urlparse(url)
+    segments = [s for s in parsed.path.split('/') if s]
+    filter_segment = next((s for s in segments if s.startswith('_')), '')
+    plain_segments = [s for s in segments if not s.startswith('_')]
+
+    price = None
+    match = _PRICE_RE.search(filter_segment)
+    if match:
+        currency = match.group(2) or match.group(4) or 'CLP'
+        price = (int(match.group(1)), int(match.group(3)), currency)
+
+    bedrooms = None
+    match = _BEDROOMS_RE.search(filter_segment)
+    if match:
+        bedrooms = (int(match.group(1)), int(match.group(2)))
+
+    geo = None
+    match = _GEO_RE.search(filter_segment)
+    if match:
+        geo = tuple(match.group(i) for i in range(1, 5))
+
+    match = _DISPLAY_RE.search(filter_segment)
+    display = match.group(1) if match else None
+
+    # Lo que no se entiende se conserva tal cual: solo se agrupan filtros con el mismo resto
+    extra = filter_segment
+    for regex in (_PRICE_RE, _BEDROOMS_RE, _GEO_RE, _DISPLAY_RE, _OFFSET_RE):
+        extra = regex.sub('', extra)
+
+    query_params = dict(parse_qsl(parsed.query, keep_blank_values=True))
+
+    return {
+        'url': url,
+        'host': parsed.netloc,
+        'operation': plain_segments[0] if plain_segments else None,
+        'property_type': '/'.join(plain_segments[1:]) or None,
+        'price': price,
+        'bedrooms': bedrooms,
+        'geo': geo,
+        'display': display,
+        'polygon': query_params.pop('polygon_location', None),
+        'params': tuple(sorted(query_params.items())),
+        'extra': extra
+    }
+
+def _group_key(query: Dict) -> Tuple:
+    """
+    Todo lo que debe coincidir para que dos filtros compartan búsqueda. Los dormitorios
+    también: el parser no siempre los extrae, así que no se podrían repartir localmente.
+    """
+    currency = query['price'][2] if query['price'] else None
+    return (
+        query['host'], query['operation'], query['property_type'], query['display'],
+        query['geo'], query['polygon'], query['params'], query['extra'], currency,
+        query['bedrooms']
+    )
+
+def _union_range(ranges: List[Optional[Tuple]]) -> Optional[Tuple[int, int]]:
+    """Unión de rangos (None = sin límite, así que la unión también queda sin límite)."""
+    if any(r is None for r in ranges):
+        return None
+    return (min(r[0] for r in ranges), max(r[1] for r in ranges))
+
+def build_superset_url(base_url: str, price: Optional[Tuple], bedrooms: Optional[Tuple]) -> str:
+    """
+    Reescribe los rangos de precio y dormitorios de una URL (el resto queda igual).
+    Un rango None elimina el token correspondiente.
+    """
+    parsed = urlparse(base_url)
+
+    def rewrite(segment: str) -> str:
+        if not segment.startswith('_'):
+            return segment
+        if price is None:
+            segment = _PRICE_RE.sub('', segment)
+        else:
+            segment = _PRICE_RE.sub(
+                lambda m: f"_PriceRange_{price[0]}{m.group(2)}-{price[1]}{m.group(4)}", segment
+            )
+        if bedrooms is None:
+            segment = _BEDROOMS_RE.sub('', segment)
+        else:
+            segment = _BEDROOMS_RE.sub(f"_BEDROOMS_{bedrooms[0]}-{bedrooms[1]}", segment)
+        return segment
+
+    path = '/'.join(rewrite(s) for s in parsed.path.split('/'))
+    return parsed._replace(path=path).geturl()
+
+def plan_queries(search_filters: List[Dict], coalesce: bool = True,
+                 max_pages: Optional[int] = None) -> List[Dict]:
+    """
+    Agrupa los filtros en búsquedas superconjunto.
+
+    Args:
+        search_filters: Lista de filtros con 'name' y 'url'
+        coalesce: Si False, cada filtro queda en su propia búsqueda (sin agrupar)
+        max_pages: Máximo de páginas por filtro; una búsqueda agrupada recorre hasta
+                   max_pages por cada filtro que cubre (None = el valor por defecto del scraper)
+
+    Returns:
+        Lista de búsquedas (en el orden del primer filtro de cada grupo), cada una con:
+        'url' (URL a scrapear), 'query' (consulta superconjunto), 'members'
+        (lista de (índice del filtro desde 1, consulta del filtro)) y 'max_pages'
+    """
+    groups: Dict[Tuple, List[Tuple[int, Dict]]] = {}
+    for idx, search_filter in enumerate(search_filters, 1):
+        url = search_filter.get('url', '')
+        if not url:
+            continue
+        query = parse_search_url(url)
+        key = _group_key(query) if coalesce else (idx,)
+        groups.setdefault(key, []).append((idx, query))
+
+    plans = []
+    for members in groups.values():
+        queries = [q for _, q in members]
+        if len(members) == 1:
+            plans.append({'url': queries[0]['url'], 'query': queries[0], 'members': members,
+                          'max_pages': max_pages})
+            continue
+
+        price_range = _union_range([q['price'] for q in queries])
+        price = (price_range[0], price_range[1], queries[0]['price'][2]) if price_range else None
+        bedrooms = _union_range([q['bedrooms'] for q in queries])
+        url = build_superset_url(queries[0]['url'], price, bedrooms)
+        superset = dict(parse_search_url(url), price=price, bedrooms=bedrooms)
+        # La unión trae (a lo sumo) los resultados de todos los filtros: con el tope de un
+        # solo filtro, los que quedan en páginas posteriores se perderían
+        plans.append({'url': url, 'query': superset, 'members': members,
+                      'max_pages': max_pages * len(members) if max_pages else None})
+
+    return plans
+
+def _within(value: Optional[float], member: Optional[Tuple], superset: Optional[Tuple],
+            margin: float = 0.0) -> bool:
+    """
+    Verifica un valor contra el rango del filtro (ensanchado en `margin`, relativo). Si el
+    filtro no es más estrecho que la búsqueda superconjunto, el sitio ya lo filtró; si no,
+    un valor desconocido se descarta (no hay forma de saber si cumple el rango del filtro).
+    """
+    if member is None or (superset is not None and member[:2] == superset[:2]):
+        return True
+    if value is None:
+        return False
+    return member[0] * (1 - margin) <= value <= member[1] * (1 + margin)
+
+def split_results(properties: List[Dict], member_query: Dict, superset_query: Dict,
+                  uf_value: float) -> List[Dict]:
+    """
+    Reparte los resultados de una búsqueda superconjunto a uno de sus filtros.
+
+    Args:
+        properties: Propiedades obtenidas con la búsqueda superconjunto
+        member_query: Consulta del filtro original
+        superset_query: Consulta superconjunto que se scrapeó
+        uf_value: Valor aproximado de la UF en pesos (para comparar precios en UF con rangos en
+                  CLP); los precios convertidos se comparan con un margen de UF_MARGIN
+
+    Returns:
+        Propiedades que cumplen los rangos del filtro original
+    """
+    # Copias: cada filtro agrega su propia información a las propiedades
+    if member_query is superset_query:
+        return [dict(prop) for prop in properties]
+
+    result = []
+    for prop in properties:
+        price = prop.get('price')
+        margin = 0.0
+        if price is not None and member_query['price'] is not None:
+            currency = member_query['price'][2]
+            unit = prop.get('price_unit') or 'CLP'
+            if unit == 'UF' and currency == 'CLP':
+                price, margin = price * uf_value, UF_MARGIN
+            elif unit == 'CLP' and currency in ('UF', 'CLF') and uf_value:
+                price, margin = price / uf_value, UF_MARGIN
+
+        if not _within(price, member_query['price'], superset_query['price'], margin):
+            continue
+        if not _within(prop.get('bedrooms'), member_query['bedrooms'], superset_query['bedrooms']):
+            continue
+        result.append(dict(prop))
+
+    return result
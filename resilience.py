@@ -0,0 +1,198 @@
+"""
+Resiliencia del scraping: reintentos con backoff exponencial y jitter, clasificación de
+errores y un circuit breaker por filtro.
+
+- Los errores se clasifican en "timeout", "driver_crash", "empty_page" u "other"; solo
+  los tres primeros se reintentan (un error de otro tipo no se arregla reintentando).
+- Cada filtro tiene un circuito: después de `failure_threshold` ciclos fallidos seguidos
+  se abre y el filtro deja de scrapearse durante un tiempo de enfriamiento que se duplica
+  con cada apertura. Pasado ese tiempo queda "semiabierto": se permite un intento; si
+  funciona, el circuito se cierra y si falla, se vuelve a abrir.
+- El estado de los circuitos se guarda en data/circuit_breakers.json.
+"""
+import json
+import random
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from config import (
+    BREAKER_COOLDOWN_MINUTES,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_FILE,
+    BREAKER_MAX_COOLDOWN_MINUTES,
+    RETRY_BASE_SECONDS,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_MAX_SECONDS
+)
+import metrics
+from storage_backends import write_json_atomic
+
+ERROR_KINDS = ("timeout", "driver_crash", "empty_page", "other")
+RETRYABLE_KINDS = ("timeout", "driver_crash", "empty_page")
+
+
+class EmptyPageError(Exception):
+    """La página cargó pero no trae resultados ni el aviso de búsqueda sin resultados (posible bloqueo)."""
+
+
+def classify_error(error: BaseException) -> str:
+    """Clasifica una excepción del scraping en uno de ERROR_KINDS."""
+    if isinstance(error, EmptyPageError):
+        return "empty_page"
+    if isinstance(error, (TimeoutException, requests.Timeout, TimeoutError)):
+        return "timeout"
+    if isinstance(error, WebDriverException):
+        message = str(error).lower()
+        if "timed out" in message or "timeout" in message:
+            return "timeout"
+        return "driver_crash"
+    return "other"
+
+
+class RetryPolicy:
+    """Backoff exponencial con jitter completo: espera aleatoria entre 0 y base * 2^intento (acotada)."""
+
+    def __init__(self, max_attempts: int = 3, base_seconds: float = 2.0, max_seconds: float = 60.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_seconds = max(0.0, base_seconds)
+        self.max_seconds = max(self.base_seconds, max_seconds)
+
+    def should_retry(self, kind: str, attempt: int) -> bool:
+        """Indica si corresponde otro intento después del intento `attempt` (desde 0) fallido."""
+        return kind in RETRYABLE_KINDS and attempt + 1 < self.max_attempts
+
+    def delay(self, attempt: int) -> float:
+        """Segundos de espera antes del intento `attempt + 1`."""
+        return random.uniform(0, min(self.max_seconds, self.base_seconds * (2 ** attempt)))
+
+
+class CircuitBreakers:
+    """Circuit breakers por filtro con estado persistente."""
+
+    def __init__(self, path: Path, failure_threshold: int = 3, cooldown_minutes: float = 30,
+                 max_cooldown_minutes: float = 360):
+        """
+        Args:
+            path: Archivo JSON donde se guarda el estado
+            failure_threshold: Ciclos fallidos seguidos para abrir el circuito
+            cooldown_minutes: Enfriamiento de la primera apertura
+            max_cooldown_minutes: Enfriamiento máximo (se duplica en cada apertura seguida)
+        """
+        self.path = path
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_minutes = cooldown_minutes
+        self.max_cooldown_minutes = max(cooldown_minutes, max_cooldown_minutes)
+        self._lock = threading.Lock()
+        self._states: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get("breakers", {}) if isinstance(data, dict) else {}
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Advertencia: No se pudo cargar el estado de los circuitos: {e}")
+            return {}
+
+    def _save(self):
+        """Guarda el estado de forma atómica (se llama con _lock tomado)."""
+        try:
+            write_json_atomic(self.path, {"breakers": self._states}, indent=2)
+        except (IOError, OSError) as e:
+            print(f"Error: No se pudo guardar el estado de los circuitos: {e}")
+
+    def _state(self, key: str) -> Dict:
+        return self._states.setdefault(key, {
+            "state": "closed", "failures": 0, "opens": 0, "last_error": None, "retry_at": None
+        })
+
+    def allow(self, key: str, name: str = "") -> bool:
+        """
+        Indica si el filtro se puede scrapear ahora.
+        Un circuito abierto cuyo enfriamiento terminó pasa a semiabierto y permite un intento.
+        """
+        with self._lock:
+            state = self._state(key)
+            if state["state"] != "open":
+                return True
+            retry_at = datetime.fromisoformat(state["retry_at"]) if state["retry_at"] else datetime.min
+            if datetime.now() < retry_at:
+                return False
+            state["state"] = "half_open"
+            self._save()
+        print(f"🔌 Circuito semiabierto: se prueba de nuevo {name or key[:60]}")
+        return True
+
+    def record_success(self, key: str, name: str = ""):
+        with self._lock:
+            state = self._state(key)
+            was = state["state"]
+            changed = was != "closed" or state["failures"]
+            state.update({"state": "closed", "failures": 0, "opens": 0, "last_error": None, "retry_at": None})
+            if changed:
+                self._save()
+        if was != "closed":
+            print(f"🔌 Circuito cerrado: {name or key[:60]} volvió a funcionar")
+
+    def record_failure(self, key: str, kind: str, name: str = ""):
+        with self._lock:
+            state = self._state(key)
+            state["failures"] += 1
+            state["last_error"] = kind
+            state["name"] = name
+            opened = state["state"] == "half_open" or state["failures"] >= self.failure_threshold
+            if opened:
+                cooldown = min(self.max_cooldown_minutes, self.cooldown_minutes * (2 ** state["opens"]))
+                state["opens"] += 1
+                state["state"] = "open"
+                state["retry_at"] = (datetime.now() + timedelta(minutes=cooldown)).isoformat()
+            self._save()
+        if opened:
+            metrics.inc("breaker_opens")
+            print(f"🔌 Circuito abierto: {name or key[:60]} ({state['failures']} fallo(s), último: {kind}); "
+                  f"no se scrapea hasta las {state['retry_at'][11:16]}")
+
+    def open_circuits(self) -> List[Dict]:
+        """Circuitos no cerrados (para los logs)."""
+        with self._lock:
+            return [dict(state, key=key) for key, state in self._states.items() if state["state"] != "closed"]
+
+    def describe(self) -> str:
+        """Resumen de los circuitos no cerrados, para los logs."""
+        return ", ".join(
+            f"{state.get('name') or state['key'][:40]} ({state['state']}, {state['failures']} fallo(s): "
+            f"{state['last_error']}, reintento {(state['retry_at'] or '')[11:16]})"
+            for state in self.open_circuits()
+        )
+
+
+_breakers: Optional[CircuitBreakers] = None
+_breakers_lock = threading.Lock()
+
+def get_circuit_breakers() -> CircuitBreakers:
+    """Retorna los circuit breakers globales (configurados desde config.py)."""
+    global _breakers
+    with _breakers_lock:
+        if _breakers is None:
+            _breakers = CircuitBreakers(
+                Path(BREAKER_FILE),
+                failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                cooldown_minutes=BREAKER_COOLDOWN_MINUTES,
+                max_cooldown_minutes=BREAKER_MAX_COOLDOWN_MINUTES
+            )
+        return _breakers
+
+def get_retry_policy(max_attempts: Optional[int] = None) -> RetryPolicy:
+    """Política de reintentos configurada (max_attempts reemplaza RETRY_MAX_ATTEMPTS si se indica)."""
+    return RetryPolicy(
+        max_attempts=max_attempts or RETRY_MAX_ATTEMPTS,
+        base_seconds=RETRY_BASE_SECONDS,
+        max_seconds=RETRY_MAX_SECONDS
+    )
@@ -0,0 +1,395 @@
+"""
+Retención de propiedades vistas: TTL sobre last_seen.
+
+Las propiedades que no aparecen en ninguna búsqueda hace más de RETENTION_DAYS días salen
+del almacenamiento "caliente" (el que se carga en cada ciclo) y pasan a:
+
+- un archivo frío comprimido (data/properties-archive.jsonl.gz): una línea JSON por
+  propiedad con todos sus datos, agregada como un miembro gzip nuevo en cada paso;
+- una "lápida" compacta de su ID (data/properties-tombstones.bin, 8 bytes por ID), que se
+  sigue consultando para no volver a notificarla si reaparece.
+
+No ver una propiedad no basta: la paginación se corta apenas una página trae solo propiedades
+ya vistas, así que las de las páginas siguientes no se ven aunque sigan publicadas. Por eso se
+registra el último recorrido completo de cada búsqueda (data/properties-crawls.json, ver
+CrawlLog), y una propiedad solo se archiva si un recorrido completo de su filtro, posterior a
+la última vez que se vio, no la encontró. Cada búsqueda se recorre entera al menos cada
+RETENTION_DAYS / 2 días.
+
+El trabajo se hace por lotes en un thread de fondo, así el almacenamiento caliente queda
+acotado (y con él el tiempo de carga y la memoria) sin frenar los ciclos.
+Cada paso escribe primero el archivo frío, después las lápidas y recién entonces borra del
+almacenamiento: un corte en cualquier punto solo puede dejar una propiedad repetida en el
+archivo frío, nunca perderla ni volver a notificarla.
+
+Uso manual (un pase completo): python retention.py
+"""
+import gzip
+import json
+import os
+import re
+import threading
+from array import array
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, Set, Union
+
+import metrics
+from storage_backends import write_json_atomic
+
+# Resolución de last_seen y de los recorridos completos: solo se guardan cuando avanzan al
+# menos esto (así un ciclo sin novedades no reescribe el almacenamiento)
+LAST_SEEN_STEP = timedelta(days=1)
+
+_ID_RE = re.compile(r'^([A-Z]{3})-?(\d+)$')
+_NUMBER_BITS = 44  # Hasta ~1,7e13: sobra para los IDs de MercadoLibre
+_NUMBER_MASK = (1 << _NUMBER_BITS) - 1
+
+
+def encode_property_id(property_id: Union[str, int]) -> Optional[int]:
+    """
+    Codifica un ID ("MLC-123", "MLC123" o solo dígitos) como entero de 64 bits: las letras
+    del sitio (5 bits cada una) en los bits altos y el número en los bajos.
+
+    Returns:
+        El entero, o None si el ID no tiene ese formato (por ejemplo, un path de URL)
+    """
+    if isinstance(property_id, int):
+        return property_id
+    text = str(property_id).strip().upper()
+    if text.isdigit() and text.isascii():
+        site, number = 0, int(text)
+    else:
+        match = _ID_RE.match(text)
+        if not match:
+            return None
+        letters, digits = match.groups()
+        site = 0
+        for letter in letters:
+            site = site * 32 + (ord(letter) - 64)
+        number = int(digits)
+    if number > _NUMBER_MASK:
+        return None
+    return (site << _NUMBER_BITS) | number
+
+
+def decode_property_id(value: int) -> str:
+    """Inverso de encode_property_id (con guion: "MLC-123")."""
+    site, number = value >> _NUMBER_BITS, value & _NUMBER_MASK
+    if not site:
+        return str(number)
+    letters = ""
+    while site:
+        site, code = divmod(site, 32)
+        letters = chr(code + 64) + letters
+    return f"{letters}-{number}"
+
+
+class TombstoneSet:
+    """
+    IDs archivados: un archivo binario de solo-agregar con los IDs como enteros de 64 bits
+    (más un .txt al lado para los pocos IDs que no se pueden codificar), cargado en memoria
+    la primera vez que se consulta.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.text_path = path.with_suffix(".txt")
+        self._lock = threading.Lock()
+        self._encoded: Optional[Set[int]] = None
+        self._other: Set[str] = set()
+
+    def _load(self) -> Set[int]:
+        """IDs codificados en memoria (se llama con _lock tomado)."""
+        if self._encoded is not None:
+            return self._encoded
+        values = array('q')
+        if self.path.exists():
+            data = self.path.read_bytes()
+            usable = len(data) - len(data) % values.itemsize
+            if usable != len(data):
+                # Una escritura cortada a la mitad: esos IDs siguen en el almacenamiento y se reintentan.
+                # Se recorta para que lo que se agregue después quede alineado
+                print(f"Advertencia: {self.path.name} termina en un ID incompleto, se descarta")
+                os.truncate(self.path, usable)
+            values.frombytes(data[:usable])
+        if self.text_path.exists():
+            with open(self.text_path, 'r', encoding='utf-8') as f:
+                self._other = {line.rstrip("\n") for line in f if line.strip()}
+        self._encoded = set(values)
+        return self._encoded
+
+    def _contains(self, property_id) -> bool:
+        value = encode_property_id(property_id)
+        if value is None:
+            return str(property_id) in self._other
+        return value in self._load()
+
+    def __contains__(self, property_id) -> bool:
+        with self._lock:
+            return self._contains(property_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load()) + len(self._other)
+
+    def ids(self) -> Set[str]:
+        """IDs archivados como texto (con el formato "MLC-123")."""
+        with self._lock:
+            return {decode_property_id(value) for value in self._load()} | self._other
+
+    def add(self, property_ids: Iterable[str]):
+        """Agrega lápidas (con fsync). Lanza IOError/OSError si no se pudieron escribir."""
+        with self._lock:
+            encoded, other = array('q'), []
+            for property_id in property_ids:
+                if self._contains(property_id):
+                    continue
+                value = encode_property_id(property_id)
+                if value is None:
+                    other.append(str(property_id))
+                else:
+                    encoded.append(value)
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            for path, payload in ((self.path, encoded.tobytes()),
+                                  (self.text_path, "".join(f"{pid}\n" for pid in other).encode('utf-8'))):
+                if not payload:
+                    continue
+                with open(path, 'ab') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._encoded.update(encoded)
+            self._other.update(other)
+
+
+class CrawlLog:
+    """
+    Último recorrido completo (sin cortar la paginación) de cada búsqueda, por URL de filtro.
+    Un filtro registrado sin recorrido completo queda con None: sus propiedades no se archivan.
+    El archivo solo se reescribe cuando aparece un filtro o un recorrido avanza LAST_SEEN_STEP.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._crawls: Optional[Dict[str, Optional[str]]] = None
+
+    def _load(self) -> Dict[str, Optional[str]]:
+        """Recorridos en memoria (se llama con _lock tomado)."""
+        if self._crawls is None:
+            self._crawls = {}
+            if self.path.exists():
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    if isinstance(data, dict):
+                        self._crawls = dict(data.get("crawls", {}))
+                except (json.JSONDecodeError, IOError) as e:
+                    print(f"Advertencia: No se pudo cargar el registro de recorridos: {e}")
+        return self._crawls
+
+    def _save(self):
+        try:
+            write_json_atomic(self.path, {"crawls": self._crawls}, indent=2)
+        except (IOError, OSError) as e:
+            print(f"Error: No se pudo guardar el registro de recorridos: {e}")
+
+    def register(self, urls: Iterable[str]):
+        """Registra los filtros que se scrapean (los nuevos, sin recorrido completo)."""
+        with self._lock:
+            crawls = self._load()
+            new = [url for url in urls if url and url not in crawls]
+            if new:
+                crawls.update((url, None) for url in new)
+                self._save()
+
+    def is_due(self, url: str, max_age: timedelta) -> bool:
+        """True si la búsqueda no tiene un recorrido completo en los últimos `max_age`."""
+        with self._lock:
+            last = self._load().get(url)
+        return last is None or datetime.fromisoformat(last) < datetime.now() - max_age
+
+    def record_complete(self, urls: Iterable[str], at: str):
+        """Registra un recorrido completo de las búsquedas, iniciado en `at` (ISO)."""
+        with self._lock:
+            crawls = self._load()
+            changed = False
+            for url in urls:
+                last = crawls.get(url)
+                if last is None or datetime.fromisoformat(at) - datetime.fromisoformat(last) >= LAST_SEEN_STEP:
+                    crawls[url] = at
+                    changed = True
+            if changed:
+                self._save()
+
+    def evictable(self) -> Callable[[Dict], bool]:
+        """
+        Predicado para backend.stale: True si un recorrido completo del filtro de la
+        propiedad, posterior a su last_seen, no la encontró. Las propiedades de filtros que
+        ya no se scrapean solo dependen de RETENTION_DAYS; las sin filtro, de todos los filtros.
+        """
+        with self._lock:
+            crawls = dict(self._load())
+        # last_seen solo avanza de a LAST_SEEN_STEP: una propiedad vista en un recorrido
+        # puede tener un last_seen hasta ese margen anterior a él
+        bounds = {url: (datetime.fromisoformat(at) - LAST_SEEN_STEP).isoformat() if at else None
+                  for url, at in crawls.items()}
+        oldest = None if None in bounds.values() else min(bounds.values(), default=None)
+
+        def check(info: Dict) -> bool:
+            url = info.get("filter_url")
+            if url:
+                if url not in bounds:
+                    return True
+                bound = bounds[url]
+            elif bounds:
+                bound = oldest
+            else:
+                return True
+            seen = info.get("last_seen") or info.get("first_seen")
+            return bound is not None and seen < bound
+
+        return check
+
+
+def append_archive(path: Path, properties_data: Dict[str, Dict], archived_at: str) -> int:
+    """
+    Agrega propiedades al archivo frío como un miembro gzip nuevo (con fsync).
+
+    Returns:
+        Bytes comprimidos agregados
+    """
+    payload = "".join(
+        json.dumps({"id": pid, **info, "archived_at": archived_at}, ensure_ascii=False,
+                   separators=(',', ':')) + "\n"
+        for pid, info in properties_data.items()
+    ).encode('utf-8')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'ab') as raw:
+        start = raw.tell()
+        with gzip.GzipFile(fileobj=raw, mode='wb') as compressed:
+            compressed.write(payload)
+        raw.flush()
+        os.fsync(raw.fileno())
+        return raw.tell() - start
+
+
+def iter_archive(path: Path) -> Iterator[Dict]:
+    """Recorre el archivo frío (una propiedad por registro; puede haber repetidas, vale la última)."""
+    if not path.exists():
+        return
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Advertencia: Registro inválido en {path.name}, se ignora")
+    except (EOFError, OSError) as e:
+        # Típicamente el último miembro, cortado por un corte de energía
+        print(f"Advertencia: {path.name} termina cortado, se ignora el resto: {e}")
+
+
+def evict_stale(backend, tombstones: TombstoneSet, archive_path: Path,
+                max_age_days: float, limit: int, crawl_log: Optional[CrawlLog] = None) -> int:
+    """
+    Un paso de retención: archiva y borra hasta `limit` propiedades sin ver hace más de
+    `max_age_days` días. Las propiedades sin fechas (formato antiguo) no se tocan, y con
+    `crawl_log`, tampoco las que ningún recorrido completo de su filtro dejó de ver.
+
+    Returns:
+        Cantidad de propiedades archivadas en este paso
+    """
+    cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+    stale = backend.stale(cutoff, limit, crawl_log.evictable() if crawl_log else None)
+    if not stale:
+        return 0
+
+    with metrics.timer("storage_retention"):
+        written = append_archive(archive_path, stale, datetime.now().isoformat())
+        tombstones.add(stale)
+        if not backend.remove(stale):
+            return 0
+    metrics.inc("storage_bytes_written", written)
+    metrics.inc("retention_archived", len(stale))
+    return len(stale)
+
+
+class RetentionWorker:
+    """
+    Thread de fondo que aplica la retención cada `interval_minutes`, por lotes de
+    `batch_size` con una pausa entre lotes, hasta que no quedan propiedades vencidas.
+    """
+
+    def __init__(self, backend, tombstones: TombstoneSet, archive_path: Path, max_age_days: float,
+                 batch_size: int = 1000, interval_minutes: float = 60, pause_seconds: float = 1.0,
+                 crawl_log: Optional[CrawlLog] = None):
+        self.backend = backend
+        self.tombstones = tombstones
+        self.crawl_log = crawl_log
+        self.archive_path = archive_path
+        self.max_age_days = max_age_days
+        self.batch_size = max(1, batch_size)
+        self.interval_seconds = max(60.0, interval_minutes * 60)
+        self.pause_seconds = pause_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        """Inicia el thread de fondo. Retorna False si la retención está deshabilitada."""
+        if self._thread is not None:
+            return True
+        if self.max_age_days <= 0:
+            return False
+        self._thread = threading.Thread(target=self._run, name="storage-retention", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        # El primer pase espera un poco para no competir con el arranque y el primer ciclo
+        delay = min(self.interval_seconds, 60.0)
+        while not self._stop.wait(delay):
+            try:
+                self.run_pass()
+            except Exception as e:
+                print(f"⚠ Error en la retención del almacenamiento: {e}")
+            delay = self.interval_seconds
+
+    def run_pass(self) -> int:
+        """
+        Archiva lotes hasta que no quedan propiedades vencidas (o se detiene el worker).
+
+        Returns:
+            Cantidad de propiedades archivadas
+        """
+        total = 0
+        while not self._stop.is_set():
+            archived = evict_stale(self.backend, self.tombstones, self.archive_path,
+                                   self.max_age_days, self.batch_size, self.crawl_log)
+            total += archived
+            if archived < self.batch_size or self._stop.wait(self.pause_seconds):
+                break
+        if total:
+            print(f"🗄️ Retención: {total} propiedad(es) sin ver hace más de {self.max_age_days:g} días "
+                  f"archivadas en {self.archive_path.name}")
+        return total
+
+
+if __name__ == "__main__":
+    from config import RETENTION_DAYS, RETENTION_BATCH_SIZE, RETENTION_ARCHIVE_FILE
+    from storage import get_backend, get_crawl_log, get_tombstones
+
+    if RETENTION_DAYS <= 0:
+        print("La retención está deshabilitada (RETENTION_DAYS=0)")
+    else:
+        worker = RetentionWorker(get_backend(), get_tombstones(), Path(RETENTION_ARCHIVE_FILE),
+                                 RETENTION_DAYS, batch_size=RETENTION_BATCH_SIZE, pause_seconds=0,
+                                 crawl_log=get_crawl_log())
+        archived = worker.run_pass()
+        print(f"Archivadas: {archived}; lápidas: {len(get_tombstones())}; "
+              f"quedan en el almacenamiento: {get_backend().count()}")
@@ -0,0 +1,274 @@
+"""
+Planificador de verificaciones por fechas límite (deadlines).
+Cada filtro tiene su propia grilla de ejecuciones: un intervalo fijo en minutos o una
+expresión cron de 5 campos ("*/15 7-23 * * *"). La próxima ejecución se calcula desde la
+fecha límite anterior y no desde el fin del scraping, así que la frecuencia real no se
+desplaza con la duración de cada ciclo.
+
+Si una verificación dura más que el intervalo, las ejecuciones perdidas se juntan en una
+sola ejecución inmediata ("coalesce") o se saltan hasta el próximo horario de la grilla
+("skip"). La espera se puede interrumpir con stop() (por ejemplo, desde un handler de señal).
+"""
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Union
+
+import metrics
+
+MISSED_RUN_POLICIES = ("coalesce", "skip")
+
+# Rango de valores de cada campo cron: minuto, hora, día del mes, mes, día de la semana
+_CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> Set[int]:
+    """Parsea un campo cron ('*', '5', '1-5', '*/10', '0-30/5', '1,15') a un conjunto de valores."""
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError(f"paso inválido en '{field}'")
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start_text, end_text = part.split('-', 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"valor fuera de rango en '{field}' ({low}-{high})")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Expresión cron de 5 campos (minuto hora día mes día_semana; 0 = domingo, 7 también)."""
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"La expresión cron debe tener 5 campos: '{expression}'")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_cron_field(field, low, high) for field, (low, high) in zip(fields, _CRON_FIELDS)
+        )
+        if 7 in self.weekdays:
+            self.weekdays = (self.weekdays - {7}) | {0}  # 7 también es domingo
+        # Como en cron: si se restringen día del mes y día de la semana, basta con que coincida uno
+        self._restrict_dom = fields[2] != '*'
+        self._restrict_dow = fields[4] != '*'
+
+    def _day_matches(self, moment: datetime) -> bool:
+        dom = moment.day in self.days
+        dow = (moment.weekday() + 1) % 7 in self.weekdays  # datetime: lunes = 0; cron: domingo = 0
+        if self._restrict_dom and self._restrict_dow:
+            return dom or dow
+        return dom and dow
+
+    def next_after(self, timestamp: float) -> float:
+        """Primer horario de la grilla estrictamente posterior a `timestamp` (segundos epoch)."""
+        moment = datetime.fromtimestamp(timestamp).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+                moment = moment.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+                continue
+            if moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+                continue
+            return moment.timestamp()
+        raise ValueError(f"La expresión cron '{self.expression}' nunca se cumple")
+
+    def __str__(self) -> str:
+        return f"cron '{self.expression}'"
+
+
+class IntervalSchedule:
+    """Grilla de intervalo fijo en minutos."""
+
+    def __init__(self, minutes: float):
+        if minutes <= 0:
+            raise ValueError(f"El intervalo debe ser mayor que 0 (recibido {minutes})")
+        self.minutes = float(minutes)
+
+    def next_after(self, timestamp: float) -> float:
+        return timestamp + self.minutes * 60
+
+    def __str__(self) -> str:
+        return f"cada {self.minutes:g} min"
+
+
+def parse_schedule(spec: Union[str, int, float]) -> Union[CronSchedule, IntervalSchedule]:
+    """
+    Convierte la configuración de un filtro en su grilla.
+
+    Args:
+        spec: Minutos (número o texto numérico) o expresión cron de 5 campos
+
+    Raises:
+        ValueError: Si el formato no es válido
+    """
+    if isinstance(spec, (int, float)):
+        return IntervalSchedule(spec)
+    text = str(spec).strip()
+    try:
+        return IntervalSchedule(float(text))
+    except ValueError:
+        return CronSchedule(text)
+
+
+class DeadlineScheduler:
+    """
+    Mantiene la próxima fecha límite de cada trabajo (filtro) y espera hasta la siguiente.
+
+    Uso:
+        scheduler.add_job(0, IntervalSchedule(30))
+        while True:
+            due = scheduler.wait_for_due()
+            if not due:
+                break  # stop()
+            ...
+            scheduler.complete(due)
+    """
+
+    def __init__(self, jitter_seconds: float = 0, missed_run_policy: str = "coalesce"):
+        """
+        Args:
+            jitter_seconds: Retraso aleatorio máximo agregado a cada despertar (no se acumula)
+            missed_run_policy: "coalesce" (una ejecución inmediata por todas las perdidas)
+                               o "skip" (esperar al próximo horario de la grilla)
+        """
+        if missed_run_policy not in MISSED_RUN_POLICIES:
+            raise ValueError(f"Política inválida '{missed_run_policy}' (usa {' o '.join(MISSED_RUN_POLICIES)})")
+        self.jitter_seconds = max(0.0, jitter_seconds)
+        self.missed_run_policy = missed_run_policy
+        self._jobs: Dict[int, Dict] = {}  # id -> {'schedule', 'deadline', 'last'}
+        self._stop = threading.Event()
+
+    def add_job(self, job_id: int, schedule, first_run: Optional[float] = None):
+        """
+        Registra un trabajo.
+
+        Args:
+            job_id: Identificador (índice del filtro)
+            schedule: IntervalSchedule o CronSchedule
+            first_run: Primera fecha límite (epoch). Por defecto: ahora para intervalos,
+                       el próximo horario para cron.
+        """
+        now = time.time()
+        if first_run is None:
+            first_run = now if isinstance(schedule, IntervalSchedule) else schedule.next_after(now)
+        self._jobs[job_id] = {"schedule": schedule, "deadline": first_run, "last": None}
+
+    def schedule_of(self, job_id: int):
+        return self._jobs[job_id]["schedule"]
+
+    def set_interval(self, job_id: int, minutes: float):
+        """
+        Cambia el intervalo de un trabajo de intervalo fijo.
+        La próxima fecha límite se recalcula desde la última ejecución (sin desplazar la grilla).
+        """
+        job = self._jobs[job_id]
+        if not isinstance(job["schedule"], IntervalSchedule) or job["schedule"].minutes == minutes:
+            return
+        job["schedule"] = IntervalSchedule(minutes)
+        if job["last"] is not None:
+            job["deadline"] = job["schedule"].next_after(job["last"])
+
+    def next_deadline(self) -> Optional[float]:
+        """Fecha límite más próxima (epoch), o None si no hay trabajos."""
+        if not self._jobs:
+            return None
+        return min(job["deadline"] for job in self._jobs.values())
+
+    def due_jobs(self, now: Optional[float] = None) -> List[int]:
+        """Trabajos cuya fecha límite ya pasó, en orden de id."""
+        now = time.time() if now is None else now
+        return sorted(job_id for job_id, job in self._jobs.items() if job["deadline"] <= now)
+
+    def wait_for_due(self) -> List[int]:
+        """
+        Espera hasta la próxima fecha límite (más el jitter) y retorna los trabajos que tocan.
+
+        Returns:
+            Lista de ids, o lista vacía si se llamó a stop() durante la espera
+        """
+        while not self._stop.is_set():
+            deadline = self.next_deadline()
+            if deadline is None:
+                self._stop.wait()
+                break
+            wake_at = deadline + (random.uniform(0, self.jitter_seconds) if self.jitter_seconds else 0)
+            if self._stop.wait(max(0.0, wake_at - time.time())):
+                break
+            due = self.due_jobs()
+            if due:
+                now = time.time()
+                for job_id in due:
+                    metrics.observe("schedule_lateness", max(0.0, now - self._jobs[job_id]["deadline"]))
+                return due
+        return []
+
+    def complete(self, job_ids: List[int], now: Optional[float] = None) -> int:
+        """
+        Marca trabajos como ejecutados y calcula su próxima fecha límite desde la anterior.
+
+        Returns:
+            Cantidad de ejecuciones perdidas (por verificaciones más largas que el intervalo)
+        """
+        now = time.time() if now is None else now
+        total_missed = 0
+        for job_id in job_ids:
+            job = self._jobs[job_id]
+            schedule = job["schedule"]
+            job["last"] = job["deadline"]
+
+            next_deadline = schedule.next_after(job["deadline"])
+            missed = 0
+            last_missed = None
+            while next_deadline <= now:
+                missed += 1
+                last_missed = next_deadline
+                next_deadline = schedule.next_after(next_deadline)
+
+            if missed and self.missed_run_policy == "coalesce":
+                # Todas las ejecuciones perdidas se juntan en una sola, inmediata
+                job["deadline"] = last_missed
+                missed -= 1
+            else:
+                job["deadline"] = next_deadline
+            total_missed += missed
+
+        if total_missed:
+            metrics.inc("scheduler_missed_runs", total_missed)
+            print(f"⚠ La verificación duró más que el intervalo: {total_missed} ejecución(es) perdida(s) "
+                  f"({'se juntan en una' if self.missed_run_policy == 'coalesce' else 'se saltan'})")
+        return total_missed
+
+    def stop(self):
+        """Interrumpe la espera actual y las siguientes."""
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def describe(self) -> str:
+        """Resumen de la grilla y la próxima ejecución de cada trabajo, para los logs."""
+        return ", ".join(
+            f"[{job_id + 1}] {job['schedule']} → {datetime.fromtimestamp(job['deadline']).strftime('%H:%M:%S')}"
+            for job_id, job in sorted(self._jobs.items())
+        )
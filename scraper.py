@@ -3,17 +3,50 @@ Scraper simplificado para Portal Inmobiliario.
 Versión optimizada para producción con mejor manejo de errores.
 """
 from bs4 import BeautifulSoup
+import json
 import re
 import time
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set
 from urllib.parse import urljoin, urlparse
+import atexit
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from config import (
+    BLOCKED_URL_PATTERNS,
+    DRIVER_POOL_SIZE,
+    DRIVER_MAX_PAGES,
+    DRIVER_PREWARM,
+    FETCH_MODE,
+    FINGERPRINTING,
+    CHROME_MEMORY_CHECK_SECONDS,
+    CHROME_MEMORY_LIMIT_MB,
+    HARD_KILL_GRACE_SECONDS,
+    MAX_PAGES,
+    MAX_TABS_PER_DRIVER,
+    PAGE_FETCH_CONCURRENCY,
+    PAGE_SIZE,
+    PARSER_BACKEND,
+    PARSE_SCOPE,
+    PAGE_LOAD_TIMEOUT,
+    READY_MIN_SECONDS,
+    READY_MAX_SECONDS,
+    SCROLL_MAX_SECONDS,
+    SCROLL_SETTLE_SECONDS,
+    TRACK_PAGE_BYTES
+)
+import fingerprints
+import metrics
+from chrome_watchdog import ChromeWatchdog, hard_timeout
+from driver_pool import DriverPool
+from page_readiness import wait_until_ready
+from resilience import RETRYABLE_KINDS, EmptyPageError, classify_error, get_retry_policy
+from tab_loader import load_in_tabs
 
 # Configuración de Selenium optimizada para producción
 def get_driver(headless: bool = True):
@@ -42,6 +75,10 @@ def get_driver(headless: bool = True):
     chrome_options.add_argument('--disable-logging')
     chrome_options.add_argument('--log-level=3')
     chrome_options.add_argument('--silent')
+    # Las pestañas en segundo plano (modo multipestaña) cargan a la misma velocidad que la visible
+    chrome_options.add_argument('--disable-background-timer-throttling')
+    chrome_options.add_argument('--disable-backgrounding-occluded-windows')
+    chrome_options.add_argument('--disable-renderer-backgrounding')
     chrome_options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
 
     # Deshabilitar imágenes y recursos innecesarios para acelerar carga
@@ -53,6 +90,10 @@ def get_driver(headless: bool = True):
     chrome_options.add_experimental_option("prefs", prefs)
     chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
 
+    # Log de performance (eventos de red) para medir los bytes descargados por página
+    if TRACK_PAGE_BYTES:
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
     # Detectar si estamos en producción (Docker/Linux) o desarrollo (Windows)
     chrome_binary = os.getenv('CHROME_BINARY', None)
     chromedriver_path = os.getenv('CHROMEDRIVER_PATH', None)
@@ -62,19 +103,107 @@ def get_driver(headless: bool = True):
         chrome_options.binary_location = chrome_binary
 
     try:
-        if chromedriver_path and os.path.exists(chromedriver_path):
-            # Usar driver del sistema si está disponible
-            service = Service(chromedriver_path)
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-        else:
-            # Intentar sin especificar path (usar el del sistema)
-            driver = webdriver.Chrome(options=chrome_options)
+        with metrics.timer("driver_startup"):
+            if chromedriver_path and os.path.exists(chromedriver_path):
+                # Usar driver del sistema si está disponible
+                service = Service(chromedriver_path)
+                driver = webdriver.Chrome(service=service, options=chrome_options)
+            else:
+                # Intentar sin especificar path (usar el del sistema)
+                driver = webdriver.Chrome(options=chrome_options)
 
+            apply_resource_blocking(driver)
+        metrics.inc("drivers_started")
         return driver
     except Exception as e:
+        metrics.inc("driver_start_errors")
         print(f"❌ Error al inicializar Chrome: {e}")
         raise
 
+def apply_resource_blocking(driver, patterns: Optional[List[str]] = None):
+    """
+    Bloquea a nivel de red (Chrome DevTools Protocol) las URLs que coinciden con los patrones:
+    fuentes, CSS, imágenes, mapas, publicidad y analítica. Así no se descargan en ninguna página.
+    El bloqueo aplica a la pestaña actual: las pestañas que se abren después lo necesitan de nuevo.
+
+    Args:
+        driver: WebDriver de Chrome
+        patterns: Patrones con comodines '*' (por defecto, BLOCKED_URL_PATTERNS de config)
+    """
+    patterns = BLOCKED_URL_PATTERNS if patterns is None else patterns
+    if not patterns:
+        return
+
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+    except Exception as e:
+        # No es crítico: la página carga igual, solo que más pesada
+        print(f"⚠ No se pudo activar el bloqueo de recursos: {e}")
+
+def get_transferred_bytes(driver) -> int:
+    """
+    Suma los bytes transferidos por la red desde la última llamada.
+    Lee (y vacía) el log de performance de Chrome, así que sirve para medir página a página.
+
+    Returns:
+        Bytes transferidos (0 si el log de performance no está disponible)
+    """
+    if not TRACK_PAGE_BYTES:
+        return 0
+
+    total = 0
+    try:
+        for entry in driver.get_log('performance'):
+            message = entry.get('message', '')
+            if 'Network.loadingFinished' not in message:
+                continue
+            params = json.loads(message).get('message', {}).get('params', {})
+            total += int(params.get('encodedDataLength', 0) or 0)
+    except Exception:
+        return 0
+    return total
+
+# Pool global de drivers (se crea bajo demanda y vive todo el proceso)
+_driver_pool: Optional[DriverPool] = None
+_driver_watchdog: Optional[ChromeWatchdog] = None
+_driver_pool_lock = threading.Lock()
+
+def get_driver_pool() -> DriverPool:
+    """
+    Retorna el pool global de drivers, creándolo la primera vez.
+    Los navegadores quedan abiertos entre filtros y entre ciclos de monitoreo.
+    """
+    global _driver_pool, _driver_watchdog
+    with _driver_pool_lock:
+        if _driver_pool is None:
+            _driver_pool = DriverPool(
+                driver_factory=get_driver,
+                max_size=DRIVER_POOL_SIZE,
+                max_pages=DRIVER_MAX_PAGES,
+                page_load_timeout=PAGE_LOAD_TIMEOUT,
+                keep_warm=DRIVER_PREWARM
+            )
+            # Watchdog de memoria: recicla los navegadores que superan CHROME_MEMORY_LIMIT_MB
+            _driver_watchdog = ChromeWatchdog(
+                _driver_pool, CHROME_MEMORY_LIMIT_MB, interval_seconds=CHROME_MEMORY_CHECK_SECONDS
+            )
+            _driver_watchdog.start()
+            atexit.register(shutdown_driver_pool)
+        return _driver_pool
+
+def shutdown_driver_pool():
+    """Cierra todos los navegadores del pool global (si existe)."""
+    global _driver_pool, _driver_watchdog
+    with _driver_pool_lock:
+        pool, _driver_pool = _driver_pool, None
+        watchdog, _driver_watchdog = _driver_watchdog, None
+    if watchdog is not None:
+        watchdog.stop()
+    if pool is not None:
+        pool.shutdown()
+    discard_prefetched()
+
 def extract_price(price_text: str) -> tuple:
     """
     Extrae el precio numérico y la unidad de un texto.
@@ -102,10 +231,13 @@ def extract_price(price_text: str) -> tuple:
 
     try:
         price_value = int(numbers_only)
-        unidad = 'UF' if is_uf else 'CLP'
-        return price_value, unidad
     except ValueError:
         return None, None
+    if price_value <= 0:
+        # "$ 0" es un aviso sin precio publicado: igual que el modo HTTP, se trata como sin precio
+        return None, None
+    unidad = 'UF' if is_uf else 'CLP'
+    return price_value, unidad
 
 def extract_property_id(url: str) -> Optional[str]:
     """
@@ -155,109 +287,574 @@ def scroll_page_simple(driver, max_scrolls: int = 5, scroll_pause_time: float =
     print(f"✓ Scroll completado: {max_scrolls} scrolls realizados")
     return max_scrolls
 
-def scrape_properties(url: str, headless: bool = True, max_retries: int = 3) -> List[Dict]:
+def build_page_url(url: str, page_number: int, page_size: int = PAGE_SIZE) -> str:
     """
-    Scrapea propiedades de Portal Inmobiliario usando Selenium.
+    Construye la URL de una página de resultados usando el offset del sitio (_Desde_N).
+    Ejemplo (página 2, 48 por página): '/arriendo/casa/_PriceRange_...' -> '/arriendo/casa/_Desde_49_PriceRange_...'
+
+    Args:
+        url: URL de búsqueda (página 1)
+        page_number: Número de página (1 = la URL original)
+        page_size: Resultados por página
+
+    Returns:
+        URL de la página solicitada
+    """
+    parsed = urlparse(url)
+    # Quitar un offset previo para poder recalcularlo
+    path = re.sub(r'_Desde_\d+', '', parsed.path)
+
+    if page_number > 1:
+        offset = (page_number - 1) * page_size + 1
+        segments = path.split('/')
+        for i, segment in enumerate(segments):
+            if segment.startswith('_'):
+                segments[i] = f"_Desde_{offset}{segment}"
+                break
+        else:
+            segments.append(f"_Desde_{offset}")
+        path = '/'.join(segments)
+
+    return parsed._replace(path=path).geturl()
+
+def scrape_properties(url: str, headless: bool = True, max_retries: Optional[int] = None,
+                      fetch_mode: Optional[str] = None, max_pages: Optional[int] = None,
+                      seen_ids: Optional[Set[str]] = None,
+                      use_fingerprint: Optional[bool] = None, stop_when_seen: bool = True,
+                      crawl: Optional[Dict] = None) -> Optional[List[Dict]]:
+    """
+    Scrapea propiedades de Portal Inmobiliario, siguiendo la paginación del listado.
     Versión simplificada y robusta para producción.
 
+    Las páginas 2 en adelante se obtienen en paralelo (PAGE_FETCH_CONCURRENCY a la vez),
+    hasta `max_pages`. Se deja de paginar apenas una página viene vacía, no trae enlace a una
+    página siguiente o trae solo propiedades ya vistas; así un ciclo sin novedades cuesta una
+    sola página. Al cortar, las páginas del lote que siguen en curso dejan de reintentar.
+    Con stop_when_seen=False se sigue hasta la última página (o max_pages): es el recorrido
+    completo que la retención necesita para saber qué propiedades ya no están publicadas.
+
+    Si la búsqueda tiene una sola página y su huella es la misma que en el ciclo anterior
+    (ver fingerprints.py), no se parsea: se retorna None. La huella nueva queda pendiente hasta que
+    el llamador la confirme con fingerprints.commit_pending.
+
+    Args:
+        url: URL a scrapear
+        headless: Si True, ejecuta el navegador sin interfaz gráfica
+        max_retries: Número máximo de intentos (por defecto, RETRY_MAX_ATTEMPTS de config)
+        fetch_mode: "selenium" o "http" (por defecto, FETCH_MODE de config)
+        max_pages: Máximo de páginas a recorrer (por defecto, MAX_PAGES de config)
+        seen_ids: IDs ya vistos; si es None se cargan desde storage
+        use_fingerprint: Usar el atajo de huellas (por defecto, FINGERPRINTING de config)
+        stop_when_seen: Cortar la paginación en una página con solo propiedades ya vistas
+        crawl: Si se indica, se completa con "complete": True si se llegó a la última página
+               del listado (sin cortar por propiedades ya vistas, max_pages o un error)
+
+    Returns:
+        Lista de diccionarios con información de cada propiedad (sin duplicados),
+        o None si el listado no cambió desde el ciclo anterior
+
+    Raises:
+        El error de la primera página si falla después de los reintentos
+        (un error en las páginas siguientes solo corta la paginación)
+    """
+    max_pages = max(1, max_pages or MAX_PAGES)
+    if use_fingerprint is None:
+        use_fingerprint = FINGERPRINTING
+
+    if seen_ids is None:
+        from storage import load_seen_index
+        seen_ids = load_seen_index()
+
+    properties = []
+    found_ids = set()
+    if crawl is None:
+        crawl = {}
+    crawl["complete"] = False
+
+    def add_page(page_properties: List[Dict], page_info: Dict) -> bool:
+        """Agrega una página al resultado. Retorna True si hay que seguir paginando."""
+        metrics.inc("pages_fetched")
+        page_ids = [p['id'] for p in page_properties]
+        for prop in page_properties:
+            if prop['id'] not in found_ids:
+                found_ids.add(prop['id'])
+                properties.append(prop)
+        if not page_properties or not page_info.get("has_next"):
+            crawl["complete"] = True
+            return False  # Última página (o vacía)
+        if stop_when_seen and all(pid in seen_ids for pid in page_ids):
+            print("⏹️ Página con solo propiedades ya vistas: no se sigue paginando")
+            return False
+        return True
+
+    first_info = {}
+    first_page = scrape_page(url, headless=headless, max_retries=max_retries, fetch_mode=fetch_mode,
+                             fingerprint_key=url if use_fingerprint else None, page_info=first_info)
+    if first_page is None:
+        # La huella solo se usa en búsquedas de una sola página: es un recorrido completo
+        crawl["complete"] = True
+        return None
+    next_page = 2
+    keep_going = add_page(first_page, first_info)
+
+    while keep_going and next_page <= max_pages:
+        batch = list(range(next_page, min(next_page + PAGE_FETCH_CONCURRENCY, max_pages + 1)))
+        next_page = batch[-1] + 1
+        print(f"📄 Obteniendo página(s) {batch[0]}-{batch[-1]} de hasta {max_pages}...")
+
+        # Las páginas del lote se piden a la vez; si una corta la paginación, las siguientes
+        # (que ya pueden estar en curso) ven el evento y no reintentan ni esperan el backoff
+        cancel = threading.Event()
+        infos = [{} for _ in batch]
+        with ThreadPoolExecutor(max_workers=len(batch), thread_name_prefix="page") as executor:
+            futures = [
+                executor.submit(scrape_page, build_page_url(url, page), headless, max_retries, fetch_mode,
+                                None, info, cancel)
+                for page, info in zip(batch, infos)
+            ]
+            # Procesar en orden de página; las páginas posteriores a un corte se descartan
+            for future, info in zip(futures, infos):
+                if not keep_going:
+                    future.cancel()
+                    continue
+                try:
+                    page_properties = future.result()
+                except Exception as e:
+                    # Un error en una página siguiente no invalida lo ya obtenido: se deja de paginar
+                    print(f"⚠ Error en una página siguiente ({classify_error(e)}): se deja de paginar")
+                    keep_going = False
+                else:
+                    keep_going = add_page(page_properties or [], info)
+                if not keep_going:
+                    cancel.set()
+
+    if len(found_ids) > len(first_page):
+        print(f"✓ Total con paginación: {len(properties)} propiedades")
+
+    return properties
+
+def scrape_page(url: str, headless: bool = True, max_retries: Optional[int] = None,
+                fetch_mode: Optional[str] = None,
+                fingerprint_key: Optional[str] = None,
+                page_info: Optional[Dict] = None,
+                cancel: Optional[threading.Event] = None) -> Optional[List[Dict]]:
+    """
+    Scrapea una sola página de resultados.
+
+    Con fetch_mode="http" descarga el HTML sin navegador y lee las propiedades del JSON
+    embebido; si la página no lo trae, usa Selenium como respaldo.
+
     Args:
         url: URL a scrapear
         headless: Si True, ejecuta el navegador sin interfaz gráfica
-        max_retries: Número máximo de reintentos en caso de error
+        max_retries: Número máximo de intentos (por defecto, RETRY_MAX_ATTEMPTS de config)
+        fetch_mode: "selenium" o "http" (por defecto, FETCH_MODE de config)
+        fingerprint_key: Si se indica, se compara la huella de la página con la guardada
+                         con esta clave antes de parsear
+        page_info: Si se indica, se completa con "has_next" (la página enlaza a una siguiente)
+        cancel: Evento que, al activarse, corta los reintentos (paginación ya terminada)
 
     Returns:
-        Lista de diccionarios con información de cada propiedad
+        Lista de diccionarios con información de cada propiedad,
+        o None si la huella no cambió (la página no se parsea)
     """
+    if cancel is not None and cancel.is_set():
+        return []
     print(f"🔍 Scrapeando: {url[:80]}...")
 
-    for attempt in range(max_retries):
-        driver = None
+    fetch_mode = (fetch_mode or FETCH_MODE).lower()
+    if fetch_mode == "http":
+        from http_fetch import fetch_listing_html, properties_from_listing_html
+
+        with metrics.timer("http_fetch"):
+            html = fetch_listing_html(url)
+        if html is not None:
+            if fingerprint_key and _is_unchanged(fingerprint_key, html, url):
+                return None
+            with metrics.timer("parse"):
+                properties = properties_from_listing_html(html)
+            if properties is not None:
+                if page_info is not None:
+                    page_info["has_next"] = has_next_page(html, url)
+                metrics.inc("items_valid", len(properties))
+                print(f"✓ Extraídas {len(properties)} propiedades válidas (HTTP, sin navegador)")
+                return properties
+        metrics.inc("http_fallbacks")
+        print("↩️ Usando Selenium como respaldo...")
+
+    return scrape_properties_selenium(url, headless=headless, max_retries=max_retries,
+                                      fingerprint_key=fingerprint_key, page_info=page_info, cancel=cancel)
+
+def _is_unchanged(fingerprint_key: str, html: str, url: str) -> bool:
+    """
+    Compara la huella del HTML con la del ciclo anterior (y avisa si no cambió).
+    Las búsquedas con más de una página no usan el atajo: la huella es solo de la primera.
+    """
+    if has_next_page(html, url):
+        return False
+    with metrics.timer("fingerprint"):
+        ids = fingerprints.page_ids(html)
+        fingerprint = fingerprints.compute_fingerprint(html, ids)
+    if fingerprints.is_unchanged(fingerprint_key, fingerprint, ids):
+        print("⏭️ Listado sin cambios desde el ciclo anterior (misma huella): se omite el parseo")
+        return True
+    return False
+
+def scrape_properties_selenium(url: str, headless: bool = True, max_retries: Optional[int] = None,
+                               fingerprint_key: Optional[str] = None,
+                               page_info: Optional[Dict] = None,
+                               cancel: Optional[threading.Event] = None) -> Optional[List[Dict]]:
+    """
+    Scrapea propiedades renderizando la página con Selenium.
+    Los navegadores se toman prestados del pool global, así que no se abre
+    un Chrome nuevo por filtro.
 
+    Args:
+        url: URL a scrapear
+        headless: Si True, ejecuta el navegador sin interfaz gráfica
+        max_retries: Número máximo de intentos (por defecto, RETRY_MAX_ATTEMPTS de config)
+        fingerprint_key: Clave de la huella a comparar antes de parsear (None = no comparar)
+        page_info: Si se indica, se completa con "has_next" (la página enlaza a una siguiente)
+        cancel: Evento que, al activarse, corta los reintentos (paginación ya terminada)
+
+    Returns:
+        Lista de diccionarios con información de cada propiedad,
+        o None si la huella no cambió
+
+    Raises:
+        La excepción del último intento si se agotan los reintentos, el error no se
+        reintenta (ver resilience.classify_error) o se activa `cancel`
+    """
+    pool = get_driver_pool()
+    policy = get_retry_policy(max_retries)
+    prefetched = _take_prefetched(url)
+
+    for attempt in range(policy.max_attempts):
         try:
-            # Usar Selenium para cargar contenido dinámico
-            print(f"🌐 Abriendo navegador (intento {attempt + 1}/{max_retries})...")
-            driver = get_driver(headless=headless)
-            driver.set_page_load_timeout(60)  # Timeout de 60 segundos
+            if attempt == 0 and prefetched is not None:
+                # La página ya se cargó en segundo plano: solo falta esperar que termine
+                wait_start = time.monotonic()
+                html = prefetched.result()
+                metrics.observe("prefetch_wait", time.monotonic() - wait_start)
+                metrics.inc("prefetch_hits")
+                print("⚡ Usando la página precargada")
+            else:
+                print(f"🌐 Obteniendo navegador del pool (intento {attempt + 1}/{policy.max_attempts})...")
+                html = load_page_html(pool, url, headless)
+
+            if fingerprint_key and _is_unchanged(fingerprint_key, html, url):
+                return None
+
+            properties = parse_properties_html(html, url)
+            if not properties and not is_no_results_page(html):
+                raise EmptyPageError("La página no trae resultados ni el aviso de búsqueda sin resultados")
+            print(f"✓ Extraídas {len(properties)} propiedades válidas")
+            if page_info is not None:
+                page_info["has_next"] = has_next_page(html, url)
+
+            return properties
+
+        except Exception as e:
+            kind = classify_error(e)
+            print(f"⚠ Error en intento {attempt + 1}/{policy.max_attempts} ({kind}): {e}")
+            metrics.inc("scrape_errors")
+            metrics.inc(f"scrape_errors_{kind}")
+
+            if not policy.should_retry(kind, attempt):
+                if kind in RETRYABLE_KINDS:
+                    print(f"❌ Máximo de reintentos alcanzado")
+                raise
+
+            if cancel is not None and cancel.is_set():
+                raise  # La paginación ya terminó: esta página no se usa
+
+            delay = policy.delay(attempt)
+            metrics.inc("retries")
+            print(f"   Reintentando en {delay:.1f} segundos...")
+            if cancel is not None:
+                if cancel.wait(delay):
+                    raise
+            else:
+                time.sleep(delay)
+
+    return []
 
+def load_page_html(pool: DriverPool, url: str, headless: bool = True) -> str:
+    """
+    Carga una URL en un navegador del pool, espera los resultados y retorna el HTML.
+    El navegador vuelve al pool apenas se obtiene el HTML (antes de parsear); si algo
+    falla, se descarta y la excepción se propaga.
+    """
+    driver = None
+    try:
+        # Usar Selenium para cargar contenido dinámico (driver reutilizado del pool)
+        driver = pool.acquire(headless=headless)
+        get_transferred_bytes(driver)  # Descartar eventos de la página anterior
+
+        load_start = time.monotonic()
+        with hard_timeout(driver, PAGE_LOAD_TIMEOUT + HARD_KILL_GRACE_SECONDS):
             driver.get(url)
+        load_seconds = time.monotonic() - load_start
+        metrics.observe("page_load", load_seconds)
+
+        # Esperar resultados y hacer scroll hasta que la lista deje de crecer
+        print("⏳ Esperando resultados...")
+        timings = wait_until_ready(
+            driver,
+            min_seconds=READY_MIN_SECONDS,
+            max_seconds=READY_MAX_SECONDS,
+            scroll_max_seconds=SCROLL_MAX_SECONDS,
+            settle_seconds=SCROLL_SETTLE_SECONDS
+        )
+        metrics.observe("initial_wait", timings['initial_wait'])
+        metrics.observe("scroll", timings['scroll'])
+        page_bytes = get_transferred_bytes(driver)
+        metrics.inc("bytes_transferred", page_bytes)
+        print(f"⏱️ Carga {load_seconds:.1f}s | espera {timings['initial_wait']:.1f}s | "
+              f"scroll {timings['scroll']:.1f}s ({timings['scrolls']} scrolls, {timings['items']} tarjetas)"
+              + (f" | {page_bytes / 1024:.0f} KB transferidos" if page_bytes else ""))
+
+        # Obtener el HTML completo y devolver el navegador al pool
+        html = driver.page_source
+        pool.release(driver)
+        return html
+    except BaseException:
+        # Un driver que falló no vuelve al pool: se descarta y se crea otro
+        pool.discard(driver)
+        raise
+
+# Páginas cargadas por adelantado (URL -> Future con el HTML), ver prefetch_page
+_prefetched: Dict[str, Future] = {}
+_prefetched_lock = threading.Lock()
+
+def prefetch_page(url: str, headless: bool = True, fetch_mode: Optional[str] = None,
+                  after: Optional[Future] = None) -> Optional[Future]:
+    """
+    Empieza a cargar una búsqueda en segundo plano (navegación + espera de resultados).
+    El próximo scrape_properties_selenium de esa URL usa el HTML cargado en vez de navegar,
+    así la carga se solapa con el parseo y la comparación de la búsqueda anterior.
+    Solo aplica al modo Selenium (en modo HTTP la descarga ya es barata).
+
+    Args:
+        url: URL de la búsqueda
+        headless: Modo del navegador
+        fetch_mode: "selenium" o "http" (por defecto, FETCH_MODE de config)
+        after: Precarga que debe terminar antes de empezar esta (para encadenar búsquedas
+               sin quitarle el navegador a la anterior)
+
+    Returns:
+        Future con el HTML, o None si no se precarga
+    """
+    if not url or (fetch_mode or FETCH_MODE).lower() != "selenium":
+        return None
+    with _prefetched_lock:
+        if url in _prefetched:
+            return None
+        future = Future()
+        _prefetched[url] = future
+
+    def load():
+        if after is not None:
+            wait([after])
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            print(f"⚡ Precargando: {url[:80]}...")
+            future.set_result(load_page_html(get_driver_pool(), url, headless))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=load, name="prefetch", daemon=True).start()
+    return future
 
-            # Esperar a que la página cargue
-            print("⏳ Esperando carga inicial...")
-            time.sleep(5)
+def prefetch_in_tabs(urls: List[str], headless: bool = True, max_tabs: Optional[int] = None,
+                     fetch_mode: Optional[str] = None) -> List[Future]:
+    """
+    Precarga varias búsquedas en pestañas de un solo navegador (ver tab_loader.py).
+    Cada URL queda como página precargada apenas su pestaña está lista, así
+    scrape_properties puede ir parseando las primeras mientras las demás siguen cargando.
+    Las URLs que no se alcanzan a cargar (por ejemplo, si el navegador se cae) fallan y
+    scrape_properties las vuelve a intentar por el camino normal.
 
-            # Hacer scroll simple
-            scroll_page_simple(driver, max_scrolls=5, scroll_pause_time=2.0)
+    Args:
+        urls: URLs de las búsquedas
+        headless: Modo del navegador
+        max_tabs: Máximo de pestañas abiertas a la vez (por defecto, MAX_TABS_PER_DRIVER)
+        fetch_mode: "selenium" o "http" (por defecto, FETCH_MODE de config)
 
-            # Esperar un poco más
-            time.sleep(2)
+    Returns:
+        Futures con el HTML de cada URL que se precarga
+    """
+    if (fetch_mode or FETCH_MODE).lower() != "selenium":
+        return []
+    futures: Dict[str, Future] = {}
+    with _prefetched_lock:
+        for url in urls:
+            if url and url not in _prefetched and url not in futures:
+                futures[url] = Future()
+                _prefetched[url] = futures[url]
+    if not futures:
+        return []
+
+    def on_loaded(url: str, html: Optional[str], error: Optional[Exception]):
+        future = futures[url]
+        if not future.done() and future.set_running_or_notify_cancel():
+            if error is None:
+                future.set_result(html)
+            else:
+                future.set_exception(error)
 
-            # Obtener el HTML completo
-            html = driver.page_source
-            soup = BeautifulSoup(html, 'lxml')
+    def load():
+        pool = get_driver_pool()
+        driver = None
+        try:
+            driver = pool.acquire(headless=headless)
+            get_transferred_bytes(driver)  # Descartar eventos de la página anterior
+            print(f"🗂️ Cargando {len(futures)} búsqueda(s) en pestañas "
+                  f"(hasta {max_tabs or MAX_TABS_PER_DRIVER} a la vez)...")
+            result = load_in_tabs(
+                driver, list(futures), on_loaded,
+                max_tabs=max_tabs or MAX_TABS_PER_DRIVER,
+                page_load_timeout=PAGE_LOAD_TIMEOUT,
+                min_seconds=READY_MIN_SECONDS,
+                max_seconds=READY_MAX_SECONDS,
+                scroll_max_seconds=SCROLL_MAX_SECONDS,
+                settle_seconds=SCROLL_SETTLE_SECONDS,
+                on_new_tab=apply_resource_blocking  # El bloqueo del driver no alcanza a las pestañas nuevas
+            )
+            metrics.observe("tabs_load", result['seconds'])
+            metrics.inc("bytes_transferred", get_transferred_bytes(driver))
+            print(f"🗂️ {result['pages']} página(s) en {result['tabs']} pestaña(s): {result['seconds']:.1f}s")
+            pool.release(driver, pages=result['pages'])
+            for url in futures:
+                on_loaded(url, None, RuntimeError("La pestaña terminó sin entregar la página"))
+        except BaseException as e:
+            print(f"⚠ Error en la carga por pestañas ({classify_error(e)}): {e}")
+            pool.discard(driver)
+            for url in futures:
+                on_loaded(url, None, e)
+
+    threading.Thread(target=load, name="tabs", daemon=True).start()
+    return list(futures.values())
+
+def _take_prefetched(url: str) -> Optional[Future]:
+    with _prefetched_lock:
+        return _prefetched.pop(url, None)
+
+def discard_prefetched():
+    """Olvida las páginas precargadas que nadie usó (las que están cargando terminan solas)."""
+    with _prefetched_lock:
+        pending = list(_prefetched.values())
+        _prefetched.clear()
+    for future in pending:
+        future.cancel()
+
+# Aviso del sitio cuando la búsqueda no tiene resultados (una página vacía sin este aviso es sospechosa)
+_NO_RESULTS_RE = re.compile(r'ui-search-rescue|No hay publicaciones que coincidan', re.IGNORECASE)
+
+def is_no_results_page(html: str) -> bool:
+    """True si la página trae el aviso explícito de búsqueda sin resultados."""
+    return bool(html and _NO_RESULTS_RE.search(html))
+
+# Enlaces de la paginación del sitio: el offset de cada página va en la URL (_Desde_N)
+_PAGE_OFFSET_RE = re.compile(r'_Desde_(\d+)')
+_PAGE_LINK_RE = re.compile(r'href="[^"]*?_Desde_(\d+)', re.IGNORECASE)
+
+def has_next_page(html: str, url: str) -> bool:
+    """True si la página enlaza a una página de resultados posterior a la de `url`."""
+    current = _PAGE_OFFSET_RE.search(urlparse(url).path)
+    current_offset = int(current.group(1)) if current else 1
+    return any(int(offset) > current_offset for offset in _PAGE_LINK_RE.findall(html or ""))
+
+# Marcadores del contenedor de resultados (para no parsear scripts, estilos, header y footer)
+_RESULTS_START_RE = re.compile(
+    r'<(?:section|div|ol)\b[^>]*\bclass="[^"]*\bui-search-(?:results|layout)\b', re.IGNORECASE
+)
+_RESULTS_END_RE = re.compile(
+    r'<(?:nav|div|ul)\b[^>]*\bclass="[^"]*\bui-search-pagination\b|</main>|<footer\b', re.IGNORECASE
+)
+
+def slice_results_region(html: str) -> Optional[str]:
+    """
+    Recorta del HTML solo la región de resultados, sin construir ningún árbol.
 
-            properties = []
+    Returns:
+        Fragmento desde la apertura del contenedor de resultados hasta la paginación
+        (o el fin de <main>/<footer>), o None si no se encuentran los marcadores
+    """
+    start = _RESULTS_START_RE.search(html)
+    if not start:
+        return None
+    end = _RESULTS_END_RE.search(html, start.end())
+    return html[start.start():end.start() if end else len(html)]
 
-            # Selector para items de propiedades
-            property_items = soup.select('li.ui-search-layout__item, article.ui-search-result, div.ui-search-result')
+def parse_properties_html(html: str, base_url: str, backend: Optional[str] = None,
+                          scope: Optional[str] = None) -> List[Dict]:
+    """
+    Parsea el HTML de un listado y retorna las propiedades únicas.
 
-            if not property_items:
-                property_items = soup.select('div[data-item-id], a[href*="portalinmobiliario.com"]')
+    Args:
+        html: HTML completo de la página
+        base_url: URL de la página (para resolver links relativos)
+        backend: "lxml" (un recorrido por tarjeta, más rápido) o "bs4" (BeautifulSoup).
+                 Por defecto, PARSER_BACKEND de config.
+        scope: "results" (solo el contenedor de resultados) o "full" (toda la página).
+               Por defecto, PARSE_SCOPE de config.
 
-            print(f"📦 Encontradas {len(property_items)} propiedades potenciales")
+    Returns:
+        Lista de propiedades sin duplicados
+    """
+    backend = (backend or PARSER_BACKEND).lower()
+    scope = (scope or PARSE_SCOPE).lower()
 
-            # Extraer propiedades únicas
-            seen_ids = set()
+    with metrics.timer("parse"):
+        properties = _parse_properties_html(html, base_url, backend, scope)
+    metrics.inc("items_valid", len(properties))
+    return properties
 
-            for item in property_items:
-                try:
-                    prop = extract_property_info(item, url)
-                    if prop and prop.get('id'):
-                        prop_id = prop['id']
-                        if prop_id not in seen_ids:
-                            seen_ids.add(prop_id)
-                            properties.append(prop)
-                except Exception:
-                    continue
+def _parse_properties_html(html: str, base_url: str, backend: str, scope: str) -> List[Dict]:
+    """Implementación de parse_properties_html (con backend y alcance ya resueltos)."""
+    if backend == "lxml":
+        from lxml_extractor import parse_properties
+        return parse_properties(html, base_url, scoped=(scope == "results"))
 
-            print(f"✓ Extraídas {len(properties)} propiedades válidas")
+    property_items = []
+    if scope == "results":
+        region = slice_results_region(html)
+        if region:
+            property_items = BeautifulSoup(region, 'lxml').select(
+                'li.ui-search-layout__item, article.ui-search-result, div.ui-search-result'
+            )
 
-            # Cerrar navegador
-            if driver:
-                driver.quit()
-                print("🔒 Navegador cerrado")
+    if not property_items:
+        soup = BeautifulSoup(html, 'lxml')
 
-            return properties
+        # Selector para items de propiedades
+        property_items = soup.select('li.ui-search-layout__item, article.ui-search-result, div.ui-search-result')
 
-        except WebDriverException as e:
-            print(f"⚠ Error en intento {attempt + 1}/{max_retries}: {e}")
-            if driver:
-                try:
-                    driver.quit()
-                except:
-                    pass
+        if not property_items:
+            property_items = soup.select('div[data-item-id], a[href*="portalinmobiliario.com"]')
 
-            if attempt < max_retries - 1:
-                print(f"   Reintentando en 5 segundos...")
-                time.sleep(5)
-            else:
-                print(f"❌ Máximo de reintentos alcanzado")
-                return []
+    properties = []
 
-        except Exception as e:
-            print(f"❌ Error inesperado: {e}")
-            if driver:
-                try:
-                    driver.quit()
-                except:
-                    pass
+    print(f"📦 Encontradas {len(property_items)} propiedades potenciales")
+    metrics.inc("items_found", len(property_items))
 
-            if attempt < max_retries - 1:
-                print(f"   Reintentando en 5 segundos...")
-                time.sleep(5)
-            else:
-                return []
+    # Extraer propiedades únicas
+    seen_ids = set()
 
-    return []
+    for item in property_items:
+        try:
+            prop = extract_property_info(item, base_url)
+            if prop and prop.get('id'):
+                prop_id = prop['id']
+                if prop_id not in seen_ids:
+                    seen_ids.add(prop_id)
+                    properties.append(prop)
+        except Exception:
+            continue
+
+    return properties
 
 def extract_property_info(item, base_url: str) -> Optional[Dict]:
     """Extrae información de una propiedad desde un elemento HTML."""
@@ -0,0 +1,131 @@
+"""
+Serialización del almacenamiento de propiedades vistas.
+
+Formatos (STORAGE_FORMAT):
+- "json": JSON compacto con la librería estándar (sin indentar: la mitad del tamaño).
+- "orjson" / "msgspec": el mismo JSON compacto, con un codificador en C mucho más rápido.
+- "msgpack": MessagePack binario (con msgpack o msgspec), más chico y rápido de leer.
+- "auto": el JSON más rápido que esté instalado (orjson, msgspec o la librería estándar).
+
+Al cargar, el formato se detecta por el primer byte (JSON empieza con "{" o "["), así que
+los archivos existentes siguen funcionando al cambiar STORAGE_FORMAT: el próximo guardado
+los reescribe en el formato nuevo.
+
+orjson, msgspec y msgpack son opcionales (ver requirements.txt).
+Benchmark: python -m benchmarks.bench_serializers
+"""
+import json
+from typing import Dict, List
+
+try:
+    import orjson
+except ImportError:  # Opcional
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # Opcional
+    msgspec = None
+
+try:
+    import msgpack
+except ImportError:  # Opcional
+    msgpack = None
+
+FORMATS = ("auto", "json", "orjson", "msgspec", "msgpack")
+
+
+class Serializer:
+    """Convierte datos de Python a bytes y viceversa en un formato dado."""
+
+    def __init__(self, name: str, kind: str, dumps, loads):
+        """
+        Args:
+            name: Nombre del formato (uno de FORMATS, salvo "auto")
+            kind: "json" o "msgpack" (lo que detect_format reconoce al cargar)
+            dumps: Función datos -> bytes
+            loads: Función bytes -> datos
+        """
+        self.name = name
+        self.kind = kind
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self) -> str:
+        return f"Serializer({self.name})"
+
+
+def _stdlib_dumps(data, indent: int = None) -> bytes:
+    return json.dumps(data, ensure_ascii=False, indent=indent,
+                      separators=None if indent else (',', ':')).encode('utf-8')
+
+
+def _serializers() -> Dict[str, Serializer]:
+    """Formatos disponibles con las librerías instaladas."""
+    available = {"json": Serializer("json", "json", _stdlib_dumps, json.loads)}
+    if msgspec is not None:
+        available["msgspec"] = Serializer("msgspec", "json", msgspec.json.encode, msgspec.json.decode)
+    if orjson is not None:
+        available["orjson"] = Serializer("orjson", "json", orjson.dumps, orjson.loads)
+    if msgpack is not None:
+        available["msgpack"] = Serializer(
+            "msgpack", "msgpack",
+            lambda data: msgpack.packb(data, use_bin_type=True),
+            lambda raw: msgpack.unpackb(raw, raw=False)
+        )
+    elif msgspec is not None:
+        available["msgpack"] = Serializer("msgpack", "msgpack", msgspec.msgpack.encode, msgspec.msgpack.decode)
+    return available
+
+
+_AVAILABLE = _serializers()
+
+
+def available_formats() -> List[str]:
+    return list(_AVAILABLE)
+
+
+def get_serializer(name: str = "auto") -> Serializer:
+    """
+    Retorna el serializador del formato pedido.
+
+    Raises:
+        ValueError si el formato no existe o su librería no está instalada
+    """
+    name = (name or "auto").lower()
+    if name == "auto":
+        for candidate in ("orjson", "msgspec", "json"):
+            if candidate in _AVAILABLE:
+                return _AVAILABLE[candidate]
+    if name not in _AVAILABLE:
+        if name in FORMATS:
+            raise ValueError(f"STORAGE_FORMAT={name} requiere instalar la librería (pip install {name})")
+        raise ValueError(f"Formato de almacenamiento desconocido: {name}")
+    return _AVAILABLE[name]
+
+
+def detect_format(raw: bytes) -> str:
+    """"json" si el contenido empieza (ignorando espacios) con "{" o "["; si no, "msgpack"."""
+    start = raw.lstrip()[:1]
+    return "json" if start in (b"{", b"[") or not start else "msgpack"
+
+
+def loads(raw: bytes):
+    """
+    Decodifica detectando el formato, con el decodificador más rápido instalado.
+
+    Raises:
+        ValueError si el contenido está corrupto o es MessagePack sin librería para leerlo
+    """
+    if detect_format(raw) == "json":
+        decoder = get_serializer("auto")
+    elif "msgpack" in _AVAILABLE:
+        decoder = _AVAILABLE["msgpack"]
+    else:
+        raise ValueError("El archivo parece MessagePack pero no está instalado msgpack ni msgspec")
+    try:
+        return decoder.loads(raw)
+    except ValueError:
+        raise
+    except Exception as e:  # msgpack lanza sus propias excepciones (ExtraData, FormatError, ...)
+        raise ValueError(f"{decoder.name}: {e}") from e
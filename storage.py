@@ -1,111 +1,153 @@
 """
 Utilidad para gestionar las propiedades ya vistas.
-Guarda los IDs de propiedades en un archivo JSON para evitar notificaciones duplicadas.
-También guarda la fecha de detección para saber cuándo se encontró cada propiedad.
+Guarda los IDs de propiedades para evitar notificaciones duplicadas, junto con la fecha de
+detección para saber cuándo se encontró cada propiedad.
+
+El almacenamiento real lo hace un backend (ver storage_backends.py), elegido con
+STORAGE_BACKEND: "json" (data/properties-seen.json, el formato original), "sqlite"
+(data/properties-seen.db, con búsquedas indexadas y upserts en lote) o "journal"
+(foto + diario de solo-agregar, compactado en segundo plano).
+
+Dentro de un ciclo, get_new_properties(..., defer=True) solo acumula en memoria las
+propiedades nuevas y las ya vistas de cada filtro; commit_pending las guarda todas juntas en
+una sola escritura atómica, y el ciclo lo llama recién cuando la notificación se envió. Si el
+email falla o el ciclo se corta, discard_pending las descarta y el próximo ciclo las vuelve
+a notificar (en vez de perderlas).
+
+Con RETENTION_DAYS, las propiedades sin ver hace tiempo se archivan en segundo plano y
+quedan como lápidas (ver retention.py); una propiedad archivada cuenta como ya vista.
+El last_seen de las ya vistas solo se guarda cuando avanza al menos LAST_SEEN_STEP.
 """
-import json
-import os
-from typing import Set, List, Dict
+import threading
+from typing import Set, List, Dict, Iterable, Optional
 from pathlib import Path
 from datetime import datetime
 
-STORAGE_FILE = Path("data/properties-seen.json")
+from config import (
+    RETENTION_ARCHIVE_FILE,
+    RETENTION_BATCH_SIZE,
+    RETENTION_CRAWL_FILE,
+    RETENTION_DAYS,
+    RETENTION_INTERVAL_MINUTES,
+    RETENTION_TOMBSTONE_FILE,
+    STORAGE_BACKEND,
+    STORAGE_BATCH_SIZE,
+    STORAGE_COMPACT_BYTES,
+    STORAGE_DB_FILE,
+    STORAGE_FORMAT,
+    STORAGE_JOURNAL_FILE,
+    STORAGE_SNAPSHOT_FILE,
+    STORAGE_FILE as STORAGE_FILE_NAME
+)
+from retention import LAST_SEEN_STEP, CrawlLog, RetentionWorker, TombstoneSet
+from serializers import get_serializer
+from storage_backends import JournalBackend, JsonBackend, SqliteBackend
+
+STORAGE_FILE = Path(STORAGE_FILE_NAME)
+STORAGE_DB = Path(STORAGE_DB_FILE)
+
+_backend = None
+_backend_lock = threading.Lock()
+_tombstones = None
+_crawl_log = None
+_retention_worker = None
+
+# Unidad de trabajo del ciclo: lo que get_new_properties(defer=True) todavía no guardó
+_pending_lock = threading.Lock()
+_pending_records: Dict[str, Dict] = {}  # ID -> datos de las propiedades nuevas
+_pending_seen: Dict[str, str] = {}  # ID ya visto -> hora en que se volvió a ver
+
+def get_backend():
+    """Retorna el backend configurado, creándolo la primera vez."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if STORAGE_BACKEND == "sqlite":
+                # La primera vez se importan las propiedades del JSON existente
+                _backend = SqliteBackend(STORAGE_DB, batch_size=STORAGE_BATCH_SIZE, migrate_from=STORAGE_FILE)
+            elif STORAGE_BACKEND == "journal":
+                _backend = JournalBackend(
+                    Path(STORAGE_SNAPSHOT_FILE), Path(STORAGE_JOURNAL_FILE),
+                    compact_bytes=STORAGE_COMPACT_BYTES, migrate_from=STORAGE_FILE,
+                    serializer=get_serializer(STORAGE_FORMAT)
+                )
+            else:
+                _backend = JsonBackend(STORAGE_FILE, serializer=get_serializer(STORAGE_FORMAT))
+        return _backend
+
+def get_tombstones() -> TombstoneSet:
+    """Retorna las lápidas de las propiedades archivadas por la retención."""
+    global _tombstones
+    with _backend_lock:
+        if _tombstones is None:
+            _tombstones = TombstoneSet(Path(RETENTION_TOMBSTONE_FILE))
+        return _tombstones
+
+def get_crawl_log() -> CrawlLog:
+    """Retorna el registro de recorridos completos de cada filtro (ver retention.py)."""
+    global _crawl_log
+    with _backend_lock:
+        if _crawl_log is None:
+            _crawl_log = CrawlLog(Path(RETENTION_CRAWL_FILE))
+        return _crawl_log
+
+def start_retention() -> bool:
+    """
+    Inicia el thread de fondo de la retención (si RETENTION_DAYS > 0).
+
+    Returns:
+        True si quedó corriendo
+    """
+    global _retention_worker
+    if _retention_worker is None:
+        _retention_worker = RetentionWorker(
+            get_backend(), get_tombstones(), Path(RETENTION_ARCHIVE_FILE), RETENTION_DAYS,
+            batch_size=RETENTION_BATCH_SIZE, interval_minutes=RETENTION_INTERVAL_MINUTES,
+            crawl_log=get_crawl_log()
+        )
+    return _retention_worker.start()
 
 def ensure_data_directory():
     """Asegura que el directorio data existe."""
     STORAGE_FILE.parent.mkdir(parents=True, exist_ok=True)
 
 def load_seen_properties() -> Set[str]:
-    """Carga los IDs de propiedades ya vistas desde el archivo JSON."""
-    ensure_data_directory()
-    
-    if not STORAGE_FILE.exists():
-        return set()
-    
-    try:
-        with open(STORAGE_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            # Compatibilidad: puede ser una lista simple o un dict con más info
-            if isinstance(data, list):
-                return set(data)
-            elif isinstance(data, dict):
-                return set(data.get("property_ids", []))
-            return set()
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"Advertencia: No se pudo cargar el archivo de propiedades vistas: {e}")
-        return set()
+    """Carga los IDs de propiedades ya vistas."""
+    return get_backend().ids()
+
+def load_seen_index() -> Set[str]:
+    """
+    Carga los IDs vistos, incluidos los archivados, para consultas de pertenencia durante
+    el ciclo (`pid in seen_ids`).
+    """
+    return get_backend().ids() | get_tombstones().ids()
 
 def load_properties_data() -> Dict[str, Dict]:
     """Carga datos completos de propiedades (ID, fecha de detección, etc.)"""
-    ensure_data_directory()
-    
-    if not STORAGE_FILE.exists():
-        return {}
-    
-    try:
-        with open(STORAGE_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            # Formato nuevo: dict con información detallada
-            if isinstance(data, dict) and "properties" in data:
-                return data.get("properties", {})
-            # Formato antiguo: solo lista de IDs
-            elif isinstance(data, list):
-                return {pid: {"first_seen": None} for pid in data}
-            elif isinstance(data, dict) and "property_ids" in data:
-                return {pid: {"first_seen": None} for pid in data.get("property_ids", [])}
-            return {}
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"Advertencia: No se pudo cargar el archivo de propiedades vistas: {e}")
-        return {}
+    return get_backend().load_all()
 
 def save_seen_properties(property_ids: Set[str]):
-    """Guarda los IDs de propiedades vistas en el archivo JSON (formato antiguo para compatibilidad)."""
-    ensure_data_directory()
-    
-    try:
-        data = {
-            "property_ids": list(property_ids),
-            "count": len(property_ids)
-        }
-        with open(STORAGE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-    except IOError as e:
-        print(f"Error: No se pudo guardar el archivo de propiedades vistas: {e}")
+    """Guarda los IDs de propiedades vistas (en JSON, con el formato antiguo para compatibilidad)."""
+    get_backend().replace_ids(property_ids)
 
 def save_properties_data(properties_data: Dict[str, Dict]):
     """Guarda datos completos de propiedades (con fechas)."""
-    ensure_data_directory()
-    
-    try:
-        data = {
-            "properties": properties_data,
-            "property_ids": list(properties_data.keys()),  # Para compatibilidad
-            "count": len(properties_data),
-            "last_updated": datetime.now().isoformat()
-        }
-        with open(STORAGE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-    except IOError as e:
-        print(f"Error: No se pudo guardar el archivo de propiedades vistas: {e}")
+    get_backend().replace_all(properties_data)
 
 def add_seen_property(property_id: str):
     """Agrega un ID de propiedad a la lista de vistas."""
-    seen = load_seen_properties()
-    seen.add(property_id)
-    save_seen_properties(seen)
+    get_backend().add_ids([property_id])
 
 def add_seen_properties(property_ids: List[str]):
     """Agrega múltiples IDs de propiedades a la lista de vistas."""
-    seen = load_seen_properties()
-    seen.update(property_ids)
-    save_seen_properties(seen)
+    get_backend().add_ids(property_ids)
 
 def is_property_seen(property_id: str) -> bool:
     """Verifica si una propiedad ya fue vista."""
-    seen = load_seen_properties()
-    return property_id in seen
+    return get_backend().contains(property_id)
 
-def get_new_properties(all_properties: List[Dict], property_id_key: str = "id") -> List[Dict]:
+def get_new_properties(all_properties: List[Dict], property_id_key: str = "id",
+                       defer: bool = False) -> List[Dict]:
     """
     Filtra las propiedades que no han sido vistas antes.
     Agrega información de cuándo se encontraron (fecha de detección).
@@ -113,16 +155,33 @@ def get_new_properties(all_properties: List[Dict], property_id_key: str = "id")
     Args:
         all_properties: Lista de diccionarios con información de propiedades
         property_id_key: Clave del diccionario que contiene el ID único
+        defer: Acumular los cambios en memoria hasta commit_pending en vez de guardarlos ya
     
     Returns:
         Lista de propiedades nuevas (no vistas antes) con fecha de detección
     """
-    properties_data = load_properties_data()
+    backend = get_backend()
+    candidate_ids = [str(prop.get(property_id_key, "")) for prop in all_properties]
+    # Solo se consultan las propiedades del listado (en SQLite, por clave primaria)
+    properties_data, total_seen = backend.lookup(pid for pid in candidate_ids if pid)
+    stored = dict(properties_data)
+    with _pending_lock:
+        # Las nuevas de filtros anteriores del mismo ciclo cuentan como vistas (sin repetir en el email)
+        properties_data.update(
+            (pid, _pending_records[pid]) for pid in candidate_ids if pid in _pending_records
+        )
+    # Las archivadas por la retención también cuentan como vistas
+    tombstones = get_tombstones()
+    properties_data.update(
+        (pid, {"first_seen": None, "title": "(archivada)"})
+        for pid in candidate_ids if pid and pid not in properties_data and pid in tombstones
+    )
+    new_records = {}
     new_properties = []
     already_seen = []
     now = datetime.now().isoformat()
     
-    print(f"   Comparando {len(all_properties)} propiedades con {len(properties_data)} ya vistas...")
+    print(f"   Comparando {len(all_properties)} propiedades con {total_seen} ya vistas...")
     
     for prop in all_properties:
         prop_id = str(prop.get(property_id_key, ""))
@@ -135,7 +194,7 @@ def get_new_properties(all_properties: List[Dict], property_id_key: str = "id")
             prop['is_new'] = True
             new_properties.append(prop)
             # Guardar en el almacenamiento con fecha e información del filtro
-            properties_data[prop_id] = {
+            properties_data[prop_id] = new_records[prop_id] = {
                 "first_seen": now,
                 "last_seen": now,
                 "title": prop.get('title', ''),
@@ -145,38 +204,99 @@ def get_new_properties(all_properties: List[Dict], property_id_key: str = "id")
             }
         else:
             already_seen.append(prop_id)
+    # last_seen solo se guarda si avanza al menos LAST_SEEN_STEP
+    to_touch = _needs_touch(stored, already_seen, now)
     
     # Mostrar cuáles ya fueron vistas
     if already_seen:
         print(f"   ✅ {len(already_seen)} propiedad(es) ya vista(s) (no se enviarán):")
         for prop_id in already_seen[:5]:  # Mostrar solo las primeras 5
             prop_info = properties_data.get(prop_id, {})
-            title = prop_info.get('title', 'Sin título')[:40]
-            first_seen = prop_info.get('first_seen', 'Desconocida')
+            title = (prop_info.get('title') or 'Sin título')[:40]
+            first_seen = prop_info.get('first_seen') or 'Desconocida'
             print(f"      - {prop_id}: {title} (vista desde {first_seen[:10]})")
         if len(already_seen) > 5:
             print(f"      ... y {len(already_seen) - 5} más")
     
-    # Guardar las nuevas propiedades vistas (con fechas)
-    if new_properties:
-        # Actualizar también las propiedades ya vistas con last_seen
-        for prop in all_properties:
-            prop_id = str(prop.get(property_id_key, ""))
-            if prop_id in properties_data:
-                properties_data[prop_id]["last_seen"] = now
-        
-        save_properties_data(properties_data)
+    if defer:
+        with _pending_lock:
+            _pending_records.update(new_records)
+            _pending_seen.update((pid, now) for pid in to_touch if pid not in _pending_records)
+        if new_properties:
+            print(f"   📝 {len(new_properties)} propiedad(es) nueva(s) pendiente(s) de guardar al final del ciclo")
+    elif new_properties:
+        # Guardar las nuevas propiedades vistas (con fechas) y actualizar last_seen de las ya vistas
+        backend.upsert(new_records, to_touch, now)
         print(f"   💾 Guardadas {len(new_properties)} propiedades nuevas en almacenamiento")
     
     return new_properties
 
+def _needs_touch(properties_data: Dict[str, Dict], property_ids: Iterable[str], now: str) -> List[str]:
+    """IDs guardados cuyo last_seen quedaría al menos LAST_SEEN_STEP más adelante con `now`."""
+    threshold = (datetime.fromisoformat(now) - LAST_SEEN_STEP).isoformat()
+    touched = []
+    for pid in property_ids:
+        info = properties_data.get(pid)
+        if info is None:
+            continue
+        last_seen = info.get("last_seen") or info.get("first_seen")
+        if not last_seen or last_seen <= threshold:
+            touched.append(pid)
+    return touched
+
+def touch_properties(property_ids: Iterable[str]):
+    """
+    Registra que propiedades ya vistas siguen publicadas (su last_seen), sin compararlas.
+    Para búsquedas que no se procesan porque su huella no cambió (ver fingerprints.py);
+    queda pendiente hasta commit_pending, como el resto del ciclo.
+    """
+    now = datetime.now().isoformat()
+    property_ids = [str(pid) for pid in property_ids if pid]
+    properties_data, _ = get_backend().lookup(property_ids)
+    to_touch = _needs_touch(properties_data, property_ids, now)
+    with _pending_lock:
+        _pending_seen.update((pid, now) for pid in to_touch if pid not in _pending_records)
+
+def commit_pending() -> Optional[int]:
+    """
+    Guarda en una sola escritura atómica las propiedades nuevas acumuladas en el ciclo
+    y el last_seen de las ya vistas. Se llama en todos los ciclos, también en los que no
+    hay propiedades nuevas: si no, las que siguen publicadas envejecerían hasta que la
+    retención las archive. Como last_seen solo se acumula cuando avanza LAST_SEEN_STEP,
+    un ciclo sin novedades normalmente no escribe nada.
+
+    Returns:
+        Cantidad de propiedades nuevas guardadas, o None si la escritura falló
+        (en ese caso lo pendiente se descarta y el próximo ciclo las vuelve a detectar)
+    """
+    with _pending_lock:
+        records, seen = dict(_pending_records), dict(_pending_seen)
+        _pending_records.clear()
+        _pending_seen.clear()
+    if not records and not seen:
+        return 0
+    # last_seen de todas las ya vistas queda con la hora de la última comparación del ciclo
+    now = max(seen.values(), default=datetime.now().isoformat())
+    if not get_backend().upsert(records, list(seen), now):
+        return None
+    return len(records)
+
+def discard_pending():
+    """Descarta lo acumulado en el ciclo sin guardarlo (por ejemplo, si el email falló)."""
+    with _pending_lock:
+        _pending_records.clear()
+        _pending_seen.clear()
+
 def get_storage_stats() -> Dict:
     """Obtiene estadísticas del almacenamiento."""
-    seen = load_seen_properties()
+    backend = get_backend()
     return {
-        "total_seen": len(seen),
-        "storage_file": str(STORAGE_FILE),
-        "file_exists": STORAGE_FILE.exists()
+        "total_seen": backend.count(),
+        "storage_file": backend.location(),
+        "file_exists": backend.exists(),
+        "backend": backend.name,
+        "format": STORAGE_FORMAT,
+        "archived": len(get_tombstones())
     }
 
 if __name__ == "__main__":
@@ -184,5 +304,5 @@ if __name__ == "__main__":
     print("Probando sistema de almacenamiento...")
     stats = get_storage_stats()
     print(f"  Propiedades vistas: {stats['total_seen']}")
-    print(f"  Archivo: {stats['storage_file']}")
+    print(f"  Archivo: {stats['storage_file']} ({stats['backend']})")
 
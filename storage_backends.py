@@ -0,0 +1,785 @@
+"""
+Backends de almacenamiento de las propiedades ya vistas.
+storage.py expone las funciones públicas de siempre y delega en uno de estos backends:
+
+- "json": el archivo data/properties-seen.json de siempre (se lee y reescribe completo).
+- "sqlite": una base SQLite en modo WAL, con el ID de la propiedad como clave primaria,
+  un índice en last_seen (para la retención) y upserts en lote. Cada consulta toca solo
+  las filas necesarias, así que el costo no crece con la historia.
+- "journal": índice en memoria reconstruido desde una foto más un diario de solo-agregar;
+  cada ciclo agrega solo lo que cambió y la foto se reescribe al compactar.
+
+La primera vez que se usa SQLite o el diario se importan los datos del JSON (cualquiera de
+sus formatos: lista de IDs, {"property_ids": [...]} o {"properties": {...}}); el JSON
+no se modifica.
+
+El archivo del backend "json" y la foto del diario se guardan con el serializador elegido
+(STORAGE_FORMAT, ver serializers.py) y al cargarlos se detecta su formato.
+
+Un archivo que existe pero no se puede leer (JSON truncado o corrupto) nunca se trata como
+vacío: eso volvería a notificar todas las propiedades vistas. Se lanza StorageCorruptError
+y el ciclo falla sin notificar hasta que el archivo se repare o se borre a mano.
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import metrics
+import serializers
+from serializers import Serializer, get_serializer
+
+# Columnas propias de la tabla; el resto de las claves de cada propiedad va en 'extra' (JSON)
+_COLUMNS = ("first_seen", "last_seen", "title", "link", "filter_name", "filter_url")
+
+
+class StorageCorruptError(Exception):
+    """El archivo de propiedades vistas existe pero no se puede leer (no se debe tratar como vacío)."""
+
+
+def _load_storage_file(path: Path, description: str):
+    """
+    Lee un archivo del almacenamiento (JSON o MessagePack, se detecta); si está corrupto o
+    no se puede leer, lanza StorageCorruptError.
+    """
+    try:
+        return serializers.loads(path.read_bytes())
+    except (ValueError, IOError) as e:
+        print(f"Error: No se pudo cargar {description} ({path}): {e}")
+        raise StorageCorruptError(
+            f"{path} no se puede leer ({e}); repáralo o bórralo para empezar de cero"
+        ) from e
+
+
+def _last_activity(info: Dict) -> Optional[str]:
+    """Última vez que se vio la propiedad (last_seen, o first_seen si no hay), o None si no tiene fechas."""
+    return info.get("last_seen") or info.get("first_seen")
+
+
+def _oldest(properties_data: Dict[str, Dict], before: str, limit: int,
+            evictable: Optional[Callable[[Dict], bool]] = None) -> Dict[str, Dict]:
+    """
+    Hasta `limit` propiedades vistas por última vez antes de `before`, las más antiguas
+    primero (solo las que acepta `evictable`, si se indica).
+    """
+    stale = sorted(
+        (activity, pid) for pid, info in properties_data.items()
+        if (activity := _last_activity(info)) and activity < before
+        and (evictable is None or evictable(info))
+    )[:limit]
+    return {pid: dict(properties_data[pid]) for _, pid in stale}
+
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def parse_json_storage(data) -> Dict[str, Dict]:
+    """Convierte cualquiera de los formatos del JSON de propiedades vistas a ID -> datos."""
+    # Formato nuevo: dict con información detallada
+    if isinstance(data, dict) and "properties" in data:
+        return data.get("properties", {})
+    # Formato antiguo: solo lista de IDs
+    elif isinstance(data, list):
+        return {pid: {"first_seen": None} for pid in data}
+    elif isinstance(data, dict) and "property_ids" in data:
+        return {pid: {"first_seen": None} for pid in data.get("property_ids", [])}
+    return {}
+
+
+class JsonBackend:
+    """
+    Archivo único (el formato original, en JSON o MessagePack según el serializador), con un
+    índice en memoria.
+
+    El archivo se lee una sola vez y el índice vive todo el proceso: las consultas se
+    responden desde memoria y cada escritura actualiza el índice sin releer. Solo si el
+    archivo cambia desde afuera (otro mtime o tamaño) se vuelve a leer.
+    """
+
+    name = "json"
+
+    def __init__(self, path: Path, serializer: Serializer = None):
+        """
+        Args:
+            path: Archivo de propiedades vistas
+            serializer: Formato de escritura (por defecto, el JSON compacto más rápido instalado)
+        """
+        self.path = path
+        self.serializer = serializer or get_serializer("auto")
+        self._lock = threading.RLock()
+        self._data: Optional[Dict[str, Dict]] = None
+        self._stamp: Optional[Tuple[int, int]] = None  # (mtime_ns, tamaño) del archivo indexado
+
+    def location(self) -> str:
+        return str(self.path)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.path.exists():
+            return None
+        with metrics.timer("storage_load"):
+            return _load_storage_file(self.path, "el archivo de propiedades vistas")
+
+    def _index(self) -> Dict[str, Dict]:
+        """Índice ID -> datos (se llama con _lock tomado); se relee solo si el archivo cambió."""
+        stamp = self._file_stamp()
+        if self._data is not None and stamp == self._stamp:
+            return self._data
+        if self._data is not None:
+            print("🔄 El archivo de propiedades vistas cambió desde afuera: recargando")
+            metrics.inc("storage_reloads")
+        self._data = parse_json_storage(self._read())
+        self._stamp = stamp
+        return self._data
+
+    def _write(self, data: Dict, index: Dict[str, Dict]) -> bool:
+        """
+        Escribe el archivo de forma atómica y deja `index` como índice en memoria
+        (se llama con _lock tomado). Si falla, el archivo anterior queda intacto.
+        """
+        try:
+            with metrics.timer("storage_save"):
+                written = write_atomic(self.path, self.serializer.dumps(data))
+            metrics.inc("storage_bytes_written", written)
+        except (IOError, OSError) as e:
+            print(f"Error: No se pudo guardar el archivo de propiedades vistas: {e}")
+            return False
+        self._data = index
+        self._stamp = self._file_stamp()
+        return True
+
+    def ids(self) -> Set[str]:
+        with self._lock:
+            return set(self._index())
+
+    def load_all(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {pid: dict(info) for pid, info in self._index().items()}
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._index())
+
+    def contains(self, property_id: str) -> bool:
+        with self._lock:
+            return property_id in self._index()
+
+    def lookup(self, property_ids: Iterable[str]) -> Tuple[Dict[str, Dict], int]:
+        """Datos de las propiedades indicadas que ya están guardadas, y el total guardado."""
+        with self._lock:
+            properties_data = self._index()
+            found = {pid: dict(properties_data[pid]) for pid in property_ids if pid in properties_data}
+            return found, len(properties_data)
+
+    def replace_ids(self, property_ids: Set[str]):
+        """Guarda solo los IDs (formato antiguo, para compatibilidad)."""
+        with self._lock:
+            self._write(
+                {"property_ids": list(property_ids), "count": len(property_ids)},
+                {pid: {"first_seen": None} for pid in property_ids}
+            )
+
+    def replace_all(self, properties_data: Dict[str, Dict]):
+        with self._lock:
+            self._write_index({pid: dict(info) for pid, info in properties_data.items()})
+
+    def _write_index(self, index: Dict[str, Dict]) -> bool:
+        """Guarda el índice completo en el formato nuevo (se llama con _lock tomado)."""
+        return self._write({
+            "properties": index,
+            "count": len(index),
+            "last_updated": datetime.now().isoformat()
+        }, index)
+
+    def add_ids(self, property_ids: Iterable[str]):
+        with self._lock:
+            seen = set(self._index())
+            seen.update(property_ids)
+            self.replace_ids(seen)
+
+    def stale(self, before: str, limit: int,
+              evictable: Optional[Callable[[Dict], bool]] = None) -> Dict[str, Dict]:
+        """
+        Hasta `limit` propiedades sin ver desde antes de `before` (ISO), las más antiguas
+        primero; con `evictable`, solo las que acepta.
+        """
+        with self._lock:
+            return _oldest(self._index(), before, limit, evictable)
+
+    def remove(self, property_ids: Iterable[str]) -> bool:
+        """Borra propiedades (reescribe el archivo completo). Retorna True si se guardó."""
+        with self._lock:
+            removed = set(property_ids)
+            return self._write_index({
+                pid: dict(info) for pid, info in self._index().items() if pid not in removed
+            })
+
+    def upsert(self, new_records: Dict[str, Dict], touched_ids: Iterable[str], now: str) -> bool:
+        """
+        Agrega propiedades nuevas y actualiza last_seen de las ya vistas, en una sola
+        escritura atómica.
+
+        Returns:
+            True si se guardó
+        """
+        with self._lock:
+            properties_data = {pid: dict(info) for pid, info in self._index().items()}
+            properties_data.update(new_records)
+            for pid in touched_ids:
+                if pid in properties_data:
+                    properties_data[pid]["last_seen"] = now
+            return self._write_index(properties_data)
+
+
+class SqliteBackend:
+    """Base SQLite (WAL) con una fila por propiedad."""
+
+    name = "sqlite"
+
+    def __init__(self, path: Path, batch_size: int = 500, migrate_from: Path = None):
+        """
+        Args:
+            path: Archivo de la base de datos
+            batch_size: Filas por sentencia en consultas y upserts en lote
+            migrate_from: JSON de propiedades vistas a importar la primera vez (opcional)
+        """
+        self.path = path
+        # SQLite acepta hasta 999 parámetros por sentencia en versiones antiguas
+        self.batch_size = max(1, min(batch_size, 900))
+        self._lock = threading.Lock()
+        self._count: Optional[int] = None  # Total guardado; se recalcula después de cada escritura
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        if migrate_from is not None:
+            self.migrate_json(migrate_from)
+
+    def _create_schema(self):
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS properties (
+                    id TEXT PRIMARY KEY,
+                    first_seen TEXT,
+                    last_seen TEXT,
+                    title TEXT,
+                    link TEXT,
+                    filter_name TEXT,
+                    filter_url TEXT,
+                    extra TEXT
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_properties_last_seen ON properties(last_seen);
+                DROP INDEX IF EXISTS idx_properties_first_seen;
+                DROP INDEX IF EXISTS idx_properties_filter_name;
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """)
+            # last_seen nunca queda vacío si hay first_seen (así la retención usa solo su índice);
+            # las bases creadas antes se completan una vez
+            if not self._conn.execute("SELECT 1 FROM meta WHERE key = 'last_seen_backfilled'").fetchone():
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.execute(
+                    "UPDATE properties SET last_seen = first_seen WHERE last_seen IS NULL AND first_seen IS NOT NULL"
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('last_seen_backfilled', ?)", (datetime.now().isoformat(),)
+                )
+                self._conn.execute("COMMIT")
+
+    def location(self) -> str:
+        return str(self.path)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    @staticmethod
+    def _row(property_id: str, info: Dict) -> tuple:
+        extra = {k: v for k, v in info.items() if k not in _COLUMNS}
+        # Sin last_seen, la propiedad se vio por última vez al detectarla
+        info = dict(info, last_seen=_last_activity(info))
+        return (property_id, *(info.get(column) for column in _COLUMNS),
+                json.dumps(extra, ensure_ascii=False) if extra else None)
+
+    @staticmethod
+    def _info(row) -> Dict:
+        # Las columnas vacías se omiten (como las claves ausentes en el JSON), salvo first_seen
+        info = {
+            column: value for column, value in zip(_COLUMNS, row[1:1 + len(_COLUMNS)])
+            if value is not None or column == "first_seen"
+        }
+        if row[-1]:
+            info.update(json.loads(row[-1]))
+        return info
+
+    @contextmanager
+    def _transaction(self):
+        """Transacción de escritura con _lock tomado (se revierte completa si algo falla)."""
+        with self._lock, metrics.timer("storage_save"):
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._count = None
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _write_rows(self, conn, rows: List[tuple]):
+        """Upsert de filas en lotes (dentro de una transacción)."""
+        placeholders = ", ".join("?" * (len(_COLUMNS) + 2))
+        updates = ", ".join(f"{column} = excluded.{column}" for column in _COLUMNS + ("extra",))
+        for batch in _chunks(rows, self.batch_size):
+            conn.executemany(
+                f"INSERT INTO properties VALUES ({placeholders}) ON CONFLICT(id) DO UPDATE SET {updates}",
+                batch
+            )
+
+    def ids(self) -> Set[str]:
+        with self._lock, metrics.timer("storage_load"):
+            return {row[0] for row in self._conn.execute("SELECT id FROM properties")}
+
+    def load_all(self) -> Dict[str, Dict]:
+        with self._lock, metrics.timer("storage_load"):
+            return {row[0]: self._info(row) for row in self._conn.execute("SELECT * FROM properties")}
+
+    def _total(self) -> int:
+        """Total guardado, contado una vez por escritura (se llama con _lock tomado)."""
+        if self._count is None:
+            self._count = self._conn.execute("SELECT COUNT(*) FROM properties").fetchone()[0]
+        return self._count
+
+    def count(self) -> int:
+        with self._lock:
+            return self._total()
+
+    def contains(self, property_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM properties WHERE id = ?", (property_id,)
+            ).fetchone() is not None
+
+    def lookup(self, property_ids: Iterable[str]) -> Tuple[Dict[str, Dict], int]:
+        """
+        Datos de las propiedades indicadas que ya están guardadas (búsqueda por clave
+        primaria), y el total guardado (sin volver a contarlo si no hubo escrituras).
+        """
+        property_ids = list(dict.fromkeys(property_ids))
+        found = {}
+        with self._lock, metrics.timer("storage_load"):
+            for batch in _chunks(property_ids, self.batch_size):
+                query = f"SELECT * FROM properties WHERE id IN ({', '.join('?' * len(batch))})"
+                for row in self._conn.execute(query, batch):
+                    found[row[0]] = self._info(row)
+            total = self._total()
+        return found, total
+
+    def replace_ids(self, property_ids: Set[str]):
+        """Deja guardados exactamente estos IDs (conserva los datos de los que ya existían)."""
+        existing = self.load_all()
+        self.replace_all({pid: existing.get(pid, {"first_seen": None}) for pid in property_ids})
+
+    def replace_all(self, properties_data: Dict[str, Dict]):
+        rows = [self._row(pid, info) for pid, info in properties_data.items()]
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM properties")
+            self._write_rows(conn, rows)
+
+    def add_ids(self, property_ids: Iterable[str]):
+        with self._transaction() as conn:
+            for batch in _chunks(list(property_ids), self.batch_size):
+                conn.executemany("INSERT OR IGNORE INTO properties (id) VALUES (?)", [(pid,) for pid in batch])
+
+    def upsert(self, new_records: Dict[str, Dict], touched_ids: Iterable[str], now: str) -> bool:
+        """
+        Agrega propiedades nuevas y actualiza last_seen de las ya vistas, en una transacción.
+
+        Returns:
+            True si se guardó (si la transacción falla se revierte completa)
+        """
+        rows = [self._row(pid, info) for pid, info in new_records.items()]
+        try:
+            with self._transaction() as conn:
+                self._write_rows(conn, rows)
+                for batch in _chunks(list(touched_ids), self.batch_size):
+                    conn.execute(
+                        f"UPDATE properties SET last_seen = ? WHERE id IN ({', '.join('?' * len(batch))})",
+                        [now, *batch]
+                    )
+        except sqlite3.Error as e:
+            print(f"Error: No se pudo guardar en la base de propiedades vistas: {e}")
+            return False
+        return True
+
+    def stale(self, before: str, limit: int,
+              evictable: Optional[Callable[[Dict], bool]] = None) -> Dict[str, Dict]:
+        """
+        Hasta `limit` propiedades sin ver desde antes de `before` (ISO), las más antiguas
+        primero; con `evictable`, solo las que acepta. Recorre solo el índice de last_seen
+        (las filas sin fechas tienen NULL y no se archivan).
+        """
+        with self._lock, metrics.timer("storage_load"):
+            if evictable is None:
+                rows = self._conn.execute(
+                    "SELECT * FROM properties WHERE last_seen < ? ORDER BY last_seen LIMIT ?",
+                    (before, limit)
+                ).fetchall()
+                return {row[0]: self._info(row) for row in rows}
+            # El filtro se aplica en Python: se sigue leyendo el índice hasta juntar `limit`
+            stale = {}
+            cursor = self._conn.execute(
+                "SELECT * FROM properties WHERE last_seen < ? ORDER BY last_seen", (before,)
+            )
+            for row in cursor:
+                info = self._info(row)
+                if evictable(info):
+                    stale[row[0]] = info
+                    if len(stale) >= limit:
+                        break
+            cursor.close()
+            return stale
+
+    def remove(self, property_ids: Iterable[str]) -> bool:
+        """Borra propiedades en una transacción. Retorna True si se guardó."""
+        try:
+            with self._transaction() as conn:
+                for batch in _chunks(list(property_ids), self.batch_size):
+                    conn.execute(f"DELETE FROM properties WHERE id IN ({', '.join('?' * len(batch))})", batch)
+        except sqlite3.Error as e:
+            print(f"Error: No se pudo borrar de la base de propiedades vistas: {e}")
+            return False
+        return True
+
+    def migrate_json(self, json_path: Path) -> int:
+        """
+        Importa el JSON de propiedades vistas, una sola vez (queda registrado en la tabla meta).
+
+        Returns:
+            Cantidad de propiedades importadas
+        """
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from'").fetchone():
+                return 0
+        if not json_path.exists():
+            return 0
+        # Si el JSON está corrupto se lanza StorageCorruptError: migrar "nada" dejaría la base vacía
+        properties_data = parse_json_storage(_load_storage_file(json_path, "el JSON a migrar"))
+
+        with self._transaction() as conn:
+            self._write_rows(conn, [self._row(pid, info) for pid, info in properties_data.items()])
+            conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('migrated_from', ?)",
+                (f"{json_path} {datetime.now().isoformat()}",)
+            )
+        print(f"📦 Migradas {len(properties_data)} propiedades de {json_path} a {self.path}")
+        return len(properties_data)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def write_atomic(path: Path, payload: bytes) -> int:
+    """
+    Escribe un archivo de forma atómica: archivo temporal, fsync y rename sobre el destino.
+    Un corte a mitad de la escritura deja el archivo anterior intacto.
+
+    Returns:
+        Bytes escritos
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        # No dejar un temporal a medio escribir
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+    return len(payload)
+
+
+def write_json_atomic(path: Path, data, indent: int = None) -> int:
+    """Escribe un JSON de forma atómica (ver write_atomic): indentado si se pide `indent`, si no compacto."""
+    if indent:
+        payload = json.dumps(data, ensure_ascii=False, indent=indent).encode('utf-8')
+    else:
+        payload = get_serializer("auto").dumps(data)
+    return write_atomic(path, payload)
+
+
+_JOURNAL_OPS = ("add", "seen", "upsert", "remove")
+
+
+def _check_journal_record(record) -> None:
+    """
+    Valida un registro del diario completo, antes de aplicarlo.
+
+    Raises:
+        ValueError: Si al registro le falta algo o tiene un tipo inesperado
+    """
+    if not isinstance(record, dict) or record.get("op") not in _JOURNAL_OPS:
+        raise ValueError("operación desconocida")
+    op = record["op"]
+    if op in ("add", "upsert"):
+        items = record.get("items")
+        if not isinstance(items, dict) or not all(isinstance(info, dict) for info in items.values()):
+            raise ValueError("'items' debe ser un dict de propiedades")
+    if op in ("seen", "upsert", "remove"):
+        ids = record.get("ids")
+        if not isinstance(ids, list) or not all(isinstance(pid, str) for pid in ids):
+            raise ValueError("'ids' debe ser una lista de IDs")
+    if op in ("seen", "upsert") and not isinstance(record.get("at"), str):
+        raise ValueError("'at' debe ser una fecha ISO")
+
+
+class JournalBackend:
+    """
+    Almacenamiento log-structured: una foto (snapshot) más un diario de solo-agregar.
+
+    - Cada propiedad nueva y cada actualización de last_seen se agrega al diario como un
+      registro JSON compacto por línea; escribir cuesta lo que cambió, no toda la historia.
+    - Al arrancar, el índice en memoria se reconstruye cargando la foto y reaplicando el
+      diario (los registros son idempotentes, así que reaplicarlos dos veces no cambia nada).
+    - Cuando el diario supera `compact_bytes`, un thread de fondo lo compacta: se rota el
+      diario, se escribe una foto nueva de forma atómica y se borra el diario rotado.
+      Un corte en cualquier punto deja los datos recuperables.
+    """
+
+    name = "journal"
+
+    def __init__(self, snapshot_path: Path, journal_path: Path, compact_bytes: int = 1024 * 1024,
+                 migrate_from: Path = None, serializer: Serializer = None):
+        """
+        Args:
+            snapshot_path: Foto completa (JSON o MessagePack, según el serializador)
+            journal_path: Diario de cambios (JSON Lines)
+            compact_bytes: Tamaño del diario que dispara la compactación
+            migrate_from: JSON de propiedades vistas a importar si todavía no hay foto ni diario
+            serializer: Formato de la foto (el diario siempre es JSON Lines)
+        """
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.rotated_path = journal_path.with_name(journal_path.name + ".old")
+        self.compact_bytes = compact_bytes
+        self.serializer = serializer or get_serializer("auto")
+        # Las líneas del diario son JSON, con el codificador más rápido instalado
+        self._line_serializer = get_serializer("auto")
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()  # Una sola escritura de foto a la vez (se toma antes que _lock)
+        self._compacting = False
+        self._data: Dict[str, Dict] = {}
+        self._journal_bytes = 0
+
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        fresh = not any(p.exists() for p in (self.snapshot_path, self.journal_path, self.rotated_path))
+        self._replay()
+        if fresh and migrate_from is not None and migrate_from.exists():
+            self._data = JsonBackend(migrate_from).load_all()
+            self._write_snapshot(self._data)
+            print(f"📦 Migradas {len(self._data)} propiedades de {migrate_from} a {self.snapshot_path}")
+
+    def location(self) -> str:
+        return str(self.journal_path)
+
+    def exists(self) -> bool:
+        return self.snapshot_path.exists() or self.journal_path.exists()
+
+    def _replay(self):
+        """Reconstruye el índice en memoria: foto + diario rotado + diario."""
+        with metrics.timer("storage_load"):
+            if self.snapshot_path.exists():
+                # Una foto ilegible lanza StorageCorruptError (el diario solo no alcanza)
+                self._data = parse_json_storage(
+                    _load_storage_file(self.snapshot_path, "la foto de propiedades vistas")
+                )
+            replayed = 0
+            for path in (self.rotated_path, self.journal_path):
+                if not path.exists():
+                    continue
+                with open(path, 'rb') as f:
+                    for line_number, line in enumerate(f, 1):
+                        try:
+                            record = serializers.loads(line)
+                            _check_journal_record(record)
+                        except (ValueError, TypeError):
+                            # Típicamente la última línea, cortada por un corte de energía
+                            print(f"Advertencia: Registro inválido en {path.name}:{line_number}, se ignora")
+                            continue
+                        self._apply(record)
+                        replayed += 1
+            self._journal_bytes = self.journal_path.stat().st_size if self.journal_path.exists() else 0
+        if replayed:
+            print(f"📒 Diario reaplicado: {replayed} registro(s) sobre {len(self._data)} propiedades")
+
+    def _apply(self, record: Dict):
+        """
+        Aplica un registro ya validado con _check_journal_record: "upsert" es un "add" más
+        un "seen" en una sola línea, y como se valida completo antes de tocar el índice, se
+        aplica entero o nada.
+        """
+        if record["op"] in ("add", "upsert"):
+            self._data.update({pid: dict(info) for pid, info in record["items"].items()})
+        if record["op"] in ("seen", "upsert"):
+            for pid in record["ids"]:
+                if pid in self._data:
+                    self._data[pid]["last_seen"] = record["at"]
+        elif record["op"] == "remove":
+            for pid in record["ids"]:
+                self._data.pop(pid, None)
+
+    def _append(self, records: List[Dict]) -> bool:
+        """Agrega registros al diario con fsync (se llama con _lock tomado)."""
+        if not records:
+            return True
+        payload = b"".join(self._line_serializer.dumps(r) + b"\n" for r in records)
+        try:
+            with metrics.timer("storage_save"):
+                with open(self.journal_path, 'ab') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+            written = len(payload)
+            self._journal_bytes += written
+            metrics.inc("storage_bytes_written", written)
+        except IOError as e:
+            print(f"Error: No se pudo escribir el diario de propiedades vistas: {e}")
+            return False
+        for record in records:
+            self._apply(record)
+        if self._journal_bytes >= self.compact_bytes and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self.compact, name="storage-compact", daemon=True).start()
+        return True
+
+    def _write_snapshot(self, data: Dict[str, Dict]):
+        with metrics.timer("storage_compact"):
+            written = write_atomic(self.snapshot_path, self.serializer.dumps({
+                "properties": data,
+                "count": len(data),
+                "last_updated": datetime.now().isoformat()
+            }))
+        metrics.inc("storage_bytes_written", written)
+
+    def compact(self):
+        """Escribe una foto nueva con todo el índice y descarta el diario ya incluido en ella."""
+        try:
+            with self._snapshot_lock:
+                with self._lock:
+                    self._compacting = True
+                    if self.journal_path.exists():
+                        if self.rotated_path.exists():
+                            # Quedó de una compactación interrumpida: va antes que el diario actual
+                            with open(self.rotated_path, 'a', encoding='utf-8') as old, \
+                                    open(self.journal_path, 'r', encoding='utf-8') as current:
+                                old.write(current.read())
+                            self.journal_path.unlink()
+                        else:
+                            os.replace(self.journal_path, self.rotated_path)
+                    self._journal_bytes = 0
+                    data = {pid: dict(info) for pid, info in self._data.items()}
+                # La foto se escribe fuera de _lock: los ciclos siguen agregando al diario nuevo
+                self._write_snapshot(data)
+                if self.rotated_path.exists():
+                    self.rotated_path.unlink()
+            metrics.inc("storage_compactions")
+            print(f"🗜️ Almacenamiento compactado: {len(data)} propiedades en {self.snapshot_path.name}")
+        except (IOError, OSError) as e:
+            print(f"Error: No se pudo compactar el almacenamiento: {e}")
+        finally:
+            self._compacting = False
+
+    def ids(self) -> Set[str]:
+        with self._lock:
+            return set(self._data)
+
+    def load_all(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {pid: dict(info) for pid, info in self._data.items()}
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def contains(self, property_id: str) -> bool:
+        with self._lock:
+            return property_id in self._data
+
+    def lookup(self, property_ids: Iterable[str]) -> Tuple[Dict[str, Dict], int]:
+        with self._lock:
+            return ({pid: dict(self._data[pid]) for pid in property_ids if pid in self._data},
+                    len(self._data))
+
+    def replace_ids(self, property_ids: Set[str]):
+        with self._lock:
+            existing = self._data
+        self.replace_all({pid: existing.get(pid, {"first_seen": None}) for pid in property_ids})
+
+    def replace_all(self, properties_data: Dict[str, Dict]):
+        """Reemplaza todo el contenido: foto nueva y diario vacío."""
+        with self._snapshot_lock, self._lock:
+            self._data = {pid: dict(info) for pid, info in properties_data.items()}
+            try:
+                self._write_snapshot(self._data)
+                for path in (self.rotated_path, self.journal_path):
+                    if path.exists():
+                        path.unlink()
+                self._journal_bytes = 0
+            except (IOError, OSError) as e:
+                print(f"Error: No se pudo guardar la foto de propiedades vistas: {e}")
+
+    def add_ids(self, property_ids: Iterable[str]):
+        with self._lock:
+            items = {pid: {"first_seen": None} for pid in property_ids if pid not in self._data}
+            self._append([{"op": "add", "items": items}] if items else [])
+
+    def stale(self, before: str, limit: int,
+              evictable: Optional[Callable[[Dict], bool]] = None) -> Dict[str, Dict]:
+        """
+        Hasta `limit` propiedades sin ver desde antes de `before` (ISO), las más antiguas
+        primero; con `evictable`, solo las que acepta.
+        """
+        with self._lock:
+            return _oldest(self._data, before, limit, evictable)
+
+    def remove(self, property_ids: Iterable[str]) -> bool:
+        """Registra el borrado en el diario (la foto se achica en la próxima compactación)."""
+        property_ids = list(property_ids)
+        with self._lock:
+            return self._append([{"op": "remove", "ids": property_ids}] if property_ids else [])
+
+    def upsert(self, new_records: Dict[str, Dict], touched_ids: Iterable[str], now: str) -> bool:
+        """
+        Agrega al diario las propiedades nuevas y el last_seen de las ya vistas, en un solo
+        registro: una línea cortada se descarta al reaplicar, así que el lote queda entero o no queda.
+
+        Returns:
+            True si se guardó
+        """
+        touched_ids = list(touched_ids)
+        if not new_records and not touched_ids:
+            return True
+        record = {"op": "upsert", "items": new_records, "at": now, "ids": touched_ids}
+        with self._lock:
+            return self._append([record])
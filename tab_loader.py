@@ -0,0 +1,150 @@
+"""
+Carga concurrente de varias búsquedas en pestañas de un mismo navegador.
+En vez de un Chrome por búsqueda (cientos de MB cada uno), abre hasta `max_tabs` pestañas
+en un solo driver: todas las páginas cargan en paralelo dentro del navegador y el HTML de
+cada una se obtiene apenas sus resultados dejan de crecer; esa pestaña pasa entonces a la
+siguiente URL pendiente.
+
+WebDriver atiende un comando a la vez, así que un único thread recorre las pestañas por
+turnos: la navegación se dispara con JavaScript (no bloquea) y en cada vuelta solo se mira
+el estado de cada pestaña.
+"""
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from selenium.common.exceptions import TimeoutException
+
+from page_readiness import RESULT_ITEM_SELECTOR
+
+# Estado de la pestaña en un solo comando: URL, readyState, tarjetas y aviso de "sin resultados"
+_STATE_SCRIPT = """
+return {
+    href: location.href,
+    state: document.readyState,
+    items: document.querySelectorAll(arguments[0]).length,
+    empty: !!document.querySelector('.ui-search-rescue')
+};
+"""
+
+def load_in_tabs(driver, urls: List[str], on_loaded: Callable, max_tabs: int = 3,
+                 page_load_timeout: float = 60, min_seconds: float = 0.5, max_seconds: float = 15.0,
+                 scroll_max_seconds: float = 10.0, settle_seconds: float = 1.0,
+                 poll_interval: float = 0.25, on_new_tab: Optional[Callable] = None) -> Dict:
+    """
+    Carga las URLs en pestañas del driver, con hasta `max_tabs` abiertas a la vez.
+
+    Una pestaña está lista cuando sus tarjetas no crecen durante `settle_seconds` (haciendo
+    scroll para cargar las diferidas, con presupuesto `scroll_max_seconds`), o cuando la
+    página terminó de cargar y trae el aviso de búsqueda sin resultados o pasaron
+    `max_seconds` sin tarjetas.
+
+    Args:
+        driver: WebDriver de Selenium (lo usa solo este thread mientras dura la carga)
+        urls: URLs a cargar (en este orden)
+        on_loaded: Función (url, html, error) llamada apenas cada página está lista o falla
+        max_tabs: Máximo de pestañas abiertas al mismo tiempo
+        page_load_timeout: Segundos máximos para que la página termine de cargar
+        min_seconds: Espera mínima desde la navegación antes de tomar el HTML
+        max_seconds: Espera máxima por la primera tarjeta una vez cargada la página
+        scroll_max_seconds: Presupuesto de scroll por pestaña
+        settle_seconds: Tiempo sin tarjetas nuevas para dar la lista por completa
+        poll_interval: Pausa entre vueltas por las pestañas
+        on_new_tab: Función (driver) llamada con el driver ya en cada pestaña nueva, antes de
+                    navegar; los comandos CDP (como el bloqueo de recursos) aplican solo a la
+                    pestaña en la que se envían
+
+    Returns:
+        Dict con 'pages', 'tabs' y 'seconds'
+
+    Raises:
+        WebDriverException si el navegador deja de responder (las URLs no informadas
+        quedan sin llamar a on_loaded; el llamador decide qué hacer con ellas)
+    """
+    start = time.monotonic()
+    pending = deque(urls)
+    tab_count = max(1, min(max_tabs, len(urls)))
+
+    handles = [driver.current_window_handle]
+    for _ in range(tab_count - 1):
+        driver.switch_to.new_window('tab')
+        handles.append(driver.current_window_handle)
+        if on_new_tab is not None:
+            on_new_tab(driver)
+
+    tabs: Dict[str, Dict] = {}  # handle -> estado de la carga en curso
+
+    def navigate(handle: str, url: str):
+        driver.switch_to.window(handle)
+        driver.get('about:blank')  # Instantáneo: así no se confunde con la página anterior
+        driver.execute_script("window.location.href = arguments[0];", url)
+        now = time.monotonic()
+        tabs[handle] = {
+            "url": url, "started": now, "loaded_at": None, "items": 0,
+            "changed_at": now, "scroll_started": None
+        }
+
+    for handle in handles:
+        if pending:
+            navigate(handle, pending.popleft())
+
+    pages = 0
+    try:
+        while tabs:
+            for handle in list(tabs):
+                tab = tabs[handle]
+                driver.switch_to.window(handle)
+                state = driver.execute_script(_STATE_SCRIPT, RESULT_ITEM_SELECTOR) or {}
+                now = time.monotonic()
+                elapsed = now - tab["started"]
+
+                if state.get("href", "about:blank") == "about:blank" or state.get("state") == "loading":
+                    if elapsed > page_load_timeout:
+                        on_loaded(tab["url"], None, TimeoutException(
+                            f"La pestaña no terminó de cargar en {page_load_timeout:.0f}s"
+                        ))
+                        del tabs[handle]
+                    continue
+
+                if tab["loaded_at"] is None:
+                    tab["loaded_at"] = now
+                items = int(state.get("items") or 0)
+
+                ready = False
+                if items:
+                    if items != tab["items"]:
+                        tab["items"], tab["changed_at"] = items, now
+                    if tab["scroll_started"] is None:
+                        tab["scroll_started"] = now
+                    scroll_spent = now - tab["scroll_started"]
+                    settled = now - tab["changed_at"] >= settle_seconds
+                    ready = elapsed >= min_seconds and (settled or scroll_spent >= scroll_max_seconds)
+                    if not ready:
+                        # Cargar las tarjetas diferidas
+                        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                elif state.get("state") == "complete":
+                    # Sin tarjetas: listo si el sitio avisa que no hay resultados o se agotó la espera
+                    ready = bool(state.get("empty")) or now - tab["loaded_at"] >= max_seconds
+
+                if not ready:
+                    continue
+
+                on_loaded(tab["url"], driver.page_source, None)
+                pages += 1
+                del tabs[handle]
+                if pending:
+                    navigate(handle, pending.popleft())
+
+            if tabs:
+                time.sleep(poll_interval)
+    finally:
+        # Cerrar las pestañas extra y dejar el driver en la primera
+        try:
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+        except Exception:
+            pass
+
+    return {"pages": pages, "tabs": tab_count, "seconds": time.monotonic() - start}
@@ -0,0 +1,119 @@
+"""
+Backend "journal": reaplicar el diario al arrancar, descartar registros inválidos sin
+aplicarlos a medias, y compactar sin perder datos.
+"""
+import json
+import threading
+
+import pytest
+
+from storage_backends import JournalBackend
+
+NOW = "2026-01-02T10:00:00"
+LATER = "2026-01-03T10:00:00"
+
+
+def record(property_id: str, when: str = NOW) -> dict:
+    return {"first_seen": when, "last_seen": when, "title": f"Casa {property_id}",
+            "link": f"https://www.portalinmobiliario.com/{property_id}-casa-_JM"}
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return tmp_path / "seen.snapshot.json", tmp_path / "seen.journal.jsonl"
+
+
+def open_backend(paths, **kwargs) -> JournalBackend:
+    snapshot, journal = paths
+    return JournalBackend(snapshot, journal, **kwargs)
+
+
+def append_line(paths, line: str):
+    with open(paths[1], 'a', encoding='utf-8') as f:
+        f.write(line)
+
+
+def test_journal_is_replayed_on_open(paths):
+    backend = open_backend(paths)
+    assert backend.upsert({"MLC-1": record("MLC-1"), "MLC-2": record("MLC-2")}, [], NOW)
+    assert backend.upsert({}, ["MLC-1"], LATER)
+    assert backend.remove(["MLC-2"])
+
+    reopened = open_backend(paths)
+    assert reopened.ids() == {"MLC-1"}
+    assert reopened.lookup(["MLC-1"])[0]["MLC-1"]["last_seen"] == LATER
+
+
+def test_torn_last_line_is_ignored(paths):
+    backend = open_backend(paths)
+    assert backend.upsert({"MLC-1": record("MLC-1")}, [], NOW)
+    # Un corte de energía a mitad de la escritura
+    append_line(paths, '{"op": "upsert", "items": {"MLC-2": {"first_')
+
+    assert open_backend(paths).ids() == {"MLC-1"}
+
+
+@pytest.mark.parametrize("bad", [
+    {"op": "upsert", "items": {"MLC-2": record("MLC-2")}, "ids": ["MLC-1"]},  # Sin "at"
+    {"op": "upsert", "items": {"MLC-2": record("MLC-2")}, "ids": "MLC-1", "at": LATER},
+    {"op": "upsert", "items": {"MLC-2": "no es un dict"}, "ids": [], "at": LATER},
+    {"op": "rename", "ids": ["MLC-1"]},
+])
+def test_invalid_record_is_not_half_applied(paths, bad):
+    backend = open_backend(paths)
+    assert backend.upsert({"MLC-1": record("MLC-1")}, [], NOW)
+    append_line(paths, json.dumps(bad) + "\n")
+
+    reopened = open_backend(paths)
+    assert reopened.ids() == {"MLC-1"}
+    assert reopened.lookup(["MLC-1"])[0]["MLC-1"]["last_seen"] == NOW
+
+
+def test_records_after_an_invalid_one_are_applied(paths):
+    backend = open_backend(paths)
+    append_line(paths, '{"op": "upsert"}\n')
+    append_line(paths, json.dumps({"op": "add", "items": {"MLC-1": record("MLC-1")}}) + "\n")
+
+    assert open_backend(paths).ids() == {"MLC-1"}
+    assert backend.count() == 0  # El backend abierto no relee el archivo
+
+
+def test_compaction_moves_journal_into_snapshot(paths):
+    snapshot, journal = paths
+    backend = open_backend(paths)
+    assert backend.upsert({"MLC-1": record("MLC-1"), "MLC-2": record("MLC-2")}, [], NOW)
+    assert backend.upsert({}, ["MLC-2"], LATER)
+
+    backend.compact()
+    assert snapshot.exists()
+    assert not journal.exists() or journal.stat().st_size == 0
+    assert not backend.rotated_path.exists()
+
+    reopened = open_backend(paths)
+    assert reopened.ids() == {"MLC-1", "MLC-2"}
+    assert reopened.lookup(["MLC-2"])[0]["MLC-2"]["last_seen"] == LATER
+
+
+def test_interrupted_compaction_is_recovered(paths):
+    # El diario quedó rotado pero la foto nueva no llegó a escribirse
+    backend = open_backend(paths)
+    assert backend.upsert({"MLC-1": record("MLC-1")}, [], NOW)
+    paths[1].rename(backend.rotated_path)
+    assert open_backend(paths).upsert({"MLC-2": record("MLC-2")}, [], LATER)
+
+    reopened = open_backend(paths)
+    assert reopened.ids() == {"MLC-1", "MLC-2"}
+    reopened.compact()
+    assert not reopened.rotated_path.exists()
+    assert open_backend(paths).ids() == {"MLC-1", "MLC-2"}
+
+
+def test_large_journal_triggers_compaction(paths):
+    backend = open_backend(paths, compact_bytes=1)
+    assert backend.upsert({"MLC-1": record("MLC-1")}, [], NOW)
+    # La compactación corre en un thread de fondo
+    for thread in threading.enumerate():
+        if thread.name == "storage-compact":
+            thread.join(timeout=5)
+    assert paths[0].exists()
+    assert open_backend(paths).ids() == {"MLC-1"}
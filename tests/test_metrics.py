@@ -0,0 +1,32 @@
+"""
+Métricas: el archivo con el resumen de cada ciclo no crece sin límite.
+"""
+import json
+
+import metrics
+
+
+def write_cycle(path, max_bytes):
+    metrics.start_cycle()
+    metrics.inc("pages_fetched")
+    return metrics.end_cycle(path, {"filters": 1}, max_bytes=max_bytes)
+
+
+def test_cycle_summary_is_appended(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    for _ in range(2):
+        write_cycle(path, max_bytes=0)
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0])["counters"]["pages_fetched"] == 1
+
+
+def test_file_over_max_bytes_is_rotated(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    for _ in range(3):
+        write_cycle(path, max_bytes=1)
+
+    # Solo se conserva un archivo anterior: el tamaño queda acotado a dos archivos
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["metrics.jsonl", "metrics.jsonl.1"]
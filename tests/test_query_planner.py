@@ -0,0 +1,118 @@
+"""
+Planificador de búsquedas: qué filtros se agrupan, el tope de páginas de una búsqueda
+agrupada y cómo se reparten sus resultados.
+"""
+from query_planner import UF_MARGIN, parse_search_url, plan_queries, split_results
+
+BASE = "https://www.portalinmobiliario.com/arriendo/casa/"
+GEO = "_item*location_lat:-33.43*-33.38,lon:-70.63*-70.52"
+UF = 40000
+
+
+def url(price: str, bedrooms: str = "4-5") -> str:
+    return f"{BASE}_DisplayType_M_PriceRange_{price}_BEDROOMS_{bedrooms}{GEO}"
+
+
+def merged_pair():
+    """Dos filtros que solo difieren en el rango de precio, y su búsqueda agrupada."""
+    filters = [{"name": "Baratas", "url": url("0CLP-1000000CLP")},
+               {"name": "Caras", "url": url("1000000CLP-2000000CLP")}]
+    plans = plan_queries(filters, max_pages=3)
+    assert len(plans) == 1
+    return plans[0]
+
+
+def members(plan):
+    return [query for _, query in plan["members"]]
+
+
+def listing(property_id: str, **fields):
+    return {"id": property_id, "price_unit": "CLP", **fields}
+
+
+def test_filters_differing_only_in_price_share_one_search():
+    plan = merged_pair()
+    assert [idx for idx, _ in plan["members"]] == [1, 2]
+    assert plan["query"]["price"] == (0, 2000000, "CLP")
+    assert "_PriceRange_0CLP-2000000CLP" in plan["url"]
+    assert "_BEDROOMS_4-5" in plan["url"]
+
+
+def test_merged_search_gets_max_pages_per_member():
+    assert merged_pair()["max_pages"] == 6
+
+
+def test_single_filter_keeps_its_own_url_and_max_pages():
+    (plan,) = plan_queries([{"name": "Casas", "url": url("0CLP-1000000CLP")}], max_pages=3)
+    assert plan["url"] == url("0CLP-1000000CLP")
+    assert plan["max_pages"] == 3
+
+
+def test_filters_differing_in_bedrooms_are_not_merged():
+    filters = [{"name": "4-5", "url": url("0CLP-2000000CLP", "4-5")},
+               {"name": "5", "url": url("0CLP-2000000CLP", "5-5")}]
+    assert len(plan_queries(filters)) == 2
+
+
+def test_filters_with_different_price_currency_are_not_merged():
+    filters = [{"name": "CLP", "url": url("0CLP-1000000CLP")},
+               {"name": "UF", "url": url("0UF-50UF")}]
+    assert len(plan_queries(filters)) == 2
+
+
+def test_coalesce_disabled_keeps_every_filter_apart():
+    filters = [{"name": "Baratas", "url": url("0CLP-1000000CLP")},
+               {"name": "Caras", "url": url("1000000CLP-2000000CLP")}]
+    assert len(plan_queries(filters, coalesce=False)) == 2
+
+
+def test_split_by_price_range():
+    plan = merged_pair()
+    cheap, expensive = members(plan)
+    results = [listing("MLC-1", price=800000, bedrooms=4), listing("MLC-2", price=1500000, bedrooms=5)]
+    assert [p["id"] for p in split_results(results, cheap, plan["query"], UF)] == ["MLC-1"]
+    assert [p["id"] for p in split_results(results, expensive, plan["query"], UF)] == ["MLC-2"]
+
+
+def test_listing_without_bedrooms_is_split_by_price_only():
+    # Los dormitorios son los mismos en ambos filtros: el sitio ya los filtró
+    plan = merged_pair()
+    cheap, expensive = members(plan)
+    results = [listing("MLC-1", price=800000, bedrooms=None)]
+    assert [p["id"] for p in split_results(results, cheap, plan["query"], UF)] == ["MLC-1"]
+    assert split_results(results, expensive, plan["query"], UF) == []
+
+
+def test_listing_without_price_is_dropped_from_narrower_filters():
+    plan = merged_pair()
+    results = [listing("MLC-1", price=None, bedrooms=4)]
+    for member in members(plan):
+        assert split_results(results, member, plan["query"], UF) == []
+
+
+def test_unknown_value_kept_when_member_range_equals_superset():
+    query = parse_search_url(url("0CLP-2000000CLP"))
+    superset = dict(query)
+    results = [listing("MLC-1", price=None, bedrooms=None)]
+    assert [p["id"] for p in split_results(results, query, superset, UF)] == ["MLC-1"]
+
+
+def test_uf_price_uses_margin_near_the_range_edge():
+    plan = merged_pair()
+    cheap, expensive = members(plan)
+    # 1.000.000 CLP = 25 UF; 26 UF queda dentro del margen del filtro barato, 27 UF no
+    edge = 1000000 / UF * (1 + UF_MARGIN)
+    assert 26 < edge < 27
+    near = listing("MLC-1", price=26, price_unit="UF", bedrooms=4)
+    far = listing("MLC-2", price=27, price_unit="UF", bedrooms=4)
+    assert [p["id"] for p in split_results([near, far], cheap, plan["query"], UF)] == ["MLC-1"]
+    assert [p["id"] for p in split_results([near, far], expensive, plan["query"], UF)] == ["MLC-1", "MLC-2"]
+
+
+def test_split_returns_copies():
+    plan = merged_pair()
+    cheap, _ = members(plan)
+    original = listing("MLC-1", price=800000, bedrooms=4)
+    (copy,) = split_results([original], cheap, plan["query"], UF)
+    copy["filter_name"] = "Baratas"
+    assert "filter_name" not in original
@@ -0,0 +1,106 @@
+"""
+Resiliencia: estados del circuit breaker por filtro (cerrado, abierto, semiabierto), su
+persistencia, y la clasificación de errores para los reintentos.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from resilience import CircuitBreakers, EmptyPageError, RetryPolicy, classify_error
+
+URL = "https://www.portalinmobiliario.com/arriendo/casa/"
+
+
+@pytest.fixture
+def breakers(tmp_path):
+    return CircuitBreakers(tmp_path / "circuit_breakers.json", failure_threshold=2,
+                           cooldown_minutes=10, max_cooldown_minutes=30)
+
+
+def cooldown_left(breakers) -> timedelta:
+    return datetime.fromisoformat(breakers._states[URL]["retry_at"]) - datetime.now()
+
+
+def end_cooldown(breakers):
+    breakers._states[URL]["retry_at"] = (datetime.now() - timedelta(seconds=1)).isoformat()
+
+
+def test_opens_after_threshold_failures(breakers):
+    breakers.record_failure(URL, "timeout")
+    assert breakers.allow(URL)
+    breakers.record_failure(URL, "timeout")
+    assert not breakers.allow(URL)
+    assert breakers.open_circuits()[0]["state"] == "open"
+
+
+def test_success_resets_failure_count(breakers):
+    breakers.record_failure(URL, "timeout")
+    breakers.record_success(URL)
+    breakers.record_failure(URL, "timeout")
+    assert breakers.allow(URL)
+
+
+def test_half_open_after_cooldown_then_closes_on_success(breakers):
+    for _ in range(2):
+        breakers.record_failure(URL, "driver_crash")
+    end_cooldown(breakers)
+
+    assert breakers.allow(URL)
+    assert breakers._states[URL]["state"] == "half_open"
+    breakers.record_success(URL)
+    assert breakers.open_circuits() == []
+
+
+def test_half_open_failure_reopens_with_doubled_cooldown(breakers):
+    for _ in range(2):
+        breakers.record_failure(URL, "timeout")
+    assert timedelta(minutes=9) < cooldown_left(breakers) <= timedelta(minutes=10)
+
+    end_cooldown(breakers)
+    assert breakers.allow(URL)
+    # Un solo fallo en semiabierto basta para volver a abrir, con el doble de enfriamiento
+    breakers.record_failure(URL, "timeout")
+    assert not breakers.allow(URL)
+    assert timedelta(minutes=19) < cooldown_left(breakers) <= timedelta(minutes=20)
+
+    end_cooldown(breakers)
+    breakers.allow(URL)
+    breakers.record_failure(URL, "timeout")
+    assert cooldown_left(breakers) <= timedelta(minutes=30)  # Acotado por max_cooldown_minutes
+
+
+def test_state_survives_restart(breakers, tmp_path):
+    for _ in range(2):
+        breakers.record_failure(URL, "timeout", "Casas")
+
+    reloaded = CircuitBreakers(tmp_path / "circuit_breakers.json", failure_threshold=2)
+    assert not reloaded.allow(URL)
+    assert "Casas" in reloaded.describe()
+
+
+def test_unreadable_state_file_starts_closed(tmp_path):
+    path = tmp_path / "circuit_breakers.json"
+    path.write_text("{no es json", encoding="utf-8")
+    assert CircuitBreakers(path).allow(URL)
+
+
+@pytest.mark.parametrize("error, kind", [
+    (EmptyPageError(), "empty_page"),
+    (TimeoutException(), "timeout"),
+    (TimeoutError(), "timeout"),
+    (WebDriverException("timed out receiving message from renderer"), "timeout"),
+    (WebDriverException("chrome not reachable"), "driver_crash"),
+    (ValueError("parser"), "other"),
+])
+def test_classify_error(error, kind):
+    assert classify_error(error) == kind
+
+
+def test_retry_policy_only_retries_transient_errors():
+    policy = RetryPolicy(max_attempts=3, base_seconds=1, max_seconds=3)
+    assert policy.should_retry("timeout", 0)
+    assert policy.should_retry("empty_page", 1)
+    assert not policy.should_retry("timeout", 2)
+    assert not policy.should_retry("other", 0)
+    assert all(0 <= policy.delay(attempt) <= 3 for attempt in range(6))
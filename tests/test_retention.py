@@ -0,0 +1,138 @@
+"""
+Retención: una propiedad que sigue apareciendo en las búsquedas no se archiva, aunque
+los ciclos no traigan propiedades nuevas ni la paginación llegue a su página.
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+import fingerprints
+import main
+import storage
+from retention import evict_stale
+
+RETENTION_DAYS = 30
+LISTING = {
+    "id": "MLC-1001",
+    "title": "Casa en Ñuñoa",
+    "price": 1500000,
+    "price_unit": "CLP",
+    "link": "https://www.portalinmobiliario.com/MLC-1001-casa-_JM",
+}
+SEARCH_FILTER = {"name": "Casas", "url": "https://www.portalinmobiliario.com/arriendo/casa/"}
+
+
+@pytest.fixture(params=["json", "sqlite", "journal"])
+def backend(request, tmp_path, monkeypatch):
+    """Almacenamiento vacío en un directorio temporal, con LISTING vista hace 2 * RETENTION_DAYS."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", request.param)
+    monkeypatch.setattr(storage, "_backend", None)
+    monkeypatch.setattr(storage, "_tombstones", None)
+    monkeypatch.setattr(storage, "_crawl_log", None)
+    monkeypatch.setattr(fingerprints, "_fingerprints", None)
+    storage.discard_pending()
+    fingerprints.discard_pending()
+
+    old = (datetime.now() - timedelta(days=2 * RETENTION_DAYS)).isoformat()
+    backend = storage.get_backend()
+    backend.replace_all({
+        LISTING["id"]: {"first_seen": old, "last_seen": old, "title": LISTING["title"],
+                        "link": LISTING["link"], "filter_name": SEARCH_FILTER["name"],
+                        "filter_url": SEARCH_FILTER["url"]},
+    })
+    yield backend
+    if hasattr(backend, "close"):
+        backend.close()
+
+
+def evict(backend) -> int:
+    return evict_stale(backend, storage.get_tombstones(), Path("data/archive.jsonl.gz"),
+                       RETENTION_DAYS, limit=100, crawl_log=storage.get_crawl_log())
+
+
+def test_listing_not_seen_is_evicted(backend):
+    assert evict(backend) == 1
+    assert backend.count() == 0
+
+
+def test_listing_seen_in_cycle_without_new_listings_is_kept(backend):
+    assert storage.get_new_properties([dict(LISTING)], defer=True) == []
+    assert storage.commit_pending() == 0
+
+    assert evict(backend) == 0
+    assert backend.lookup([LISTING["id"]])[0]
+
+
+def test_listing_of_unchanged_search_is_kept(backend):
+    # Búsqueda omitida por la huella: solo se conocen sus IDs
+    storage.touch_properties([LISTING["id"]])
+    assert storage.commit_pending() == 0
+
+    assert evict(backend) == 0
+    assert backend.lookup([LISTING["id"]])[0]
+
+
+def test_run_check_without_new_listings_refreshes_last_seen(backend, monkeypatch):
+    # Sin navegador: el scraping se reemplaza y no se precalienta ni precarga Chrome
+    monkeypatch.setattr(main, "DRIVER_PREWARM", False)
+    monkeypatch.setattr(main, "PREFETCH_NEXT_SEARCH", False)
+    monkeypatch.setattr(main, "scrape_properties", lambda url, **kwargs: [dict(LISTING)])
+    monkeypatch.setattr(main, "send_email", lambda properties: pytest.fail("no hay nada que notificar"))
+
+    for _ in range(2):
+        assert main.run_check([SEARCH_FILTER]) == []
+
+    assert evict(backend) == 0
+    assert backend.lookup([LISTING["id"]])[0]
+
+
+def test_fresh_last_seen_is_not_rewritten(backend, monkeypatch):
+    # Vista hace un rato: volver a verla no justifica reescribir el almacenamiento
+    recent = (datetime.now() - timedelta(hours=1)).isoformat()
+    backend.upsert({}, [LISTING["id"]], recent)
+    monkeypatch.setattr(backend, "upsert", lambda *args: pytest.fail("no debería escribir"))
+
+    assert storage.get_new_properties([dict(LISTING)], defer=True) == []
+    storage.touch_properties([LISTING["id"]])
+    assert storage.commit_pending() == 0
+
+
+def test_listing_beyond_early_stop_is_kept_until_a_complete_crawl(backend):
+    # El filtro se scrapea pero la paginación siempre se cortó antes de la página de LISTING
+    crawl_log = storage.get_crawl_log()
+    crawl_log.register([SEARCH_FILTER["url"]])
+    assert evict(backend) == 0
+
+    # Un recorrido completo que no la encontró: ya no está publicada
+    crawl_log.record_complete([SEARCH_FILTER["url"]], datetime.now().isoformat())
+    assert evict(backend) == 1
+
+
+def test_listing_of_unscraped_filter_only_depends_on_age(backend):
+    storage.get_crawl_log().register(["https://www.portalinmobiliario.com/arriendo/otro/"])
+    assert evict(backend) == 1
+
+
+def test_run_check_crawls_whole_search_when_due(backend, monkeypatch):
+    calls = []
+
+    def scrape(url, stop_when_seen=True, crawl=None, **kwargs):
+        calls.append(stop_when_seen)
+        crawl["complete"] = not stop_when_seen  # Cortada por una página ya vista, si no
+        return [dict(LISTING)]
+
+    monkeypatch.setattr(main, "RETENTION_DAYS", RETENTION_DAYS)
+    monkeypatch.setattr(main, "DRIVER_PREWARM", False)
+    monkeypatch.setattr(main, "PREFETCH_NEXT_SEARCH", False)
+    monkeypatch.setattr(main, "scrape_properties", scrape)
+    monkeypatch.setattr(main, "send_email", lambda properties: pytest.fail("no hay nada que notificar"))
+
+    for _ in range(2):
+        assert main.run_check([SEARCH_FILTER]) == []
+
+    # Sin recorrido completo registrado, el primer ciclo recorre todo; el segundo ya no
+    assert calls == [False, True]
+    assert not storage.get_crawl_log().is_due(SEARCH_FILTER["url"], timedelta(days=1))
+    assert evict(backend) == 0
@@ -0,0 +1,106 @@
+"""
+Planificador por fechas límite: expresiones cron, y qué pasa con las ejecuciones perdidas
+cuando una verificación dura más que el intervalo.
+"""
+import threading
+from datetime import datetime
+
+import pytest
+
+from scheduler import CronSchedule, DeadlineScheduler, IntervalSchedule, parse_schedule
+
+# Un lunes a las 10:00
+MONDAY = datetime(2026, 1, 5, 10, 0).timestamp()
+
+
+def at(*args) -> float:
+    return datetime(*args).timestamp()
+
+
+def test_parse_schedule_accepts_minutes_or_cron():
+    assert isinstance(parse_schedule(30), IntervalSchedule)
+    assert parse_schedule("7.5").minutes == 7.5
+    assert isinstance(parse_schedule("*/15 7-23 * * *"), CronSchedule)
+
+
+@pytest.mark.parametrize("spec", ["0", "* * *", "61 * * * *", "*/0 * * * *", "5-1 * * * *"])
+def test_parse_schedule_rejects_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        parse_schedule(spec)
+
+
+def test_cron_steps_and_ranges():
+    schedule = CronSchedule("*/15 7-23 * * *")
+    assert schedule.next_after(MONDAY) == at(2026, 1, 5, 10, 15)
+    # Después de las 23:45 sigue a las 7:00 del día siguiente
+    assert schedule.next_after(at(2026, 1, 5, 23, 45)) == at(2026, 1, 6, 7, 0)
+
+
+def test_cron_lists_and_weekdays():
+    # 9:00 y 18:30 de lunes a viernes (0 y 7 son domingo)
+    schedule = CronSchedule("0,30 9,18 * * 1-5")
+    assert schedule.next_after(MONDAY) == at(2026, 1, 5, 18, 0)
+    friday_night = at(2026, 1, 9, 19, 0)
+    assert schedule.next_after(friday_night) == at(2026, 1, 12, 9, 0)
+    assert CronSchedule("0 12 * * 7").next_after(MONDAY) == at(2026, 1, 11, 12, 0)
+
+
+def test_cron_day_of_month_or_weekday():
+    # Como en cron: con ambos restringidos, basta con que coincida uno (el 1 del mes o un domingo)
+    schedule = CronSchedule("0 0 1 * 0")
+    assert schedule.next_after(MONDAY) == at(2026, 1, 11, 0, 0)
+    assert schedule.next_after(at(2026, 1, 25, 12, 0)) == at(2026, 2, 1, 0, 0)
+
+
+def test_next_deadline_keeps_the_grid():
+    scheduler = DeadlineScheduler()
+    scheduler.add_job(0, IntervalSchedule(10), first_run=MONDAY)
+    # Terminó 3 minutos tarde: la próxima sigue siendo a los 10 minutos de la anterior
+    assert scheduler.complete([0], now=MONDAY + 180) == 0
+    assert scheduler.next_deadline() == MONDAY + 600
+
+
+def test_missed_runs_are_coalesced_into_one():
+    scheduler = DeadlineScheduler(missed_run_policy="coalesce")
+    scheduler.add_job(0, IntervalSchedule(10), first_run=MONDAY)
+    # Duró 35 minutos: se perdieron 10, 20 y 30; se ejecuta una sola vez, ya
+    assert scheduler.complete([0], now=MONDAY + 35 * 60) == 2
+    assert scheduler.next_deadline() == MONDAY + 30 * 60
+    assert scheduler.due_jobs(now=MONDAY + 35 * 60) == [0]
+
+
+def test_missed_runs_are_skipped():
+    scheduler = DeadlineScheduler(missed_run_policy="skip")
+    scheduler.add_job(0, IntervalSchedule(10), first_run=MONDAY)
+    assert scheduler.complete([0], now=MONDAY + 35 * 60) == 3
+    assert scheduler.next_deadline() == MONDAY + 40 * 60
+    assert scheduler.due_jobs(now=MONDAY + 35 * 60) == []
+
+
+def test_invalid_missed_run_policy():
+    with pytest.raises(ValueError):
+        DeadlineScheduler(missed_run_policy="catch-up")
+
+
+def test_set_interval_recomputes_from_last_run():
+    scheduler = DeadlineScheduler()
+    scheduler.add_job(0, IntervalSchedule(10), first_run=MONDAY)
+    scheduler.complete([0], now=MONDAY + 60)
+    scheduler.set_interval(0, 30)
+    assert scheduler.next_deadline() == MONDAY + 30 * 60
+
+
+def test_due_jobs_in_id_order():
+    scheduler = DeadlineScheduler()
+    scheduler.add_job(2, IntervalSchedule(5), first_run=MONDAY)
+    scheduler.add_job(1, IntervalSchedule(5), first_run=MONDAY - 60)
+    scheduler.add_job(3, IntervalSchedule(5), first_run=MONDAY + 60)
+    assert scheduler.due_jobs(now=MONDAY) == [1, 2]
+
+
+def test_stop_interrupts_the_wait():
+    scheduler = DeadlineScheduler()
+    scheduler.add_job(0, IntervalSchedule(60), first_run=datetime.now().timestamp() + 3600)
+    threading.Timer(0.05, scheduler.stop).start()
+    assert scheduler.wait_for_due() == []
+    assert scheduler.stopped
@@ -0,0 +1,76 @@
+"""
+Formatos del almacenamiento: detección del formato al cargar, ida y vuelta con cada
+formato instalado, y cambio de STORAGE_FORMAT sin migrar los archivos existentes.
+"""
+import pytest
+
+import serializers
+from storage_backends import JsonBackend
+
+DATA = {
+    "properties": {
+        "MLC-1": {"first_seen": "2026-01-02T10:00:00", "last_seen": None, "title": "Casa en Ñuñoa"},
+    },
+    "count": 1,
+}
+
+
+@pytest.mark.parametrize("raw, kind", [
+    (b'{"a": 1}', "json"),
+    (b'[1, 2]', "json"),
+    (b'  \n\t{"a": 1}', "json"),
+    (b'', "json"),
+    (b'\x82\xa1a\x01', "msgpack"),
+])
+def test_detect_format(raw, kind):
+    assert serializers.detect_format(raw) == kind
+
+
+@pytest.mark.parametrize("name", serializers.available_formats())
+def test_round_trip(name):
+    serializer = serializers.get_serializer(name)
+    raw = serializer.dumps(DATA)
+    assert serializers.detect_format(raw) == serializer.kind
+    assert serializers.loads(raw) == DATA
+
+
+def test_auto_is_an_installed_json_encoder():
+    serializer = serializers.get_serializer("auto")
+    assert serializer.kind == "json"
+    assert serializer.name in serializers.available_formats()
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        serializers.get_serializer("yaml")
+
+
+def test_known_format_without_library_asks_to_install(monkeypatch):
+    monkeypatch.setattr(serializers, "_AVAILABLE", {"json": serializers._AVAILABLE["json"]})
+    with pytest.raises(ValueError, match="pip install msgpack"):
+        serializers.get_serializer("msgpack")
+
+
+def test_msgpack_without_library_is_a_clear_error(monkeypatch):
+    monkeypatch.setattr(serializers, "_AVAILABLE", {"json": serializers._AVAILABLE["json"]})
+    with pytest.raises(ValueError, match="MessagePack"):
+        serializers.loads(b'\x82\xa1a\x01')
+
+
+def test_corrupt_json_raises_value_error():
+    with pytest.raises(ValueError):
+        serializers.loads(b'{"properties": {"MLC-1": ')
+
+
+@pytest.mark.parametrize("name", serializers.available_formats())
+def test_changing_format_reads_existing_file(tmp_path, name):
+    # Un archivo guardado con el JSON indentado original se lee con cualquier formato
+    path = tmp_path / "properties-seen.json"
+    JsonBackend(path, serializer=serializers.get_serializer("json")).replace_all(DATA["properties"])
+
+    backend = JsonBackend(path, serializer=serializers.get_serializer(name))
+    assert backend.load_all() == DATA["properties"]
+    # El próximo guardado lo reescribe en el formato nuevo
+    assert backend.upsert({"MLC-2": {"first_seen": "2026-01-03T10:00:00"}}, [], "2026-01-03T10:00:00")
+    assert serializers.detect_format(path.read_bytes()) == serializers.get_serializer(name).kind
+    assert JsonBackend(path).ids() == {"MLC-1", "MLC-2"}